@@ -0,0 +1,36 @@
+import argparse, json, platform, time
+from simple_atm_controller import __VERSION__
+from benchmarks import bench_controller, bench_value_objects, bench_startup, bench_rejections, bench_locks
+
+
+def bench():
+    parser = argparse.ArgumentParser(description="Benchmark of the simple ATM controller")
+    bench_controller.add_arguments(parser)
+    parser.add_argument("--json", metavar="PATH",
+                        help="write the results as JSON to PATH")
+    args = parser.parse_args()
+
+    print("Benchmark Start...")
+    results = {
+        "version": __VERSION__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "controller": bench_controller.run(
+            args.sizes, args.threads, args.operations, args.count
+        ),
+        "value_objects": bench_value_objects.run(),
+        "startup": bench_startup.run(),
+        "rejections": bench_rejections.run(),
+        "locks": bench_locks.run(),
+    }
+    bench_controller.print_results(results["controller"])
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=2)
+    print('Done!')
+
+
+if __name__ == '__main__':
+    bench()
@@ -0,0 +1,130 @@
+"""
+Benchmark of the controller hot paths
+    # find_accounts, get_valance, deposit and withdraw of LedgerAtmController
+    # For each dataset size and number of threads, reports ops/sec and p50/p99 latency
+
+$ python3 -m benchmarks.bench_controller --sizes 1000,1000000 --threads 1,4
+"""
+import argparse, random, time
+from threading import Thread
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+
+OPERATIONS = ("find_accounts", "get_valance", "deposit", "withdraw")
+ACCOUNTS_PER_PIN = 2
+
+
+def make_records(size):
+    """(pin_number, account_id, valance) records, two accounts per pin"""
+    for i in range(size):
+        yield "P%09d" % (i // ACCOUNTS_PER_PIN), "A%09d" % i, 1_000_000
+
+
+def make_controller(size, threads):
+    locks = LockStripes(1024) if threads > 1 else None
+    return LedgerAtmController(Ledger(make_records(size)), locks=locks)
+
+
+def make_calls(controller, size, operation, count, seed=0):
+    """Arguments of each call, sampled from the whole dataset"""
+    rng = random.Random(seed)
+    pins = [
+        Pin("P%09d" % (rng.randrange(size) // ACCOUNTS_PER_PIN))
+        for _ in range(min(count, 10_000))
+    ]
+    if operation == "find_accounts":
+        args = [(pin,) for pin in pins]
+    else:
+        accounts = [rng.choice(controller.find_accounts(pin)) for pin in pins]
+        if operation == "get_valance":
+            args = [(account,) for account in accounts]
+        else:
+            args = [(account, 1) for account in accounts]
+    return [args[i % len(args)] for i in range(count)]
+
+
+def percentile(latencies, ratio):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * ratio))]
+
+
+def measure(controller, operation, calls, threads):
+    method = getattr(controller, operation)
+    chunks = [calls[i::threads] for i in range(threads)]
+    latencies = [[] for _ in range(threads)]
+
+    def target(chunk, result):
+        clock = time.perf_counter_ns
+        append = result.append
+        for args in chunk:
+            started = clock()
+            method(*args)
+            append(clock() - started)
+
+    workers = [
+        Thread(target=target, args=(chunk, result))
+        for chunk, result in zip(chunks, latencies)
+    ]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for result in latencies for latency in result)
+    return {
+        "ops_per_sec": round(len(calls) / elapsed, 1),
+        "p50_us": round(percentile(latencies, 0.50) / 1000, 3),
+        "p99_us": round(percentile(latencies, 0.99) / 1000, 3),
+    }
+
+
+def run(sizes=(1_000, 100_000), threads=(1, 4), operations=OPERATIONS, count=100_000):
+    results = []
+    for size in sizes:
+        for threads_i in threads:
+            controller = make_controller(size, threads_i)
+            for operation in operations:
+                calls = make_calls(controller, size, operation, count)
+                results.append({
+                    "operation": operation,
+                    "size": size,
+                    "threads": threads_i,
+                    **measure(controller, operation, calls, threads_i),
+                })
+    return results
+
+
+def int_list(value):
+    return [int(item) for item in value.replace("_", "").split(",")]
+
+
+def add_arguments(parser):
+    parser.add_argument("--sizes", type=int_list, default=[1_000, 100_000],
+                        help="comma separated number of accounts (default: 1000,100000)")
+    parser.add_argument("--threads", type=int_list, default=[1, 4],
+                        help="comma separated number of threads (default: 1,4)")
+    parser.add_argument("--operations", type=lambda value: value.split(","),
+                        default=list(OPERATIONS),
+                        help="comma separated operations (default: all)")
+    parser.add_argument("--count", type=int, default=100_000,
+                        help="number of calls per operation (default: 100000)")
+
+
+def print_results(results):
+    print("%-14s %10s %8s %14s %10s %10s" % (
+        "operation", "size", "threads", "ops/sec", "p50(us)", "p99(us)"
+    ))
+    for result in results:
+        print("%-14s %10s %8s %14s %10s %10s" % (
+            result["operation"], result["size"], result["threads"],
+            result["ops_per_sec"], result["p50_us"], result["p99_us"]
+        ))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    add_arguments(parser)
+    args = parser.parse_args()
+    print_results(run(args.sizes, args.threads, args.operations, args.count))
@@ -0,0 +1,90 @@
+"""
+Benchmark of the lock stripes
+    # Elapsed time of concurrent withdrawals on different accounts, over a data model
+    # with 'latency' seconds per query, for each number of stripes
+    # One stripe serializes every account, like a global lock
+
+$ python3 -m benchmarks.bench_locks --stripes 1,1024 --threads 8
+"""
+import argparse, time
+from collections.abc import Iterable
+from threading import Thread
+from simple_atm_controller.atm_controller import AtmController
+from simple_atm_controller.ledger import Ledger
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+from benchmarks.bench_controller import int_list
+
+
+class SlowLedger(Ledger):
+    """Ledger with the latency of a remote data model"""
+
+    def __init__(self, records, latency):
+        super().__init__(records)
+        self.latency = latency
+
+    def get_valance(self, pin_number, account_id):
+        time.sleep(self.latency)
+        return super().get_valance(pin_number, account_id)
+
+    def update_valance(self, pin_number, account_id, dollar):
+        time.sleep(self.latency)
+        super().update_valance(pin_number, account_id, dollar)
+
+
+class TwoStepAtmController(AtmController):
+    """Withdraws through get_valance_query + update_valance_query, so the lock is held for two queries"""
+
+    def find_accounts_query(self, pin_number) -> Iterable:
+        return self.model.find_accounts(pin_number)
+
+    def get_valance_query(self, pin_number, account_id) -> int:
+        return self.model.get_valance(pin_number, account_id)
+
+    def update_valance_query(self, pin_number, account_id, dollar):
+        self.model.update_valance(pin_number, account_id, dollar)
+
+
+def measure(stripes, threads, count, latency):
+    records = [["P%04d" % i, "account", 1_000_000] for i in range(threads)]
+    controller = TwoStepAtmController(SlowLedger(records, latency), locks=LockStripes(stripes))
+    accounts = [controller.find_accounts(Pin(pin))[0] for pin, _, _ in records]
+
+    def target(account):
+        for _ in range(count):
+            controller.withdraw(account, 1)
+
+    workers = [Thread(target=target, args=(account,)) for account in accounts]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - started
+
+
+def run(stripes=(1, 1024), threads=8, count=10, latency=0.001):
+    results = []
+    for stripes_i in stripes:
+        elapsed = measure(stripes_i, threads, count, latency)
+        results.append({
+            "stripes": stripes_i,
+            "threads": threads,
+            "elapsed_ms": round(elapsed * 1000, 1),
+            "ops_per_sec": round(threads * count / elapsed, 1),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--stripes", type=int_list, default=[1, 1024], help="comma separated number of stripes")
+    parser.add_argument("--threads", type=int, default=8, help="threads, one account each")
+    parser.add_argument("--count", type=int, default=10, help="withdrawals per thread")
+    parser.add_argument("--latency", type=float, default=0.001, help="seconds per query of the data model")
+    args = parser.parse_args()
+    print("%8s %8s %12s %12s" % ("stripes", "threads", "elapsed ms", "ops/sec"))
+    for result in run(args.stripes, args.threads, args.count, args.latency):
+        print("%8s %8s %12s %12s" % (
+            result["stripes"], result["threads"], result["elapsed_ms"], result["ops_per_sec"]
+        ))
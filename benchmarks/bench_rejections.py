@@ -0,0 +1,74 @@
+"""
+Benchmark of the rejected requests
+    # Time of a rejection reported by an exception, and by a result code
+    # 'invalid_pin': Pin() raising InvalidPin, and Pin.parse() returning None
+    # 'login_invalid_pin': find_accounts(Pin()) raising, and authenticate() returning INVALID_PIN
+    # 'login_throttled': find_accounts() raising for a throttled pin, and authenticate()
+    #   returning TOO_MANY_REQUESTS
+    # 'withdraw_insufficient': withdraw() returning INSUFFICIENT_BALANCE, for reference
+
+$ python3 -m benchmarks.bench_rejections
+"""
+import timeit
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.limits import Limits
+from simple_atm_controller.exceptions import AtmControllerException, InvalidPin
+
+INVALID_PIN_NUMBER = 1234
+
+
+def rejection_time(function, number=100_000, repeat=5):
+    """Best time of a call in nanoseconds"""
+    return min(timeit.repeat(function, number=number, repeat=repeat)) / number * 1e9
+
+
+def raising(function, *exceptions):
+    def call():
+        try:
+            function()
+        except exceptions:
+            pass
+    return call
+
+
+def cases():
+    controller = LedgerAtmController(Ledger([("00-01", "shino1025", 100)]))
+    # The clock never moves, so the pin stays throttled after its first request
+    throttled = LedgerAtmController(
+        Ledger([("00-01", "shino1025", 100)]), limits=Limits(pin_rate=1, pin_burst=1, clock=lambda: 0.0)
+    )
+    throttled.authenticate("00-01")
+    account = controller.find_accounts(Pin("00-01"))[0]
+    return [
+        ("invalid_pin",
+         raising(lambda: Pin(INVALID_PIN_NUMBER), InvalidPin),
+         lambda: Pin.parse(INVALID_PIN_NUMBER)),
+        ("login_invalid_pin",
+         raising(lambda: controller.find_accounts(Pin(INVALID_PIN_NUMBER)), InvalidPin),
+         lambda: controller.authenticate(INVALID_PIN_NUMBER)),
+        ("login_throttled",
+         raising(lambda: throttled.find_accounts(Pin("00-01")), AtmControllerException),
+         lambda: throttled.authenticate("00-01")),
+        ("withdraw_insufficient",
+         None,
+         lambda: controller.withdraw(account, 1_000)),
+    ]
+
+
+def run(number=100_000, repeat=5):
+    results = []
+    for name, exception_path, result_path in cases():
+        results.append({
+            "name": name,
+            "exception_ns": None if exception_path is None else
+            round(rejection_time(exception_path, number, repeat), 1),
+            "result_ns": round(rejection_time(result_path, number, repeat), 1),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    print("%-22s %14s %12s" % ("rejection", "exception ns", "result ns"))
+    for result in run():
+        print("%-22s %14s %12s" % (result["name"], result["exception_ns"], result["result_ns"]))
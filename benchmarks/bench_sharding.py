@@ -0,0 +1,86 @@
+"""
+Benchmark of the ShardedLedger
+    # ops/sec of LedgerAtmController over ShardedLedger, compared with the single process Ledger
+    # ShardedLedger is a partitioning layer: every query goes through the pipes of the controller's
+    #   process, so it's slower than a Ledger, and more shards don't make it faster
+    # 'withdraw': one withdraw() per operation, from 'clients' threads per shard.
+    #   The concurrent queries of a shard are combined into one message
+    # 'apply_batch': apply_batch() of 'batch' withdrawals, one round trip per shard for the reads
+    #   and one for the writes
+
+$ python3 -m benchmarks.bench_sharding --shards 1,2,4
+"""
+import argparse, os, time
+from threading import Thread
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.sharding import ShardedLedger
+from simple_atm_controller.account import Account
+from benchmarks.bench_controller import make_records, int_list, ACCOUNTS_PER_PIN
+
+MODES = ("withdraw", "apply_batch")
+
+
+def measure(model, threads, count, mode="withdraw", batch=1000):
+    controller = LedgerAtmController(model, locks=LockStripes(1024))
+    accounts = [
+        Account._trusted("P%09d" % (i // ACCOUNTS_PER_PIN), "A%09d" % i)
+        for i in range(count)
+    ]
+    chunks = [accounts[i::threads] for i in range(threads)]
+
+    def target(chunk):
+        if mode == "withdraw":
+            for account in chunk:
+                controller.withdraw(account, 1)
+        else:
+            for start in range(0, len(chunk), batch):
+                controller.apply_batch([(account, 1, "withdraw") for account in chunk[start:start + batch]])
+
+    workers = [Thread(target=target, args=(chunk,)) for chunk in chunks]
+    started = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return round(count / (time.perf_counter() - started), 1)
+
+
+def run(shards=(1, 2, 4), size=100_000, count=20_000, clients=4, batch=1000):
+    results = []
+    for mode in MODES:
+        results.append({
+            "mode": mode,
+            "model": "Ledger",
+            "shards": 0,
+            "threads": 1,
+            "ops_per_sec": measure(Ledger(make_records(size)), 1, count, mode, batch),
+        })
+        for shards_i in shards:
+            with ShardedLedger(shards_i, records=make_records(size)) as model:
+                threads = shards_i * clients
+                results.append({
+                    "mode": mode,
+                    "model": "ShardedLedger",
+                    "shards": shards_i,
+                    "threads": threads,
+                    "ops_per_sec": measure(model, threads, count, mode, batch),
+                })
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1].strip())
+    parser.add_argument("--shards", type=int_list, default=[1, 2, os.cpu_count() or 1],
+                        help="comma separated number of shards (default: 1,2,cpu_count)")
+    parser.add_argument("--size", type=int, default=100_000, help="number of accounts")
+    parser.add_argument("--count", type=int, default=20_000, help="number of withdrawals")
+    parser.add_argument("--clients", type=int, default=4, help="client threads per shard")
+    parser.add_argument("--batch", type=int, default=1000, help="withdrawals per apply_batch")
+    args = parser.parse_args()
+    print("cpu_count:", os.cpu_count())
+    print("%-12s %-14s %8s %8s %14s" % ("mode", "model", "shards", "threads", "ops/sec"))
+    for result in run(args.shards, args.size, args.count, args.clients, args.batch):
+        print("%-12s %-14s %8s %8s %14s" % (
+            result["mode"], result["model"], result["shards"], result["threads"], result["ops_per_sec"]
+        ))
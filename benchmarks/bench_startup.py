@@ -0,0 +1,54 @@
+"""
+Benchmark of the cold start of a worker process
+    # Wall time of a new interpreter running each script
+    # 'python' is the bare interpreter, for comparison
+    # 'import' imports the package, 'controller' imports the controller and the ledger,
+    # 'first_transaction' also runs find_accounts, get_valance and withdraw once
+
+$ python3 -m benchmarks.bench_startup
+"""
+import os, statistics, subprocess, sys, time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPTS = {
+    "python": "pass",
+    "import": "import simple_atm_controller",
+    "controller": "from simple_atm_controller.ledger import Ledger, LedgerAtmController",
+    "first_transaction": (
+        "from simple_atm_controller.ledger import Ledger, LedgerAtmController\n"
+        "from simple_atm_controller import Pin\n"
+        "controller = LedgerAtmController(Ledger([('00-01', 'shino1025', 100)]))\n"
+        "account = controller.find_accounts(Pin('00-01'))[0]\n"
+        "controller.get_valance(account)\n"
+        "controller.withdraw(account, 30)\n"
+    ),
+}
+
+
+def cold_start(script, repeat):
+    """Wall times (ms) of new interpreters running the script"""
+    environment = dict(os.environ, PYTHONPATH=ROOT)
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", script], env=environment, check=True)
+        times.append((time.perf_counter() - started) * 1000)
+    return times
+
+
+def run(repeat=20):
+    results = []
+    for name, script in SCRIPTS.items():
+        times = cold_start(script, repeat)
+        results.append({
+            "name": name,
+            "min_ms": round(min(times), 2),
+            "median_ms": round(statistics.median(times), 2),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    print("%-18s %12s %12s" % ("script", "min ms", "median ms"))
+    for result in run():
+        print("%-18s %12s %12s" % (result["name"], result["min_ms"], result["median_ms"]))
@@ -0,0 +1,84 @@
+"""
+Benchmark of the Pin/Account value objects
+    # Per object memory and construction time of Pin, Account and Account._trusted
+    # LegacyPin/LegacyAccount are the dict-backed objects before __slots__, for comparison
+
+$ python3 -m benchmarks.bench_value_objects
+"""
+import timeit, tracemalloc
+from simple_atm_controller.pin import Pin, PinDefaultRule, PinValidationRule
+from simple_atm_controller.account import Account, AccountDefaultRule, AccountValidationRule
+
+
+class LegacyPin:
+
+    def __init__(self, pin_number, rule=None):
+        rule = rule if rule is not None else PinDefaultRule()
+        if rule.__class__.__bases__[0] is not PinValidationRule:
+            raise TypeError
+        if rule.validate(pin_number) is not True:
+            raise ValueError
+        self._pin_number = pin_number
+
+    @property
+    def pin_number(self):
+        return self._pin_number
+
+
+class LegacyAccount:
+
+    def __init__(self, pin, account_id, rule=None):
+        rule = rule if rule is not None else AccountDefaultRule()
+        if not isinstance(pin, LegacyPin):
+            raise TypeError
+        if rule.__class__.__bases__[0] is not AccountValidationRule:
+            raise TypeError
+        if rule.validate(account_id) is not True:
+            raise ValueError
+        self._pin_number, self._account_id = pin.pin_number, account_id
+
+
+def memory_per_object(factory, count=10_000):
+    """Average allocated bytes of an object created by factory"""
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    objects = [factory() for _ in range(count)]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    size = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del objects
+    # Exclude the list holding the objects
+    return (size - 8 * count) / count
+
+
+def construction_time(factory, number=200_000, repeat=5):
+    """Best construction time of an object in nanoseconds"""
+    return min(timeit.repeat(factory, number=number, repeat=repeat)) / number * 1e9
+
+
+def run():
+    pin = Pin("00-01")
+    legacy_pin = LegacyPin("00-01")
+    cases = [
+        ("LegacyPin", lambda: LegacyPin("00-01")),
+        ("Pin", lambda: Pin("00-01")),
+        ("LegacyAccount", lambda: LegacyAccount(legacy_pin, "shino1025")),
+        ("Account", lambda: Account(pin, "shino1025")),
+        ("Account._trusted", lambda: Account._trusted("00-01", "shino1025")),
+    ]
+    results = []
+    for name, factory in cases:
+        results.append({
+            "name": name,
+            "bytes_per_object": round(memory_per_object(factory), 1),
+            "ns_per_object": round(construction_time(factory), 1),
+        })
+    return results
+
+
+if __name__ == '__main__':
+    print("%-18s %18s %16s" % ("object", "bytes/object", "ns/object"))
+    for result in run():
+        print("%-18s %18s %16s" % (
+            result["name"], result["bytes_per_object"], result["ns_per_object"]
+        ))
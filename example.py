@@ -1,7 +1,7 @@
 """
 Example Code
     # check_valance() : Check the balance for the entered account
-    # send_dollar() : Deposit and withdrawal sample code
+    # send_dollar() : Transfer sample code
 """
 import re
 from collections.abc import Iterable
@@ -32,8 +32,10 @@ class CustomPinNumberRule(PinValidationRule):
     - Write a rule to verify the pin number
     """
 
+    pattern = re.compile(r"\d{2}-\d{2}")
+
     def validate(self, pin_number) -> bool:
-        return bool(re.search(r"\d{2}-\d{2}", pin_number))
+        return bool(self.pattern.search(pin_number))
 
 
 def check_valance():
@@ -59,7 +61,7 @@ def check_valance():
 
 
 def send_dollar():
-    """Deposit and withdrawal sample code"""
+    """Transfer sample code"""
     print("Send Dollar Output >> shino1025 => shin102566")
     # Pin number verification and objectification
     pin = Pin("00-01", rule=CustomPinNumberRule())
@@ -69,11 +71,9 @@ def send_dollar():
     atm_controller = MyAtmController(CASH_BIN)
     src_id, tgt_id = atm_controller.find_accounts(pin)
 
-    # Deduct the amount from the sending account
-    # Increasing the amount in the receiving account
+    # Move the amount from the sending account to the receiving account
     sending_dollar = 30
-    atm_controller.withdraw(src_id, sending_dollar)
-    atm_controller.deposit(tgt_id, sending_dollar)
+    atm_controller.transfer(src_id, tgt_id, sending_dollar)
 
     # Print the current balance of the account
     CASH_BIN.print_all_records()
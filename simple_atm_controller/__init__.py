@@ -1,2 +1,25 @@
 __AUTHOR__ = "IML"
-__VERSION__ = "0.1.0"
\ No newline at end of file
+__VERSION__ = "0.1.0"
+
+# The submodules are imported on first access, so importing the package is instant
+_LAZY = {
+    "AtmController": "atm_controller",
+    "Pin": "pin",
+    "Account": "account",
+    "ResultCode": "results",
+}
+__all__ = list(_LAZY)
+
+
+def __getattr__(name):
+    module_name = _LAZY.get(name)
+    if module_name is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    value = getattr(import_module("." + module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(list(globals()) + __all__)
@@ -5,35 +5,64 @@ from .pin import Pin
 class Account:
     """
     The object that manages the account. Receives account_id and verifies the validity.
+    Account is read-only and hashable, so it can be used as a key of dict/set.
     """
-    def __init__(self, pin: Pin, account_id, rule=None):
-        self._pin_number, self._account_id = self._validate(
-            pin,
-            account_id,
-            rule if rule is not None else AccountDefaultRule()
-        )
-
-    def _validate(self, pin, account_id, rule):
+    __slots__ = ('_pin_number', '_account_id')
 
+    def __init__(self, pin: Pin, account_id, rule=None):
         if not isinstance(pin, Pin):
             raise InvalidPin(pin)
-
-        if rule.__class__.__bases__[0] is not AccountValidationRule:
+        if not self._check(account_id, rule if rule is not None else DEFAULT_ACCOUNT_RULE):
+            raise InvalidAccount(account_id)
+        self._pin_number = pin.pin_number
+        self._account_id = account_id
+
+    @classmethod
+    def parse(cls, pin: Pin, account_id, rule=None):
+        """
+        Return the Account, or None if the account_id is invalid, without raising InvalidAccount.
+        A pin that isn't a Pin or an invalid rule is a programming error, so it still raises.
+        """
+        if not isinstance(pin, Pin):
+            raise InvalidPin(pin)
+        if not cls._check(account_id, rule if rule is not None else DEFAULT_ACCOUNT_RULE):
+            return None
+        return cls._trusted(pin.pin_number, account_id)
+
+    @classmethod
+    def _trusted(cls, pin_number, account_id):
+        """
+        Create the account without validation.
+        Only for the account ids returned by the data model of the controller.
+        """
+        account = cls.__new__(cls)
+        account._pin_number = pin_number
+        account._account_id = account_id
+        return account
+
+    @staticmethod
+    def _check(account_id, rule):
+        if not is_account_rule(rule):
             raise InvalidValidationRule('AccountValidationRule')
 
         validation_result = rule.validate(account_id)
         if not isinstance(validation_result, bool):
             raise InvalidValidationRule('AccountValidationRule')
 
-        if validation_result is True:
-            return pin.pin_number, account_id
-
-        raise InvalidAccount(account_id)
+        return validation_result
 
     def __repr__(self):
         return f"Account(pin_number={self._pin_number}, " \
                f"account_id={self._account_id})"
 
+    def __eq__(self, other):
+        if not isinstance(other, Account):
+            return NotImplemented
+        return (self._pin_number, self._account_id) == (other._pin_number, other._account_id)
+
+    def __hash__(self):
+        return hash((self._pin_number, self._account_id))
+
     @property
     def pin_number(self):
         return self._pin_number
@@ -61,4 +90,35 @@ class AccountValidationRule(metaclass=ABCMeta):
 class AccountDefaultRule(AccountValidationRule):
 
     def validate(self, account_id) -> bool:
-        return isinstance(account_id, str)
\ No newline at end of file
+        return isinstance(account_id, str)
+
+
+class AccountRegexRule(AccountValidationRule):
+    """
+    Rule to validate account_id with a regular expression.
+    The pattern is compiled once when the rule is created.
+    If fullmatch is True, the whole account_id must match the pattern.
+    """
+
+    def __init__(self, pattern, flags=0, fullmatch=False):
+        import re
+        compiled = re.compile(pattern, flags)
+        self._match = compiled.fullmatch if fullmatch else compiled.search
+
+    def validate(self, account_id) -> bool:
+        return isinstance(account_id, str) and self._match(account_id) is not None
+
+
+DEFAULT_ACCOUNT_RULE = AccountDefaultRule()
+_ACCOUNT_RULE_CLASSES = {AccountDefaultRule, AccountRegexRule}
+
+
+def is_account_rule(rule) -> bool:
+    """Check the rule is an AccountValidationRule. The checked rule classes are cached."""
+    rule_class = type(rule)
+    if rule_class in _ACCOUNT_RULE_CLASSES:
+        return True
+    if issubclass(rule_class, AccountValidationRule):
+        _ACCOUNT_RULE_CLASSES.add(rule_class)
+        return True
+    return False
@@ -0,0 +1,87 @@
+from collections.abc import Iterable
+from abc import ABCMeta, abstractmethod
+from .pin import Pin
+from .account import Account
+from .atm_controller import (
+    validate_pin, validate_account, validate_dollar,
+    validate_find_accounts_result, validate_valance_result,
+    validate_conditional_update_result
+)
+from .results import SUCCESS, INSUFFICIENT_BALANCE
+
+
+class AsyncAtmController(metaclass=ABCMeta):
+    """
+    It is the asyncio version of AtmController.
+    The functions and the validation are the same as AtmController,
+    but the functions and the queries to the cash bin are coroutines.
+        - async def find_accounts_query(self, pin_number)
+        - async def get_valance_query(self, pin_number, account_id)
+        - async def update_valance_query(self, pin_number, account_id, dollar)
+        - async def conditional_update_query(self, pin_number, account_id, dollar) (Optional)
+
+    Other coroutines can run while withdraw() waits for the queries,
+    so the withdrawals of the same account can interleave between
+    get_valance_query and update_valance_query.
+    Override conditional_update_query to withdraw in a single operation of the data model.
+    """
+
+    def __init__(self, model=None):
+        self.model = model
+        self._conditional_update = (
+            type(self).conditional_update_query
+            is not AsyncAtmController.conditional_update_query
+        )
+
+    async def find_accounts(self, pin: Pin) -> list:
+        validate_pin(pin)
+        pin_number = pin.pin_number
+        results = await self.find_accounts_query(pin_number)
+        validate_find_accounts_result(results)
+        return [
+            Account._trusted(pin_number, account_id) for account_id in results
+        ]
+
+    async def get_valance(self, account: Account) -> int:
+        validate_account(account)
+        result = await self.get_valance_query(*account.items)
+        validate_valance_result(result)
+        return result
+
+    async def deposit(self, account: Account, dollar: int):
+        validate_account(account)
+        validate_dollar(dollar)
+        await self.update_valance_query(*account.items, dollar)
+
+    async def withdraw(self, account: Account, dollar: int):
+        validate_account(account, "account_id", "AccountId")
+        validate_dollar(dollar)
+        if self._conditional_update:
+            result = await self.conditional_update_query(*account.items, dollar)
+            validate_conditional_update_result(result)
+            return SUCCESS if result else INSUFFICIENT_BALANCE
+        if dollar <= await self.get_valance(account):
+            await self.update_valance_query(*account.items, -dollar)
+            return SUCCESS
+        else:
+            return INSUFFICIENT_BALANCE
+
+    @abstractmethod
+    async def find_accounts_query(self, pin_number) -> Iterable:
+        pass
+
+    @abstractmethod
+    async def get_valance_query(self, pin_number, account_id) -> int:
+        pass
+
+    @abstractmethod
+    async def update_valance_query(self, pin_number, account_id, dollar):
+        pass
+
+    async def conditional_update_query(self, pin_number, account_id, dollar) -> bool:
+        """
+        (Optional) Decrease the balance by dollar only if the balance is enough,
+        in a single operation of the data model.
+        Returns True if the balance was decreased, otherwise False.
+        """
+        raise NotImplementedError
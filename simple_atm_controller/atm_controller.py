@@ -1,10 +1,104 @@
+import threading
 from collections.abc import Iterable
 from abc import ABCMeta, abstractmethod
+from importlib import import_module
 from .pin import Pin
 from .account import Account
 from .exceptions import (
     AtmControllerException, AtmControllerInputException, AtmControllerQueryException
 )
+from .results import (
+    ResultCode, SUCCESS, INSUFFICIENT_BALANCE, INSUFFICIENT_CASH, UNKNOWN_DESTINATION
+)
+
+
+# The rejections of authenticate
+PIN_REJECTED = (ResultCode.INVALID_PIN, None)
+
+DEPOSIT = "deposit"
+WITHDRAW = "withdraw"
+
+# The optional components and their classes, imported only when they are passed to the controller
+OPTIONS = {
+    "locks": ("locks", "LockStripes"),
+    "valance_cache": ("cache", "LRUCache"),
+    "accounts_cache": ("cache", "LRUCache"),
+    "instrumentation": ("instrumentation", "Instrumentation"),
+    "journal": ("journal", "Journal"),
+    "coalescer": ("coalescing", "QueryCoalescer"),
+    "cash_inventory": ("cash", "CashInventory"),
+    "limits": ("limits", "Limits"),
+    "history": ("history", "TransactionHistory"),
+}
+NOT_CACHED = object()
+
+
+def validate_pin(pin):
+    if not isinstance(pin, Pin):
+        raise AtmControllerInputException("pin", "Pin")
+
+
+def validate_account(account, param="account", valid_type="Account"):
+    if not isinstance(account, Account):
+        raise AtmControllerInputException(param, valid_type)
+
+
+def validate_dollar(dollar):
+    if not isinstance(dollar, int):
+        raise AtmControllerInputException("dollar", "int")
+    if dollar < 0:
+        raise AtmControllerException("Negative values cannot be entered for 'dollar'")
+
+
+def validate_operation(operation):
+    if not (isinstance(operation, (tuple, list)) and len(operation) == 3):
+        raise AtmControllerInputException("operation", "(account, dollar, kind)")
+    account, dollar, kind = operation
+    validate_account(account)
+    validate_dollar(dollar)
+    if kind not in (DEPOSIT, WITHDRAW):
+        raise AtmControllerInputException("kind", f"'{DEPOSIT}' or '{WITHDRAW}'")
+
+
+def validate_change(change):
+    if not (isinstance(change, (tuple, list)) and len(change) == 3):
+        raise AtmControllerInputException("change", "(pin_number, account_id, dollar)")
+    dollar = change[2]
+    if not isinstance(dollar, int):
+        raise AtmControllerInputException("dollar", "int")
+
+
+def validate_option(option, param, valid_type):
+    if not (option is None or isinstance(option, valid_type)):
+        raise AtmControllerInputException(param, valid_type.__name__)
+
+
+def validate_component(option, param):
+    if option is not None:
+        module_name, class_name = OPTIONS[param]
+        module = import_module("." + module_name, __package__)
+        validate_option(option, param, getattr(module, class_name))
+
+
+def validate_find_accounts_result(results):
+    # Most data models return a list, which skips the ABC check of Iterable
+    if type(results) is not list and not isinstance(results, Iterable):
+        raise AtmControllerQueryException('find_accounts_query', 'Iterable')
+
+
+def validate_valance_result(result):
+    if not (isinstance(result, int) or result is None):
+        raise AtmControllerQueryException('get_valance_query', 'int')
+
+
+def validate_many_result(results, keys, query_name):
+    if not (isinstance(results, (list, tuple)) and len(results) == len(keys)):
+        raise AtmControllerQueryException(query_name, 'list of a result per key')
+
+
+def validate_conditional_update_result(result, query_name='conditional_update_query'):
+    if not isinstance(result, bool):
+        raise AtmControllerQueryException(query_name, 'bool')
 
 
 class AtmController(metaclass=ABCMeta):
@@ -14,6 +108,10 @@ class AtmController(metaclass=ABCMeta):
         - Receive pin and search for registered account.(find_accounts)
         - Receives an account and returns the balance of the account.(get_valance)
         - Receives an account and (withdraw) or (deposit) dollars from that account.
+        - Receives a list of deposits/withdrawals and applies them at once.(apply_batch)
+        - Receives a list of balance changes computed by the data model and applies them.(apply_changes)
+        - Receives the rows/dollars arrays of a columnar data model and applies them at once.(apply_deltas)
+        - Moves dollars from an account to another account.(transfer)
 
     In order to use the controller,
     you need to define the access method to the cash bin to the controller.
@@ -21,48 +119,591 @@ class AtmController(metaclass=ABCMeta):
         - Query to search account through pin
         - Query to check the balance of the account
         - Query to change the balance of that account
+
+    Optionally, the controller uses the following query if it is overridden.
+        - Query to decrease the balance only if the balance is enough (conditional_update_query)
+        - Query to change the balances of several accounts at once (bulk_update_valance_query)
+        - Queries to search/check several pins/accounts at once
+          (find_accounts_query_many, get_valance_query_many)
+        - Query to move dollars between accounts in a single operation (transfer_query)
+
+    If the controller is shared by several threads, pass LockStripes as 'locks'.
+    Then deposit/withdraw of the same account are serialized by the lock of that account.
+
+    To skip repeated get_valance_query of the same account, pass LRUCache as 'valance_cache'.
+    The cached balance of an account is invalidated when the controller changes its balance.
+    To skip repeated find_accounts_query of the same pin, pass LRUCache as 'accounts_cache'.
+    When an account is opened or closed, call invalidate_accounts() with its pin.
+
+    To measure the latency and the errors of the functions and the queries,
+    pass Instrumentation as 'instrumentation'.
+
+    To merge the concurrent find_accounts_query/get_valance_query of several threads
+    into one *_many query, pass QueryCoalescer as 'coalescer'.
+
+    To dispense notes from the cash cassettes of the ATM, pass CashInventory as 'cash_inventory'.
+    withdraw() reserves the notes before debiting the account,
+    and fails with 'insufficient cash' if the cassettes can't pay the amount.
+    apply_batch() only changes the balances, and dispenses no notes.
+
+    To limit the daily withdrawal of an account and throttle the requests of a pin,
+    pass Limits as 'limits'. The limits are checked before querying the data model.
+
+    To answer mini_statement() and transactions() of an account,
+    pass TransactionHistory as 'history'. Every deposit/withdrawal is appended to it.
+
+    To keep the balance changes durable, pass Journal as 'journal'.
+    Every balance change of the controller is appended to the journal.
     """
 
-    def __init__(self, model=None):
+    OPERATIONS = (
+        'find_accounts', 'authenticate', 'get_valance', 'prefetch_valances', 'deposit', 'withdraw',
+        'apply_batch', 'apply_changes', 'apply_deltas', 'transfer'
+    )
+    QUERIES = (
+        'find_accounts_query', 'get_valance_query', 'update_valance_query',
+        'conditional_update_query', 'bulk_update_valance_query',
+        'find_accounts_query_many', 'get_valance_query_many', 'transfer_query',
+        'apply_deltas_query', 'row_keys_query'
+    )
+
+    def __init__(self, model=None, locks=None, valance_cache=None, accounts_cache=None,
+                 instrumentation=None, journal=None, coalescer=None, cash_inventory=None,
+                 limits=None, history=None):
+        validate_component(locks, "locks")
+        validate_component(valance_cache, "valance_cache")
+        validate_component(accounts_cache, "accounts_cache")
+        validate_component(instrumentation, "instrumentation")
+        validate_component(journal, "journal")
+        validate_component(coalescer, "coalescer")
+        validate_component(cash_inventory, "cash_inventory")
+        validate_component(limits, "limits")
+        validate_component(history, "history")
         self.model = model
+        self._locks = locks
+        self._valance_cache = valance_cache
+        self._accounts_cache = accounts_cache
+        self._journal = journal
+        self._cash_inventory = cash_inventory
+        self._limits = limits
+        self._history = history
+        # (pin_number, account_id, dollar) owed back to the src of the failed transfers
+        self.unsettled = []
+        self._unsettled_lock = threading.Lock()
+        self._conditional_update = self._is_overridden('conditional_update_query')
+        self._bulk_update = self._is_overridden('bulk_update_valance_query')
+        self._transfer_query = self._is_overridden('transfer_query')
+        self._valance_many = self._is_overridden('get_valance_query_many')
+        if instrumentation is not None:
+            self._instrument(instrumentation)
+        self._accounts_batcher = None
+        self._valance_batcher = None
+        if coalescer is not None:
+            if self._is_overridden('find_accounts_query_many'):
+                self._accounts_batcher = coalescer.batcher(self._find_accounts_many)
+            if self._is_overridden('get_valance_query_many'):
+                self._valance_batcher = coalescer.batcher(self._get_valance_many)
+
+    def _is_overridden(self, method_name):
+        return getattr(type(self), method_name) is not getattr(AtmController, method_name)
 
-    def find_accounts(self, pin: Pin) -> list:
-        if not isinstance(pin, Pin):
-            raise AtmControllerInputException("pin", "Pin")
-        results = self.find_accounts_query(pin.pin_number)
-        if not isinstance(results, Iterable):
-            raise AtmControllerQueryException('find_accounts_query', 'Iterable')
-        return [Account(pin, account_id) for account_id in results]
+    def _instrument(self, instrumentation):
+        # Instance attributes shadow the methods, so the controller calls the wrapped ones
+        for name in self.OPERATIONS + self.QUERIES:
+            setattr(self, name, instrumentation.wrap(name, getattr(self, name)))
+
+    def find_accounts(self, pin: Pin, terminal=None) -> list:
+        """
+        Return the accounts of the pin.
+        With limits, 'terminal' identifies where the request comes from,
+        and its lookups of unknown pins are throttled.
+        """
+        validate_pin(pin)
+        if self._limits is None:
+            return self._lookup_accounts(pin)
+        code, accounts = self._throttled_lookup(pin, terminal)
+        if accounts is None:
+            raise AtmControllerException(f"The pin is rejected by the limits ({code})", code)
+        return accounts
+
+    def authenticate(self, pin_number, rule=None, terminal=None) -> tuple:
+        """
+        Find the accounts of a pin number as it was entered, without raising for the rejections.
+        Returns (ResultCode.SUCCESS, accounts), or (ResultCode.INVALID_PIN, None)
+        / (ResultCode.TOO_MANY_REQUESTS, None) / (ResultCode.LIMITS_FULL, None) for a rejected pin.
+        An invalid rule still raises InvalidValidationRule.
+        """
+        pin = Pin.parse(pin_number, rule)
+        if pin is None:
+            return PIN_REJECTED
+        if self._limits is None:
+            return ResultCode.SUCCESS, self._lookup_accounts(pin)
+        return self._throttled_lookup(pin, terminal)
+
+    def _throttled_lookup(self, pin, terminal):
+        # A pin gets a token bucket once it's known to have accounts,
+        # the lookups of the other pins are counted against the terminal
+        limits = self._limits
+        result = limits.allow_seen_pin(pin.pin_number)
+        if result is None:
+            result = limits.allow_terminal(terminal)
+            if result[0]:
+                accounts = self._lookup_accounts(pin)
+                if not accounts:
+                    limits.unknown_pin(terminal)
+                    return ResultCode.SUCCESS, accounts
+                result = limits.allow_pin(pin.pin_number)
+                if result[0]:
+                    return ResultCode.SUCCESS, accounts
+        elif result[0]:
+            return ResultCode.SUCCESS, self._lookup_accounts(pin)
+        return result[1], None
+
+    def _lookup_accounts(self, pin):
+        if self._accounts_cache is None:
+            return self._find_accounts(pin)
+        accounts = self._accounts_cache.get(pin.pin_number, NOT_CACHED)
+        if accounts is NOT_CACHED:
+            accounts = tuple(self._find_accounts(pin))
+            self._accounts_cache.set(pin.pin_number, accounts)
+        return list(accounts)
+
+    def _find_accounts(self, pin):
+        pin_number = pin.pin_number
+        if self._accounts_batcher is None:
+            results = self.find_accounts_query(pin_number)
+            validate_find_accounts_result(results)
+        else:
+            results = self._accounts_batcher.call(pin_number)
+        return [
+            Account._trusted(pin_number, account_id) for account_id in results
+        ]
+
+    def _find_accounts_many(self, pin_numbers):
+        results = self.find_accounts_query_many(pin_numbers)
+        validate_many_result(results, pin_numbers, 'find_accounts_query_many')
+        for result in results:
+            validate_find_accounts_result(result)
+        return results
+
+    def invalidate_accounts(self, pin: Pin):
+        """Drop the cached accounts of the pin, after an account of the pin is opened or closed"""
+        validate_pin(pin)
+        if self._accounts_cache is not None:
+            self._accounts_cache.invalidate(pin.pin_number)
 
     def get_valance(self, account: Account) -> int:
-        if not isinstance(account, Account):
-            raise AtmControllerInputException("account", "Account")
-        result = self.get_valance_query(*account.items)
-        if not (isinstance(result, int) or result is None):
-            raise AtmControllerQueryException('get_valance_query', 'int')
+        validate_account(account)
+        return self._get_valance(account.items)
+
+    def _get_valance(self, key):
+        if self._valance_cache is None:
+            return self._query_valance(key)
+        result = self._valance_cache.get(key, NOT_CACHED)
+        if result is NOT_CACHED:
+            # A change during the query invalidates the key, then the stale result isn't cached
+            generation = self._valance_cache.generation(key)
+            result = self._query_valance(key)
+            self._valance_cache.set(key, result, generation)
         return result
 
+    def _query_valance(self, key):
+        if self._valance_batcher is not None:
+            return self._valance_batcher.call(key)
+        result = self.get_valance_query(*key)
+        validate_valance_result(result)
+        return result
+
+    def _get_valance_many(self, keys):
+        results = self.get_valance_query_many(keys)
+        validate_many_result(results, keys, 'get_valance_query_many')
+        for result in results:
+            validate_valance_result(result)
+        return results
+
+    def prefetch_valances(self, accounts) -> list:
+        """
+        Return the balances of the accounts, read with one get_valance_query_many.
+        Returns None if the controller doesn't override get_valance_query_many,
+        then read the balances one by one with get_valance.
+        """
+        for account in accounts:
+            validate_account(account)
+        if not self._valance_many:
+            return None
+        if not accounts:
+            return []
+        return self._get_valance_many([account.items for account in accounts])
+
     def deposit(self, account: Account, dollar: int):
-        if not isinstance(account, Account):
-            raise AtmControllerInputException("account", "Account")
-        if not isinstance(dollar, int):
-            raise AtmControllerInputException("dollar", "int")
-        if dollar < 0:
-            raise AtmControllerException("Negative values cannot be entered for 'dollar'")
-        self.update_valance_query(*account.items, dollar)
+        validate_account(account)
+        validate_dollar(dollar)
+        if self._locks is None:
+            self._deposit(account, dollar)
+        else:
+            with self._locks.lock(account.items):
+                self._deposit(account, dollar)
+        if self._journal is not None and self._journal.snapshot_due:
+            self._checkpoint(due_only=True)
 
     def withdraw(self, account: Account, dollar: int):
-        if not isinstance(account, Account):
-            raise AtmControllerInputException("account_id", "AccountId")
-        if not isinstance(dollar, int):
-            raise AtmControllerInputException("dollar", "int")
-        if dollar < 0:
-            raise AtmControllerException("Negative values cannot be entered for 'dollar'")
-        if dollar <= self.get_valance(account):
-            self.update_valance_query(*account.items, -dollar)
-            return True, "success"
+        validate_account(account, "account_id", "AccountId")
+        validate_dollar(dollar)
+        if self._locks is None:
+            result = self._withdraw(account, dollar)
+        else:
+            with self._locks.lock(account.items):
+                result = self._withdraw(account, dollar)
+        if self._journal is not None and self._journal.snapshot_due:
+            self._checkpoint(due_only=True)
+        return result
+
+    def apply_batch(self, operations) -> list:
+        """
+        Apply a list of (account, dollar, kind) operations, kind is 'deposit' or 'withdraw'.
+        All operations are validated before anything is applied,
+        and the net change of each account is written once.
+        Returns the (status, msg) of each operation like deposit/withdraw.
+        """
+        operations = list(operations)
+        for operation in operations:
+            validate_operation(operation)
+        if self._locks is None:
+            results = self._apply_batch(operations)
         else:
-            return False, "insufficient balance"
+            with self._locks.holding(account.items for account, _, _ in operations):
+                results = self._apply_batch(operations)
+        if self._journal is not None and self._journal.snapshot_due:
+            self._checkpoint(due_only=True)
+        return results
+
+    def apply_changes(self, changes) -> int:
+        """
+        Apply a list of (pin_number, account_id, dollar) balance changes computed by the data model,
+        e.g. the interest or the fees of NumpyLedger. 'dollar' is added to the balance, and may be negative.
+        No balance is checked: a change is applied even if the balance becomes negative.
+        The changes are journaled, recorded in the history and invalidated in the cache like deposits/withdrawals.
+        Returns the number of changes applied.
+        """
+        changes = list(changes)
+        for change in changes:
+            validate_change(change)
+        changes = [change for change in changes if change[2]]
+        if self._locks is None:
+            count = self._apply_changes(changes)
+        else:
+            with self._locks.holding(change[:2] for change in changes):
+                count = self._apply_changes(changes)
+        if self._journal is not None and self._journal.snapshot_due:
+            self._checkpoint(due_only=True)
+        return count
+
+    def apply_deltas(self, rows, dollars) -> int:
+        """
+        Apply the changes of a columnar data model given as arrays (e.g. NumpyLedger.interest_deltas()):
+        'dollars[i]' is added to the balance of the row 'rows[i]', by apply_deltas_query at once.
+        Like apply_changes, no balance is checked. Every lock is held, the balance cache is cleared,
+        and the changes are journaled as one record and recorded in the history.
+        Returns the number of changes applied.
+        """
+        if len(rows) != len(dollars):
+            raise AtmControllerInputException("dollars", "one dollar per row")
+        if self._locks is None:
+            count = self._apply_deltas(rows, dollars)
+        else:
+            with self._locks.holding():
+                count = self._apply_deltas(rows, dollars)
+        if self._journal is not None and self._journal.snapshot_due:
+            self._checkpoint(due_only=True)
+        return count
+
+    def _apply_deltas(self, rows, dollars):
+        if not len(rows):
+            return 0
+        self.apply_deltas_query(rows, dollars)
+        if self._valance_cache is not None:
+            self._valance_cache.clear()
+        if self._journal is not None or self._history is not None:
+            pin_numbers, account_ids = self.row_keys_query(rows)
+            if self._journal is not None:
+                self._journal.append_changes(pin_numbers, account_ids, dollars)
+            if self._history is not None:
+                for pin_number, account_id, dollar in zip(pin_numbers, account_ids, map(int, dollars)):
+                    if dollar > 0:
+                        self._history.append((pin_number, account_id), DEPOSIT, dollar)
+                    else:
+                        self._history.append((pin_number, account_id), WITHDRAW, -dollar)
+        return len(rows)
+
+    def transfer(self, src: Account, dst: Account, dollar: int):
+        """
+        Move dollars from the 'src' account to the 'dst' account.
+        With transfer_query, it's a single operation of the data model.
+        Otherwise, the dollars are withdrawn from 'src' and then deposited to 'dst':
+        4 queries (dst check, src balance, 2 updates), 3 with conditional_update_query.
+        Returns the (status, msg) like withdraw, (False, "unknown destination") if 'dst' doesn't exist.
+        If the deposit to 'dst' fails, the dollars are given back to 'src' and the error is raised.
+        A credit back that fails too is kept in 'unsettled' (and journaled as a withdrawal from 'src'),
+        to retry with settle().
+        A transfer dispenses no notes and isn't counted in the withdrawal limits.
+        """
+        validate_account(src, "src")
+        validate_account(dst, "dst")
+        validate_dollar(dollar)
+        if src == dst:
+            raise AtmControllerException("Cannot transfer to the same account")
+        if self._locks is None:
+            result = self._transfer(src, dst, dollar)
+        else:
+            # Lock in a fixed order, so opposite transfers don't deadlock
+            with self._locks.holding([src.items, dst.items]):
+                result = self._transfer(src, dst, dollar)
+        if self._journal is not None and self._journal.snapshot_due:
+            self._checkpoint(due_only=True)
+        return result
+
+    def _transfer(self, src, dst, dollar):
+        if self._transfer_query:
+            result = self.transfer_query(*src.items, *dst.items, dollar)
+            validate_conditional_update_result(result, 'transfer_query')
+            if not result:
+                # The data model refuses an unknown dst too
+                if self._query_valance(dst.items) is None:
+                    return UNKNOWN_DESTINATION
+                return INSUFFICIENT_BALANCE
+        else:
+            # update_valance_query of an unknown dst would lose the dollars withdrawn from src
+            if self._query_valance(dst.items) is None:
+                return UNKNOWN_DESTINATION
+            if self._conditional_update:
+                result = self.conditional_update_query(*src.items, dollar)
+                validate_conditional_update_result(result)
+                if not result:
+                    return INSUFFICIENT_BALANCE
+            else:
+                if dollar > self._query_valance(src.items):
+                    return INSUFFICIENT_BALANCE
+                self.update_valance_query(*src.items, -dollar)
+            try:
+                self.update_valance_query(*dst.items, dollar)
+            except BaseException:
+                self._credit_back(src.items, dollar)
+                raise
+        if self._valance_cache is not None:
+            self._valance_cache.invalidate(src.items)
+            self._valance_cache.invalidate(dst.items)
+        if self._journal is not None:
+            self._journal.append_many([
+                (self._journal.WITHDRAW, *src.items, dollar), (self._journal.DEPOSIT, *dst.items, dollar)
+            ])
+        if self._history is not None:
+            self._history.append(src.items, WITHDRAW, dollar)
+            self._history.append(dst.items, DEPOSIT, dollar)
+        return SUCCESS
+
+    def _credit_back(self, key, dollar):
+        # Give the dollars of a failed transfer back to the src account
+        try:
+            self.update_valance_query(*key, dollar)
+        except Exception:
+            with self._unsettled_lock:
+                self.unsettled.append((*key, dollar))
+            # The src account stays debited until settle(), so the journal replays the debit
+            if self._journal is not None:
+                self._journal.append(self._journal.WITHDRAW, *key, dollar)
+        finally:
+            if self._valance_cache is not None:
+                self._valance_cache.invalidate(key)
+
+    def settle(self) -> int:
+        """Retry the credits back of the failed transfers in 'unsettled'. Returns the number left"""
+        with self._unsettled_lock:
+            credits, self.unsettled = self.unsettled, []
+        for pin_number, account_id, dollar in credits:
+            if self._locks is None:
+                self._settle((pin_number, account_id), dollar)
+            else:
+                with self._locks.holding([(pin_number, account_id)]):
+                    self._settle((pin_number, account_id), dollar)
+        return len(self.unsettled)
+
+    def _settle(self, key, dollar):
+        try:
+            self.update_valance_query(*key, dollar)
+        except Exception:
+            with self._unsettled_lock:
+                self.unsettled.append((*key, dollar))
+            return
+        finally:
+            if self._valance_cache is not None:
+                self._valance_cache.invalidate(key)
+        if self._journal is not None:
+            self._journal.append(self._journal.DEPOSIT, *key, dollar)
+
+    def mini_statement(self, account: Account, count=10) -> list:
+        """Return the last 'count' transactions of the account, the oldest first"""
+        validate_account(account)
+        if not isinstance(count, int) or count < 0:
+            raise AtmControllerInputException("count", "non-negative int")
+        return self._get_history().last(account.items, count)
+
+    def transactions(self, account: Account, start=None, end=None) -> list:
+        """Return the transactions of the account from 'start' to 'end' (timestamps), the oldest first"""
+        validate_account(account)
+        for param, value in [("start", start), ("end", end)]:
+            if not (value is None or isinstance(value, (int, float))):
+                raise AtmControllerInputException(param, "timestamp")
+        return self._get_history().between(account.items, start, end)
+
+    def _get_history(self):
+        if self._history is None:
+            raise AtmControllerException("The controller has no transaction history")
+        return self._history
+
+    def checkpoint(self):
+        """
+        Take a snapshot of the data model into the journal.
+        If the controller has locks, balance changes wait until the snapshot is done.
+        """
+        if self._journal is None:
+            raise AtmControllerException("The controller has no journal to checkpoint")
+        self._checkpoint()
+
+    def _checkpoint(self, due_only=False):
+        if self._locks is None:
+            self._snapshot(due_only)
+        else:
+            with self._locks.holding():
+                self._snapshot(due_only)
+
+    def _snapshot(self, due_only):
+        # Another thread may have taken the snapshot while waiting for the locks
+        if not due_only or self._journal.snapshot_due:
+            self._journal.snapshot(self.model)
+
+    def _apply_batch(self, operations):
+        results = []
+        valances = {}
+        if self._valance_many:
+            # Read the balances of the withdrawals in one query
+            keys = list(dict.fromkeys(account.items for account, _, kind in operations if kind == WITHDRAW))
+            if keys:
+                valances = dict(zip(keys, self._get_valance_many(keys)))
+        changes = {}
+        applied = []
+        for account, dollar, kind in operations:
+            key = account.items
+            change = changes.get(key, 0)
+            if kind == DEPOSIT:
+                changes[key] = change + dollar
+                results.append(SUCCESS)
+                applied.append((key, kind, dollar))
+                continue
+            if key not in valances:
+                valances[key] = self._query_valance(key)
+            valance = valances[key]
+            if valance is not None and dollar <= valance + change:
+                changes[key] = change - dollar
+                results.append(SUCCESS)
+                applied.append((key, kind, dollar))
+            else:
+                results.append(INSUFFICIENT_BALANCE)
+
+        self._write_changes([(*key, dollar) for key, dollar in changes.items() if dollar])
+        if self._history is not None:
+            for key, kind, dollar in applied:
+                self._history.append(key, kind, dollar)
+        return results
+
+    def _write_changes(self, changes):
+        # Write the (pin_number, account_id, dollar) changes, and journal them in one group
+        if self._bulk_update:
+            self.bulk_update_valance_query(changes)
+        else:
+            for change in changes:
+                self.update_valance_query(*change)
+        if self._valance_cache is not None:
+            for pin_number, account_id, _ in changes:
+                self._valance_cache.invalidate((pin_number, account_id))
+        if self._journal is not None:
+            journal = self._journal
+            journal.append_many([
+                (journal.DEPOSIT, pin_number, account_id, dollar) if dollar > 0 else
+                (journal.WITHDRAW, pin_number, account_id, -dollar)
+                for pin_number, account_id, dollar in changes
+            ])
+
+    def _apply_changes(self, changes):
+        self._write_changes(changes)
+        if self._history is not None:
+            for pin_number, account_id, dollar in changes:
+                if dollar > 0:
+                    self._history.append((pin_number, account_id), DEPOSIT, dollar)
+                else:
+                    self._history.append((pin_number, account_id), WITHDRAW, -dollar)
+        return len(changes)
+
+    def _deposit(self, account, dollar):
+        self.update_valance_query(*account.items, dollar)
+        if self._valance_cache is not None:
+            self._valance_cache.invalidate(account.items)
+        if self._journal is not None:
+            self._journal.append(self._journal.DEPOSIT, *account.items, dollar)
+        if self._history is not None:
+            self._history.append(account.items, DEPOSIT, dollar)
+
+    def _withdraw(self, account, dollar):
+        if self._limits is None:
+            return self._dispense(account, dollar)
+        result = self._limits.allow_pin(account.pin_number)
+        if not result[0]:
+            return result
+        result = self._limits.reserve(account.items, dollar)
+        if not result[0]:
+            return result
+        try:
+            result = self._dispense(account, dollar)
+        except BaseException:
+            self._limits.release(account.items, dollar)
+            raise
+        if not result[0]:
+            self._limits.release(account.items, dollar)
+        return result
+
+    def _dispense(self, account, dollar):
+        if self._cash_inventory is None:
+            return self._debit(account, dollar)
+        notes = self._cash_inventory.reserve(dollar)
+        if notes is None:
+            return INSUFFICIENT_CASH
+        try:
+            result = self._debit(account, dollar)
+        except BaseException:
+            self._cash_inventory.release(notes)
+            raise
+        if result[0]:
+            self._cash_inventory.dispense(notes)
+        else:
+            self._cash_inventory.release(notes)
+        return result
+
+    def _debit(self, account, dollar):
+        if self._conditional_update:
+            result = self.conditional_update_query(*account.items, dollar)
+            validate_conditional_update_result(result)
+            if not result:
+                return INSUFFICIENT_BALANCE
+        else:
+            if dollar > self._query_valance(account.items):
+                return INSUFFICIENT_BALANCE
+            self.update_valance_query(*account.items, -dollar)
+        if self._valance_cache is not None:
+            self._valance_cache.invalidate(account.items)
+        if self._journal is not None:
+            self._journal.append(self._journal.WITHDRAW, *account.items, dollar)
+        if self._history is not None:
+            self._history.append(account.items, WITHDRAW, dollar)
+        return SUCCESS
 
     @abstractmethod
     def find_accounts_query(self, pin_number) -> Iterable:
@@ -75,3 +716,54 @@ class AtmController(metaclass=ABCMeta):
     @abstractmethod
     def update_valance_query(self, pin_number, account_id, dollar):
         pass
+
+    def conditional_update_query(self, pin_number, account_id, dollar) -> bool:
+        """
+        (Optional) Decrease the balance by dollar only if the balance is enough,
+        in a single operation of the data model.
+        Returns True if the balance was decreased, otherwise False.
+        """
+        raise NotImplementedError
+
+    def bulk_update_valance_query(self, changes):
+        """
+        (Optional) Change the balances of several accounts at once.
+        'changes' is a list of (pin_number, account_id, dollar).
+        """
+        raise NotImplementedError
+
+    def find_accounts_query_many(self, pin_numbers) -> list:
+        """
+        (Optional) Search the accounts of several pins at once.
+        Returns a list of the account IDs of each pin, in the order of 'pin_numbers'.
+        """
+        raise NotImplementedError
+
+    def get_valance_query_many(self, keys) -> list:
+        """
+        (Optional) Check the balances of several accounts at once.
+        'keys' is a list of (pin_number, account_id).
+        Returns a list of the balance of each account, in the order of 'keys'.
+        """
+        raise NotImplementedError
+
+    def transfer_query(self, src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar) -> bool:
+        """
+        (Optional) Move dollars from the src account to the dst account,
+        only if the balance of the src account is enough, in a single operation of the data model.
+        Returns True if the dollars were moved, otherwise False.
+        """
+        raise NotImplementedError
+
+    def apply_deltas_query(self, rows, dollars):
+        """
+        (Optional, for apply_deltas) Add 'dollars[i]' to the balance of the row 'rows[i]' of the data model.
+        """
+        raise NotImplementedError
+
+    def row_keys_query(self, rows) -> tuple:
+        """
+        (Optional, for apply_deltas with a journal or a history)
+        Returns the (pin_numbers, account_ids) lists of the rows of the data model.
+        """
+        raise NotImplementedError
@@ -0,0 +1,91 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from .exceptions import AtmControllerInputException
+
+MISSING = object()
+GENERATION_STRIPES = 256
+
+
+class LRUCache:
+    """
+    Bounded cache used by the controller to skip repeated queries.
+    When the cache is full, the least recently used item is evicted.
+    If ttl(seconds) is given, an item expires after ttl from when it was stored.
+    The number of hits and misses is counted to size the cache.
+
+    To fill the cache from a query without a lock, take generation(key) before the query
+    and pass it to set(): if the key was invalidated meanwhile, the value is stale and isn't stored.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None):
+        if not isinstance(maxsize, int) or maxsize < 1:
+            raise AtmControllerInputException("maxsize", "positive int")
+        if not (ttl is None or (isinstance(ttl, (int, float)) and ttl > 0)):
+            raise AtmControllerInputException("ttl", "positive number")
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        # Bumped by invalidate(), striped by the hash of the key
+        self._generations = [0] * GENERATION_STRIPES
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __repr__(self):
+        return f"LRUCache(maxsize={self._maxsize}, ttl={self._ttl}, " \
+               f"hits={self.hits}, misses={self.misses})"
+
+    def get(self, key, default=MISSING):
+        """Return the cached value of the key, or default if it isn't cached"""
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                value, expires = item
+                if expires is None or monotonic() < expires:
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+            self.misses += 1
+            return default
+
+    def generation(self, key):
+        """The invalidation generation of the key, to pass to set()"""
+        return self._generations[hash(key) % GENERATION_STRIPES]
+
+    def set(self, key, value, generation=None):
+        """
+        Store the value of the key.
+        If 'generation' is given and the key was invalidated since it was taken, nothing is stored.
+        """
+        expires = None if self._ttl is None else monotonic() + self._ttl
+        with self._lock:
+            if generation is not None and generation != self._generations[hash(key) % GENERATION_STRIPES]:
+                return False
+            self._items[key] = (value, expires)
+            self._items.move_to_end(key)
+            if len(self._items) > self._maxsize:
+                self._items.popitem(last=False)
+            return True
+
+    def invalidate(self, key):
+        with self._lock:
+            self._generations[hash(key) % GENERATION_STRIPES] += 1
+            self._items.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._generations = [generation + 1 for generation in self._generations]
+            self._items.clear()
+
+    def stats(self) -> dict:
+        return {
+            "size": len(self._items),
+            "maxsize": self._maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
@@ -0,0 +1,194 @@
+import threading
+from math import gcd
+from functools import reduce
+from .exceptions import AtmControllerInputException
+
+UNREACHABLE = -1
+# Attempts of the solver when other reservations take the notes it chose
+SOLVE_ATTEMPTS = 3
+
+
+class CashInventory:
+    """
+    Cash cassettes of the ATM, as { denomination: number of notes }.
+    Pass it as 'cash_inventory' to the controller,
+    then withdraw() reserves the notes before debiting the account,
+    and gives them back if the debit fails.
+
+    The notes of an amount are chosen with the fewest notes.
+    A table of the fewest-notes combination of every amount up to 'max_amount'
+    is computed once, so most requests only walk the table.
+    If the cassettes can't pay that combination, the combination is solved
+    again with the remaining notes, outside the lock, on a snapshot of the counts.
+    That solver takes O(amount) time and memory, so it solves at most 'max_solve_amount':
+    the notes of a larger amount are taken largest first, leaving that much to the solver.
+    An amount over the cash in the cassettes, or not made of the denominations, is refused at once.
+
+    'on_dispense' is called with the { denomination: count } of the notes
+    after the account is debited, to drive the dispenser.
+    """
+
+    def __init__(self, cassettes: dict, max_amount=10_000, on_dispense=None, max_solve_amount=100_000):
+        if not (isinstance(cassettes, dict) and cassettes):
+            raise AtmControllerInputException("cassettes", "{denomination: count} dict")
+        for denomination, count in cassettes.items():
+            if not isinstance(denomination, int) or denomination < 1:
+                raise AtmControllerInputException("denomination", "positive int")
+            if not isinstance(count, int) or count < 0:
+                raise AtmControllerInputException("count", "non-negative int")
+        for param, value in [("max_amount", max_amount), ("max_solve_amount", max_solve_amount)]:
+            if not isinstance(value, int) or value < 1:
+                raise AtmControllerInputException(param, "positive int")
+        if not (on_dispense is None or callable(on_dispense)):
+            raise AtmControllerInputException("on_dispense", "callable")
+
+        # Amounts are counted in units of the gcd of the denominations to shrink the tables
+        self.denominations = tuple(sorted(cassettes, reverse=True))
+        self._unit = reduce(gcd, self.denominations)
+        self._units = [denomination // self._unit for denomination in self.denominations]
+        self._counts = [cassettes[denomination] for denomination in self.denominations]
+        self._on_dispense = on_dispense
+        self._lock = threading.Lock()
+        self._max_solve_units = max_solve_amount // self._unit
+        self._last = self._build_table(max_amount // self._unit)
+
+    def __repr__(self):
+        return f"CashInventory({self.cassettes})"
+
+    def _build_table(self, max_units):
+        """_last[units] is the index of a note of the fewest-notes combination of the units"""
+        notes = [0] + [None] * max_units
+        last = [UNREACHABLE] * (max_units + 1)
+        for units in range(1, max_units + 1):
+            best = None
+            for index, unit in enumerate(self._units):
+                if unit <= units and notes[units - unit] is not None:
+                    candidate = notes[units - unit] + 1
+                    if best is None or candidate < best:
+                        best = candidate
+                        last[units] = index
+            notes[units] = best
+        return last
+
+    @property
+    def cassettes(self) -> dict:
+        with self._lock:
+            return dict(zip(self.denominations, self._counts))
+
+    @property
+    def total(self) -> int:
+        with self._lock:
+            return sum(map(int.__mul__, self.denominations, self._counts))
+
+    def load(self, denomination, count):
+        """Add 'count' notes of the denomination to its cassette"""
+        if denomination not in self.denominations:
+            raise AtmControllerInputException("denomination", f"one of {self.denominations}")
+        if not isinstance(count, int) or count < 0:
+            raise AtmControllerInputException("count", "non-negative int")
+        with self._lock:
+            self._counts[self.denominations.index(denomination)] += count
+
+    def reserve(self, amount) -> dict:
+        """
+        Take the notes of the amount out of the cassettes and return { denomination: count },
+        or None if the cassettes can't pay the amount.
+        """
+        if amount % self._unit:
+            return None
+        units = amount // self._unit
+        for _ in range(SOLVE_ATTEMPTS):
+            with self._lock:
+                counts = list(self._counts)
+                if units > sum(map(int.__mul__, self._units, counts)):
+                    return None
+                taken = self._solve_from_table(units)
+                if taken is not None:
+                    return self._take(taken)
+            # Solved without the lock, so the other reservations don't wait for it
+            taken = self._solve_large(units, counts)
+            if taken is None:
+                return None
+            with self._lock:
+                if not any(map(int.__gt__, taken, self._counts)):
+                    return self._take(taken)
+        return None
+
+    def _take(self, taken):
+        for index, count in enumerate(taken):
+            self._counts[index] -= count
+        return {
+            denomination: count for denomination, count in zip(self.denominations, taken) if count
+        }
+
+    def release(self, notes: dict):
+        """Put the reserved notes back into the cassettes"""
+        with self._lock:
+            for denomination, count in notes.items():
+                self._counts[self.denominations.index(denomination)] += count
+
+    def dispense(self, notes: dict):
+        """Hand the reserved notes to the dispenser"""
+        if self._on_dispense is not None:
+            self._on_dispense(notes)
+
+    def _solve_from_table(self, units):
+        if units >= len(self._last) or self._last[units] == UNREACHABLE:
+            return None
+        taken = [0] * len(self._units)
+        while units:
+            index = self._last[units]
+            taken[index] += 1
+            units -= self._units[index]
+        if any(map(int.__gt__, taken, self._counts)):
+            return None
+        return taken
+
+    def _solve_large(self, units, counts):
+        """Take the notes largest first until 'max_solve_amount' is left, then solve the rest"""
+        head = units - self._max_solve_units
+        if head <= 0:
+            return self._solve_bounded(units, counts)
+        taken = []
+        for unit, count in zip(self._units, counts):
+            take = min(count, head // unit)
+            taken.append(take)
+            head -= take * unit
+        rest = units - sum(map(int.__mul__, self._units, taken))
+        solved = self._solve_bounded(rest, list(map(int.__sub__, counts, taken)))
+        if solved is None:
+            return None
+        return list(map(int.__add__, taken, solved))
+
+    def _solve_bounded(self, units, counts):
+        """Fewest-notes combination with the counts, as a 0/1 knapsack of note bundles"""
+        # Split each cassette into bundles of 1, 2, 4, ... notes
+        bundles = []
+        for index, (unit, count) in enumerate(zip(self._units, counts)):
+            count = min(count, units // unit)
+            size = 1
+            while count > 0:
+                size = min(size, count)
+                bundles.append((index, size, unit * size))
+                count -= size
+                size *= 2
+
+        notes = [0] + [None] * units
+        chosen = []
+        for _, size, bundle_units in bundles:
+            row = bytearray(units + 1)
+            for amount in range(units, bundle_units - 1, -1):
+                previous = notes[amount - bundle_units]
+                if previous is not None and (notes[amount] is None or previous + size < notes[amount]):
+                    notes[amount] = previous + size
+                    row[amount] = 1
+            chosen.append(row)
+        if notes[units] is None:
+            return None
+
+        taken = [0] * len(self._units)
+        for (index, size, bundle_units), row in zip(reversed(bundles), reversed(chosen)):
+            if row[units]:
+                taken[index] += size
+                units -= bundle_units
+        return taken
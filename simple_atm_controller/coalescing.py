@@ -0,0 +1,102 @@
+import threading
+from .exceptions import AtmControllerInputException
+
+
+class _Batch:
+
+    def __init__(self):
+        self.keys = {}
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class Batcher:
+    """
+    Collects the keys queried by concurrent callers and queries them at once.
+    The first caller of a batch is its leader: it waits up to 'window' seconds
+    (or until 'max_batch' distinct keys are collected), then calls query_many with the keys.
+    The other callers wait for the leader and take their result from the batch.
+    """
+
+    def __init__(self, query_many, window, max_batch):
+        self._query_many = query_many
+        self._window = window
+        self._max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = None
+        self.calls = 0
+        self.batches = 0
+
+    def call(self, key):
+        with self._lock:
+            self.calls += 1
+            batch = self._pending
+            leader = batch is None
+            if leader:
+                batch = self._pending = _Batch()
+            position = batch.keys.get(key)
+            if position is None:
+                position = batch.keys[key] = len(batch.keys)
+                if len(batch.keys) >= self._max_batch:
+                    # Later callers start a new batch
+                    self._pending = None
+                    batch.full.set()
+
+        if leader:
+            self._dispatch(batch)
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[position]
+
+    def _dispatch(self, batch):
+        batch.full.wait(self._window)
+        with self._lock:
+            if self._pending is batch:
+                self._pending = None
+            self.batches += 1
+        try:
+            batch.results = self._query_many(list(batch.keys))
+        except Exception as error:
+            batch.error = error
+        finally:
+            batch.done.set()
+
+
+class QueryCoalescer:
+    """
+    Pass it as 'coalescer' to the controller to merge concurrent queries into one backend call.
+    get_valance_query / find_accounts_query of the threads calling within 'window' seconds
+    are sent as one get_valance_query_many / find_accounts_query_many call,
+    with the same keys queried once. A batch is sent early when it has 'max_batch' keys.
+    Only the queries whose *_many hook is overridden by the controller are coalesced.
+    It adds up to 'window' seconds to a query, so use it when the backend round trip
+    or the backend load is the bottleneck.
+    """
+
+    def __init__(self, window=0.001, max_batch=128):
+        if not (isinstance(window, (int, float)) and window > 0):
+            raise AtmControllerInputException("window", "positive number")
+        if not isinstance(max_batch, int) or max_batch < 1:
+            raise AtmControllerInputException("max_batch", "positive int")
+        self.window = window
+        self.max_batch = max_batch
+        self._batchers = []
+
+    def __repr__(self):
+        return f"QueryCoalescer(window={self.window}, max_batch={self.max_batch})"
+
+    def batcher(self, query_many) -> Batcher:
+        batcher = Batcher(query_many, self.window, self.max_batch)
+        self._batchers.append(batcher)
+        return batcher
+
+    def stats(self) -> dict:
+        """Return the number of the coalesced calls and the backend calls made for them"""
+        return {
+            "calls": sum(batcher.calls for batcher in self._batchers),
+            "batches": sum(batcher.batches for batcher in self._batchers),
+        }
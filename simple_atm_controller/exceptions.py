@@ -1,5 +1,8 @@
+from .results import ResultCode
+
 
 class InvalidPin(Exception):
+    code = ResultCode.INVALID_PIN
 
     def __init__(self, param):
         self._param = param
@@ -9,6 +12,7 @@ class InvalidPin(Exception):
 
 
 class InvalidValidationRule(Exception):
+    code = ResultCode.INVALID_RULE
 
     def __init__(self, rule_type):
         self._rule_type = rule_type
@@ -20,6 +24,7 @@ class InvalidValidationRule(Exception):
 
 
 class InvalidAccount(Exception):
+    code = ResultCode.INVALID_ACCOUNT
 
     def __init__(self, param):
         self._param = param
@@ -28,16 +33,38 @@ class InvalidAccount(Exception):
         return f"Invalid AccountId Format/Type: {self._param}"
 
 
+class InvalidJournal(Exception):
+    code = ResultCode.INVALID_JOURNAL
+
+    def __init__(self, path):
+        self._path = path
+
+    def __str__(self):
+        return f"Invalid Journal/Snapshot File: {self._path}"
+
+
+class InvalidLedgerFile(Exception):
+    code = ResultCode.INVALID_LEDGER_FILE
+
+    def __init__(self, path):
+        self._path = path
+
+    def __str__(self):
+        return f"Invalid Ledger File: {self._path}"
+
+
 class AtmControllerException(Exception):
 
-    def __init__(self, param):
+    def __init__(self, param, code=ResultCode.CONTROLLER_ERROR):
         self._param = param
+        self.code = code
 
     def __str__(self):
         return self._param
 
 
 class AtmControllerInputException(Exception):
+    code = ResultCode.INVALID_INPUT
 
     def __init__(self, param, valid_type):
         self._param = param
@@ -49,6 +76,7 @@ class AtmControllerInputException(Exception):
 
 
 class AtmControllerQueryException(Exception):
+    code = ResultCode.INVALID_QUERY
 
     def __init__(self, param, valid_type):
         self._param = param
@@ -0,0 +1,86 @@
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+from time import time
+from .exceptions import AtmControllerInputException
+
+KINDS = ("deposit", "withdraw")
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+Transaction = namedtuple("Transaction", ["timestamp", "kind", "dollar"])
+
+
+class _Columns:
+    """Transactions of an account, stored column by column in typed arrays (17 bytes each)"""
+    __slots__ = ('timestamps', 'kinds', 'dollars')
+
+    def __init__(self):
+        self.timestamps = array('d')
+        self.kinds = array('B')
+        self.dollars = array('q')
+
+    def rows(self, start, stop):
+        timestamps, kinds, dollars = self.timestamps, self.kinds, self.dollars
+        return [
+            Transaction(timestamps[index], KINDS[kinds[index]], dollars[index])
+            for index in range(start, stop)
+        ]
+
+
+class TransactionHistory:
+    """
+    Append-only history of the deposits/withdrawals of each account.
+    Pass it as 'history' to the controller, then every deposit/withdrawal
+    of the controller is appended, and the controller answers
+    mini_statement() (the last N transactions) and transactions() (a time range).
+
+    The transactions of an account are kept in the order of their timestamps,
+    so the last N are a slice and a time range is found by binary search.
+    The history is kept in memory; it isn't rebuilt from the journal.
+    """
+
+    def __init__(self, clock=time):
+        if not callable(clock):
+            raise AtmControllerInputException("clock", "callable")
+        self._clock = clock
+        self._accounts = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(columns.dollars) for columns in self._accounts.values())
+
+    def append(self, key, kind, dollar):
+        """Append a transaction of the (pin_number, account_id) key"""
+        code = KIND_CODES[kind]
+        with self._lock:
+            columns = self._accounts.get(key)
+            if columns is None:
+                columns = self._accounts[key] = _Columns()
+            timestamp = self._clock()
+            # Keep the timestamps sorted even if the clock goes back
+            if columns.timestamps and timestamp < columns.timestamps[-1]:
+                timestamp = columns.timestamps[-1]
+            columns.timestamps.append(timestamp)
+            columns.kinds.append(code)
+            columns.dollars.append(dollar)
+
+    def last(self, key, count) -> list:
+        """The last 'count' transactions of the key, the oldest first"""
+        with self._lock:
+            columns = self._accounts.get(key)
+            if columns is None:
+                return []
+            length = len(columns.dollars)
+            return columns.rows(max(0, length - count), length)
+
+    def between(self, key, start=None, end=None) -> list:
+        """The transactions of the key with start <= timestamp <= end, the oldest first"""
+        with self._lock:
+            columns = self._accounts.get(key)
+            if columns is None:
+                return []
+            timestamps = columns.timestamps
+            first = 0 if start is None else bisect_left(timestamps, start)
+            stop = len(timestamps) if end is None else bisect_right(timestamps, end)
+            return columns.rows(first, stop)
@@ -0,0 +1,95 @@
+import threading
+from functools import wraps
+from time import perf_counter_ns
+
+# Latency bucket i counts the calls that took less than 2 ** i nanoseconds
+BUCKETS = 40
+
+
+class _Metric:
+    __slots__ = ('count', 'total_ns', 'max_ns', 'buckets', 'errors')
+
+    def __init__(self):
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * BUCKETS
+        self.errors = {}
+
+    def percentile_us(self, ratio):
+        """Upper bound of the bucket that holds the percentile, in microseconds"""
+        rank = self.count * ratio
+        seen = 0
+        for index, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= rank:
+                return min(2 ** index, self.max_ns) / 1000
+        return 0.0
+
+    def snapshot(self):
+        return {
+            "count": self.count,
+            "errors": dict(self.errors),
+            "mean_us": round(self.total_ns / self.count / 1000, 3) if self.count else 0.0,
+            "p50_us": self.percentile_us(0.50),
+            "p90_us": self.percentile_us(0.90),
+            "p99_us": self.percentile_us(0.99),
+            "max_us": self.max_ns / 1000,
+            "histogram_us": {
+                2 ** index / 1000: count
+                for index, count in enumerate(self.buckets) if count
+            },
+        }
+
+
+class Instrumentation:
+    """
+    Collects the latency histogram, the number of calls and
+    the number of errors by exception class of the controller functions and queries.
+    Pass it as 'instrumentation' to the controller.
+    If it isn't passed, the controller doesn't pay for it at all.
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def record(self, name, elapsed_ns, error=None):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = _Metric()
+            metric.count += 1
+            metric.total_ns += elapsed_ns
+            if elapsed_ns > metric.max_ns:
+                metric.max_ns = elapsed_ns
+            metric.buckets[min(elapsed_ns.bit_length(), BUCKETS - 1)] += 1
+            if error is not None:
+                error_name = type(error).__name__
+                metric.errors[error_name] = metric.errors.get(error_name, 0) + 1
+
+    def wrap(self, name, function):
+        """Return the function that records its latency and errors as 'name'"""
+        record = self.record
+
+        @wraps(function)
+        def instrumented(*args, **kwargs):
+            started = perf_counter_ns()
+            try:
+                result = function(*args, **kwargs)
+            except Exception as error:
+                record(name, perf_counter_ns() - started, error)
+                raise
+            record(name, perf_counter_ns() - started)
+            return result
+
+        return instrumented
+
+    def snapshot(self) -> dict:
+        """Return the metrics recorded until now, by the name of the function"""
+        with self._lock:
+            return {name: metric.snapshot() for name, metric in self._metrics.items()}
+
+    def reset(self):
+        with self._lock:
+            self._metrics.clear()
@@ -0,0 +1,333 @@
+import os, struct, threading
+from itertools import accumulate
+from zlib import crc32
+from .exceptions import AtmControllerInputException, InvalidJournal
+
+# Record kinds
+SNAPSHOT = 0
+DEPOSIT = 1
+WITHDRAW = 2
+VALANCE = 3
+CHANGES = 4
+
+# Frame: body length, crc32 of body / Body: sequence, kind, dollar, pin length, account length
+FRAME = struct.Struct('<II')
+BODY = struct.Struct('<QBqHH')
+# A CHANGES body is BODY (dollar is the count of changes) followed by the dollars (int64),
+# the lengths in characters of the pin numbers and of the account ids (uint32),
+# the size of the pin numbers text, and the UTF-8 text of the pin numbers and of the account ids
+TEXT_SIZE = struct.Struct('<Q')
+REPLAY_CHUNK = 10_000
+
+
+def encode(sequence, kind, pin_number, account_id, dollar):
+    pin_bytes = pin_number.encode()
+    account_bytes = account_id.encode()
+    body = BODY.pack(sequence, kind, dollar, len(pin_bytes), len(account_bytes)) \
+        + pin_bytes + account_bytes
+    return FRAME.pack(len(body), crc32(body)) + body
+
+
+def changes_payload(pin_numbers, account_ids, dollars):
+    """The CHANGES body after BODY: the ids are joined into one text instead of encoded one by one"""
+    count = len(dollars)
+    astype = getattr(dollars, "astype", None)
+    pin_text = "".join(pin_numbers).encode()
+    return b"".join([
+        astype('<i8').tobytes() if astype is not None else struct.pack(f'<{count}q', *dollars),
+        struct.pack(f'<{count}I', *map(len, pin_numbers)),
+        struct.pack(f'<{count}I', *map(len, account_ids)),
+        TEXT_SIZE.pack(len(pin_text)), pin_text, "".join(account_ids).encode(),
+    ])
+
+
+def encode_changes(sequence, count, payload):
+    """The frame and BODY of a CHANGES record, to write before its payload"""
+    head = BODY.pack(sequence, CHANGES, count, 0, 0)
+    return FRAME.pack(len(head) + len(payload), crc32(payload, crc32(head))) + head
+
+
+def _split(text, lengths):
+    ends = list(accumulate(lengths))
+    return [text[end - length:end] for end, length in zip(ends, lengths)]
+
+
+def decode_changes(body, count):
+    """The (kind, pin_number, account_id, dollar) of each change of a CHANGES body"""
+    offset = BODY.size
+    dollars = struct.unpack_from(f'<{count}q', body, offset)
+    offset += 8 * count
+    pin_lengths = struct.unpack_from(f'<{count}I', body, offset)
+    offset += 4 * count
+    account_lengths = struct.unpack_from(f'<{count}I', body, offset)
+    offset += 4 * count
+    pin_size, = TEXT_SIZE.unpack_from(body, offset)
+    offset += TEXT_SIZE.size
+    pin_numbers = _split(body[offset:offset + pin_size].decode(), pin_lengths)
+    account_ids = _split(body[offset + pin_size:].decode(), account_lengths)
+    for pin_number, account_id, dollar in zip(pin_numbers, account_ids, dollars):
+        if dollar > 0:
+            yield DEPOSIT, pin_number, account_id, dollar
+        else:
+            yield WITHDRAW, pin_number, account_id, -dollar
+
+
+def iter_frames(file):
+    """
+    Yield (end offset, sequence, kind, pin_number, account_id, dollar) of each record.
+    A CHANGES record yields a DEPOSIT/WITHDRAW for each of its changes, with the same sequence.
+    Stops at the first incomplete or corrupted record, which is a torn write of a crash.
+    """
+    offset = 0
+    while True:
+        frame = file.read(FRAME.size)
+        if len(frame) < FRAME.size:
+            return
+        length, checksum = FRAME.unpack(frame)
+        body = file.read(length)
+        if len(body) < length or length < BODY.size or crc32(body) != checksum:
+            return
+        sequence, kind, dollar, pin_length, account_length = BODY.unpack_from(body)
+        pin_end = BODY.size + pin_length
+        offset += FRAME.size + length
+        if kind == CHANGES:
+            for change in decode_changes(body, dollar):
+                yield (offset, sequence, *change)
+            continue
+        yield (
+            offset, sequence, kind,
+            body[BODY.size:pin_end].decode(),
+            body[pin_end:pin_end + account_length].decode(),
+            dollar
+        )
+
+
+class Journal:
+    """
+    Append-only binary journal of the balance changes made by the controller.
+    Pass it as 'journal' to the controller, and call recover() with the data model at startup
+    to rebuild the balances from the last snapshot and the journal.
+
+    Records are written with group commit, and fsync-ed together.
+        - durable=True (default): append() returns only when its record is fsync-ed,
+          so the controller acknowledges a change (and dispenses the notes) after it's durable.
+          The appending thread that finds no fsync running writes every buffered record
+          (leader), and the threads appending meanwhile wait for the next fsync (followers).
+        - durable=False: append() returns at once, and the records are fsync-ed when
+          'group_size' records are buffered or 'group_interval' seconds have passed,
+          so a crash can lose at most that window of acknowledged changes.
+    Call sync() to make the buffered records durable immediately.
+
+    A snapshot of the data model bounds the recovery time.
+    If 'snapshot_every' is given, the controller takes a snapshot every that number of records.
+    Take a snapshot after seeding the data model, because seeding isn't journaled.
+    """
+    DEPOSIT = DEPOSIT
+    WITHDRAW = WITHDRAW
+
+    def __init__(self, path, group_size=128, group_interval=0.05, snapshot_every=None, durable=True):
+        if not isinstance(group_size, int) or group_size < 1:
+            raise AtmControllerInputException("group_size", "positive int")
+        if not (isinstance(group_interval, (int, float)) and group_interval > 0):
+            raise AtmControllerInputException("group_interval", "positive number")
+        if not (snapshot_every is None or (isinstance(snapshot_every, int) and snapshot_every > 0)):
+            raise AtmControllerInputException("snapshot_every", "positive int")
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self._group_size = group_size
+        self._group_interval = group_interval
+        self._snapshot_every = snapshot_every
+        self.durable = bool(durable)
+        # _io_lock (writing the file) is always taken before _lock (the buffer)
+        self._io_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._buffer = []
+        self.syncs = 0
+        self._since_snapshot = 0
+
+        self._sequence = self._read_snapshot_sequence()
+        with open(path, "ab+") as file:
+            file.seek(0)
+            end = 0
+            for end, sequence, *_ in iter_frames(file):
+                self._sequence = max(self._sequence, sequence)
+                self._since_snapshot += 1
+            # Cut the torn write of a crash, so new records follow valid ones
+            file.truncate(end)
+        self._file = open(path, "ab")
+        # The last sequence fsync-ed
+        self._synced = self._sequence
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if not self.durable:
+            self._flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+            self._flusher.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _read_snapshot_sequence(self):
+        if not os.path.exists(self.snapshot_path):
+            return 0
+        with open(self.snapshot_path, "rb") as file:
+            for _, sequence, kind, *_ in iter_frames(file):
+                if kind == SNAPSHOT:
+                    return sequence
+        raise InvalidJournal(self.snapshot_path)
+
+    @property
+    def snapshot_due(self) -> bool:
+        return self._snapshot_every is not None and self._since_snapshot >= self._snapshot_every
+
+    def append(self, kind, pin_number, account_id, dollar):
+        self.append_many([(kind, pin_number, account_id, dollar)])
+
+    def append_many(self, records):
+        """Append (kind, pin_number, account_id, dollar) records, flushed in the same group"""
+        with self._lock:
+            for kind, pin_number, account_id, dollar in records:
+                self._sequence += 1
+                self._since_snapshot += 1
+                self._buffer.append(encode(self._sequence, kind, pin_number, account_id, dollar))
+            sequence = self._sequence
+            full = len(self._buffer) >= self._group_size
+        if self.durable:
+            self._wait_synced(sequence)
+        elif full:
+            self.sync()
+
+    def append_changes(self, pin_numbers, account_ids, dollars):
+        """
+        Append the changes of the accounts as one record: 'dollars' (a list or a NumPy int array)
+        is added to the balance of each (pin_numbers[i], account_ids[i]).
+        """
+        count = len(dollars)
+        if not count:
+            return
+        # Encoded outside the lock, so the other appends don't wait for it
+        payload = changes_payload(pin_numbers, account_ids, dollars)
+        with self._lock:
+            self._sequence += 1
+            self._since_snapshot += count
+            self._buffer.append(encode_changes(self._sequence, count, payload))
+            self._buffer.append(payload)
+            sequence = self._sequence
+            full = len(self._buffer) >= self._group_size
+        if self.durable:
+            self._wait_synced(sequence)
+        elif full:
+            self.sync()
+
+    def _wait_synced(self, sequence):
+        # The leader's fsync may have covered the record while this thread waited for it
+        with self._io_lock:
+            if self._synced < sequence:
+                self._flush()
+
+    def sync(self):
+        """Write and fsync the buffered records"""
+        with self._io_lock:
+            self._flush()
+
+    def _flush(self):
+        """Write and fsync the buffered records. Called with _io_lock held"""
+        with self._lock:
+            if not self._buffer:
+                return
+            data = b"".join(self._buffer)
+            self._buffer.clear()
+            sequence = self._sequence
+        # Other threads keep appending to the next group during the fsync
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._synced = sequence
+        self.syncs += 1
+
+    def _flush_periodically(self):
+        while not self._closed.wait(self._group_interval):
+            self.sync()
+
+    def close(self):
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._flusher is not None:
+            self._flusher.join()
+        with self._io_lock:
+            self._flush()
+            self._file.close()
+
+    def snapshot(self, model):
+        """
+        Write every record of the data model (model.iter_records()) as the snapshot,
+        then empty the journal. The data model must not change during the snapshot.
+        """
+        with self._io_lock:
+            self._flush()
+            # Appends wait for the snapshot
+            with self._lock:
+                temp_path = self.snapshot_path + ".tmp"
+                with open(temp_path, "wb") as file:
+                    file.write(encode(self._sequence, SNAPSHOT, "", "", 0))
+                    chunk = []
+                    for pin_number, account_id, valance in model.iter_records():
+                        chunk.append(encode(0, VALANCE, pin_number, account_id, valance))
+                        if len(chunk) >= REPLAY_CHUNK:
+                            file.write(b"".join(chunk))
+                            chunk.clear()
+                    file.write(b"".join(chunk))
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_path, self.snapshot_path)
+                # Records up to the snapshot sequence are skipped at recovery,
+                # so a crash before truncation doesn't apply them twice
+                self._file.truncate(0)
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._since_snapshot = 0
+
+    def recover(self, model) -> int:
+        """
+        Load the snapshot into the data model (model.bulk_load())
+        and apply the journaled changes after it (model.bulk_update_valance() or update_valance()).
+        Returns the number of the applied changes.
+        """
+        with self._io_lock:
+            self._flush()
+            snapshot_sequence = 0
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, "rb") as file:
+                    frames = iter_frames(file)
+                    for _, sequence, kind, *_ in frames:
+                        snapshot_sequence = sequence
+                        break
+                    model.bulk_load(
+                        (pin_number, account_id, valance)
+                        for _, _, kind, pin_number, account_id, valance in frames
+                        if kind == VALANCE
+                    )
+
+            update = getattr(model, "bulk_update_valance", None)
+            if update is None:
+                def update(changes):
+                    for change in changes:
+                        model.update_valance(*change)
+
+            applied = 0
+            changes = []
+            with open(self.path, "rb") as file:
+                for _, sequence, kind, pin_number, account_id, dollar in iter_frames(file):
+                    if sequence <= snapshot_sequence:
+                        continue
+                    changes.append((pin_number, account_id, -dollar if kind == WITHDRAW else dollar))
+                    if len(changes) >= REPLAY_CHUNK:
+                        update(changes)
+                        applied += len(changes)
+                        changes = []
+            update(changes)
+            return applied + len(changes)
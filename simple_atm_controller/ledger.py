@@ -0,0 +1,138 @@
+from collections.abc import Iterable
+from .atm_controller import AtmController
+
+
+class Ledger:
+    """
+    In-memory data model that keeps accounts indexed by pin number.
+    Records are stored as { pin_number: { account_id: valance } },
+    so the pin index and the (pin_number, account_id) balance map share one structure
+    and every query is a dictionary lookup instead of a scan over all records.
+    """
+
+    def __init__(self, records=None):
+        self._index = {}
+        if records is not None:
+            self.bulk_load(records)
+
+    def __len__(self):
+        return sum(map(len, self._index.values()))
+
+    def bulk_load(self, records):
+        """
+        Load an iterable of (pin_number, account_id, valance) records.
+        An existing account is overwritten by the loaded valance.
+        """
+        index = self._index
+        get = index.get
+        for pin_number, account_id, valance in records:
+            accounts = get(pin_number)
+            if accounts is None:
+                accounts = index[pin_number] = {}
+            accounts[account_id] = valance
+
+    def iter_records(self):
+        """Yield every (pin_number, account_id, valance) record"""
+        for pin_number, accounts in self._index.items():
+            for account_id, valance in accounts.items():
+                yield pin_number, account_id, valance
+
+    def find_accounts(self, pin_number):
+        """Returns the list of account IDs with the received Pin Number"""
+        accounts = self._index.get(pin_number)
+        return list(accounts) if accounts else []
+
+    def get_valance(self, pin_number, account_id):
+        """Return the balance of the account"""
+        accounts = self._index.get(pin_number)
+        return accounts.get(account_id) if accounts else None
+
+    def find_accounts_many(self, pin_numbers):
+        """Returns the list of account IDs of each pin number"""
+        get = self._index.get
+        return [list(get(pin_number) or ()) for pin_number in pin_numbers]
+
+    def get_valance_many(self, keys):
+        """Return the balance of each (pin_number, account_id)"""
+        get = self._index.get
+        results = []
+        for pin_number, account_id in keys:
+            accounts = get(pin_number)
+            results.append(accounts.get(account_id) if accounts else None)
+        return results
+
+    def update_valance(self, pin_number, account_id, dollar):
+        """Modify the balance of the account"""
+        accounts = self._index.get(pin_number)
+        if accounts and account_id in accounts:
+            accounts[account_id] += dollar
+
+    def bulk_update_valance(self, changes):
+        """Modify the balances of several accounts from (pin_number, account_id, dollar)"""
+        get = self._index.get
+        for pin_number, account_id, dollar in changes:
+            accounts = get(pin_number)
+            if accounts and account_id in accounts:
+                accounts[account_id] += dollar
+
+    def conditional_update_valance(self, pin_number, account_id, dollar):
+        """Decrease the balance of the account only if the balance is enough"""
+        accounts = self._index.get(pin_number)
+        if not accounts:
+            return False
+        valance = accounts.get(account_id)
+        if valance is None or valance < dollar:
+            return False
+        accounts[account_id] = valance - dollar
+        return True
+
+    def transfer_valance(self, src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar):
+        """Move the dollars between the accounts only if the balance of the src account is enough"""
+        src_accounts = self._index.get(src_pin_number)
+        dst_accounts = self._index.get(dst_pin_number)
+        if not src_accounts or not dst_accounts or dst_account_id not in dst_accounts:
+            return False
+        valance = src_accounts.get(src_account_id)
+        if valance is None or valance < dollar:
+            return False
+        src_accounts[src_account_id] = valance - dollar
+        dst_accounts[dst_account_id] += dollar
+        return True
+
+
+class LedgerAtmController(AtmController):
+    """
+    ATM Controller connected to a data model with the same query methods as the Ledger.
+    """
+
+    def find_accounts_query(self, pin_number) -> Iterable:
+        return self.model.find_accounts(pin_number)
+
+    def get_valance_query(self, pin_number, account_id) -> int:
+        return self.model.get_valance(pin_number, account_id)
+
+    def update_valance_query(self, pin_number, account_id, dollar):
+        self.model.update_valance(pin_number, account_id, dollar)
+
+    def conditional_update_query(self, pin_number, account_id, dollar) -> bool:
+        return self.model.conditional_update_valance(pin_number, account_id, dollar)
+
+    def bulk_update_valance_query(self, changes):
+        self.model.bulk_update_valance(changes)
+
+    def transfer_query(self, src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar) -> bool:
+        return self.model.transfer_valance(
+            src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar
+        )
+
+    def find_accounts_query_many(self, pin_numbers) -> list:
+        return self.model.find_accounts_many(pin_numbers)
+
+    def get_valance_query_many(self, keys) -> list:
+        return self.model.get_valance_many(keys)
+
+    def apply_deltas_query(self, rows, dollars):
+        self.model.apply_deltas(rows, dollars)
+
+    def row_keys_query(self, rows) -> tuple:
+        return self.model.row_keys(rows)
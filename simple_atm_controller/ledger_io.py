@@ -0,0 +1,140 @@
+"""
+Streaming import/export of the ledger records (pin_number, account_id, valance).
+    # CSV: a header line, then one record per line
+    # Binary: a magic line, then (pin length, account length, valance, pin, account) per record
+Records are read and written in chunks, so memory stays bounded by the chunk size.
+Any data model with bulk_load(records) / iter_records() can be imported/exported.
+"""
+import csv, struct
+from itertools import islice
+from .exceptions import AtmControllerInputException, InvalidLedgerFile
+
+CSV_HEADER = ("pin_number", "account_id", "valance")
+MAGIC = b"ATMRECS1\n"
+RECORD = struct.Struct('<HHq')
+CHUNK_SIZE = 10_000
+READ_SIZE = 1 << 20
+FORMATS = ("csv", "binary")
+
+
+def read_csv(path):
+    """Yield the records of a CSV file"""
+    with open(path, newline="") as file:
+        reader = csv.reader(file)
+        if tuple(next(reader, ())) != CSV_HEADER:
+            raise InvalidLedgerFile(path)
+        for line, row in enumerate(reader, start=2):
+            try:
+                pin_number, account_id, valance = row
+                yield pin_number, account_id, int(valance)
+            except ValueError:
+                raise InvalidLedgerFile(f"{path}:{line}")
+
+
+def write_csv(records, path, chunk_size=CHUNK_SIZE) -> int:
+    """Write the records to a CSV file and return the number of records"""
+    count = 0
+    records = iter(records)
+    with open(path, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(CSV_HEADER)
+        while True:
+            chunk = list(islice(records, chunk_size))
+            if not chunk:
+                return count
+            writer.writerows(chunk)
+            count += len(chunk)
+
+
+def read_binary(path):
+    """Yield the records of a binary file"""
+    unpack_from = RECORD.unpack_from
+    head_size = RECORD.size
+    with open(path, "rb") as file:
+        if file.read(len(MAGIC)) != MAGIC:
+            raise InvalidLedgerFile(path)
+        data = b""
+        offset = 0
+        while True:
+            chunk = file.read(READ_SIZE)
+            if not chunk:
+                break
+            # Keep the incomplete record at the end of the previous chunk
+            data = data[offset:] + chunk
+            offset = 0
+            end = len(data)
+            while offset + head_size <= end:
+                pin_length, account_length, valance = unpack_from(data, offset)
+                pin_start = offset + head_size
+                account_start = pin_start + pin_length
+                record_end = account_start + account_length
+                if record_end > end:
+                    break
+                yield (
+                    data[pin_start:account_start].decode(),
+                    data[account_start:record_end].decode(),
+                    valance
+                )
+                offset = record_end
+        if offset != len(data):
+            raise InvalidLedgerFile(path)
+
+
+def write_binary(records, path, chunk_size=CHUNK_SIZE) -> int:
+    """Write the records to a binary file and return the number of records"""
+    pack = RECORD.pack
+    count = 0
+    buffer = []
+    with open(path, "wb") as file:
+        file.write(MAGIC)
+        for pin_number, account_id, valance in records:
+            pin_bytes = pin_number.encode()
+            account_bytes = account_id.encode()
+            buffer.append(pack(len(pin_bytes), len(account_bytes), valance))
+            buffer.append(pin_bytes)
+            buffer.append(account_bytes)
+            count += 1
+            if len(buffer) >= chunk_size * 3:
+                file.write(b"".join(buffer))
+                buffer.clear()
+        file.write(b"".join(buffer))
+    return count
+
+
+def _format(path, format):
+    if format is None:
+        format = "csv" if str(path).lower().endswith(".csv") else "binary"
+    if format not in FORMATS:
+        raise AtmControllerInputException("format", "'csv' or 'binary'")
+    return format
+
+
+def read_records(path, format=None):
+    """Yield the records of the file. The format is guessed from the extension if not given"""
+    return read_csv(path) if _format(path, format) == "csv" else read_binary(path)
+
+
+def write_records(records, path, format=None, chunk_size=CHUNK_SIZE) -> int:
+    """Write the records to the file. The format is guessed from the extension if not given"""
+    if _format(path, format) == "csv":
+        return write_csv(records, path, chunk_size)
+    return write_binary(records, path, chunk_size)
+
+
+def export_ledger(model, path, format=None, chunk_size=CHUNK_SIZE) -> int:
+    """Write every record of the data model to the file and return the number of records"""
+    return write_records(model.iter_records(), path, format, chunk_size)
+
+
+def import_ledger(model, path, format=None) -> int:
+    """Stream the records of the file into the data model and return the number of records"""
+    count = 0
+
+    def counted(records):
+        nonlocal count
+        for record in records:
+            count += 1
+            yield record
+
+    model.bulk_load(counted(read_records(path, format)))
+    return count
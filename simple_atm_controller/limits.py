@@ -0,0 +1,246 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from .exceptions import AtmControllerInputException
+from .results import SUCCESS, DAILY_LIMIT_EXCEEDED, TOO_MANY_REQUESTS, LIMITS_FULL
+
+# The least recently used counters looked at for idle ones to evict, when a counter is added
+EVICTION_SCAN = 16
+
+
+class SlidingWindow:
+    """
+    Sum of the amounts of the last 'size' buckets, kept in a ring buffer.
+    Moving the window clears at most 'size' buckets, so every operation is constant time.
+    """
+    __slots__ = ('buckets', 'latest', 'total')
+
+    def __init__(self, size, bucket):
+        self.buckets = [0] * size
+        self.latest = bucket
+        self.total = 0
+
+    def advance(self, bucket):
+        steps = bucket - self.latest
+        if steps <= 0:
+            return
+        buckets = self.buckets
+        size = len(buckets)
+        if steps >= size:
+            buckets[:] = [0] * size
+            self.total = 0
+        else:
+            for passed in range(self.latest + 1, bucket + 1):
+                index = passed % size
+                self.total -= buckets[index]
+                buckets[index] = 0
+        self.latest = bucket
+
+    def add(self, amount):
+        self.buckets[self.latest % len(self.buckets)] += amount
+        self.total += amount
+
+    def idle(self, bucket):
+        """Nothing is counted in the window at the bucket, so forgetting it allows nothing more"""
+        self.advance(bucket)
+        return self.total <= 0
+
+    def remove(self, amount):
+        """Take the amount back from the latest buckets"""
+        buckets = self.buckets
+        size = len(buckets)
+        self.total -= amount
+        for offset in range(size):
+            index = (self.latest - offset) % size
+            taken = min(buckets[index], amount)
+            buckets[index] -= taken
+            amount -= taken
+            if not amount:
+                return
+
+
+class TokenBucket:
+    """Allows 'burst' requests at once, refilled by 'rate' requests per second"""
+    __slots__ = ('tokens', 'updated')
+
+    def __init__(self, burst, now):
+        self.tokens = burst
+        self.updated = now
+
+    def take(self, now, rate, burst):
+        self.tokens = min(burst, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def full(self, now, rate, burst):
+        """The bucket is refilled, so forgetting it allows nothing more"""
+        return self.tokens + (now - self.updated) * rate >= burst
+
+    def empty(self, now, rate, burst):
+        """No request can be taken now"""
+        return min(burst, self.tokens + (now - self.updated) * rate) < 1
+
+
+class Limits:
+    """
+    Withdrawal limits checked in memory, before the controller queries the data model.
+    Pass it as 'limits' to the controller.
+        - 'daily_amount': the total withdrawal of an account in the last 'window' seconds
+          is kept under this amount (sliding window of 'buckets' buckets)
+        - 'pin_rate', 'pin_burst': requests (find_accounts/withdraw) of a pin are throttled
+          to 'pin_rate' per second, with bursts of 'pin_burst' requests (token bucket)
+    Only the pins that have accounts get a counter. The lookups of unknown pins
+    are throttled by the terminal they come from, with the same rate,
+    so guessing many pins can't fill the counters nor throttle the other pins.
+    Adding a counter evicts the idle ones (an empty window, a refilled bucket)
+    among the 'EVICTION_SCAN' least recently used, so the counters follow the live accounts/pins.
+    If 'maxsize' is set and the counters are full of live ones, the request of a new
+    account/pin/terminal gets LIMITS_FULL: forgetting a live counter would reset its limit.
+    """
+
+    def __init__(self, daily_amount=None, pin_rate=None, pin_burst=None,
+                 window=86_400, buckets=24, maxsize=None, clock=monotonic):
+        if not (daily_amount is None or (isinstance(daily_amount, int) and daily_amount >= 0)):
+            raise AtmControllerInputException("daily_amount", "non-negative int")
+        if not (pin_rate is None or (isinstance(pin_rate, (int, float)) and pin_rate > 0)):
+            raise AtmControllerInputException("pin_rate", "positive number")
+        if not (pin_burst is None or (isinstance(pin_burst, int) and pin_burst > 0)):
+            raise AtmControllerInputException("pin_burst", "positive int")
+        if not (isinstance(window, (int, float)) and window > 0):
+            raise AtmControllerInputException("window", "positive number")
+        if not isinstance(buckets, int) or buckets < 1:
+            raise AtmControllerInputException("buckets", "positive int")
+        if not (maxsize is None or (isinstance(maxsize, int) and maxsize > 0)):
+            raise AtmControllerInputException("maxsize", "positive int")
+        self.daily_amount = daily_amount
+        self.pin_rate = pin_rate
+        self.pin_burst = pin_burst if pin_burst is not None else max(1, int(pin_rate or 1))
+        self._buckets = buckets
+        self._bucket_seconds = window / buckets
+        self._maxsize = maxsize
+        self._clock = clock
+        self._windows = OrderedDict()
+        self._pins = OrderedDict()
+        self._terminals = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        return f"Limits(daily_amount={self.daily_amount}, pin_rate={self.pin_rate}, " \
+               f"pin_burst={self.pin_burst})"
+
+    def _touch(self, counters, key, create, is_idle):
+        """The counter of the key, or None if the counters are full of live ones"""
+        counter = counters.get(key)
+        if counter is not None:
+            counters.move_to_end(key)
+            return counter
+        self._evict_idle(counters, is_idle)
+        if self._maxsize is not None and len(counters) >= self._maxsize:
+            return None
+        counter = counters[key] = create()
+        return counter
+
+    def _evict_idle(self, counters, is_idle):
+        idle = [
+            key for _, (key, counter) in zip(range(EVICTION_SCAN), counters.items())
+            if is_idle(counter)
+        ]
+        for key in idle:
+            del counters[key]
+
+    def _take(self, counters, key, now):
+        """SUCCESS, TOO_MANY_REQUESTS or LIMITS_FULL for a request taken from the bucket of the key"""
+        bucket = self._touch(
+            counters, key, lambda: TokenBucket(self.pin_burst, now),
+            lambda idle: idle.full(now, self.pin_rate, self.pin_burst)
+        )
+        if bucket is None:
+            return LIMITS_FULL
+        return SUCCESS if bucket.take(now, self.pin_rate, self.pin_burst) else TOO_MANY_REQUESTS
+
+    def allow_pin(self, pin_number) -> tuple:
+        """
+        Take a request of a pin that has accounts from its token bucket.
+        Returns SUCCESS, TOO_MANY_REQUESTS or LIMITS_FULL.
+        """
+        if self.pin_rate is None:
+            return SUCCESS
+        now = self._clock()
+        with self._lock:
+            return self._take(self._pins, pin_number, now)
+
+    def allow_seen_pin(self, pin_number):
+        """Like allow_pin if the pin has a token bucket, otherwise None (the pin may not exist)"""
+        if self.pin_rate is None:
+            return SUCCESS
+        now = self._clock()
+        with self._lock:
+            if pin_number not in self._pins:
+                return None
+            return self._take(self._pins, pin_number, now)
+
+    def allow_terminal(self, terminal) -> tuple:
+        """
+        SUCCESS if the terminal can look up a pin without a token bucket,
+        TOO_MANY_REQUESTS if its lookups of unknown pins used up its bucket.
+        A terminal of None isn't throttled.
+        """
+        if self.pin_rate is None or terminal is None:
+            return SUCCESS
+        now = self._clock()
+        with self._lock:
+            bucket = self._terminals.get(terminal)
+            if bucket is not None and bucket.empty(now, self.pin_rate, self.pin_burst):
+                return TOO_MANY_REQUESTS
+            return SUCCESS
+
+    def unknown_pin(self, terminal):
+        """Count the lookup of a pin without accounts against the terminal"""
+        if self.pin_rate is None or terminal is None:
+            return
+        now = self._clock()
+        with self._lock:
+            self._take(self._terminals, terminal, now)
+
+    def reserve(self, key, dollar) -> tuple:
+        """
+        Count the withdrawal of the account if it stays under the daily amount.
+        Returns SUCCESS, DAILY_LIMIT_EXCEEDED or LIMITS_FULL.
+        """
+        if self.daily_amount is None:
+            return SUCCESS
+        bucket = int(self._clock() // self._bucket_seconds)
+        with self._lock:
+            window = self._touch(
+                self._windows, key, lambda: SlidingWindow(self._buckets, bucket),
+                lambda idle: idle.idle(bucket)
+            )
+            if window is None:
+                return LIMITS_FULL
+            window.advance(bucket)
+            if window.total + dollar > self.daily_amount:
+                return DAILY_LIMIT_EXCEEDED
+            window.add(dollar)
+            return SUCCESS
+
+    def release(self, key, dollar):
+        """Take back the reserved withdrawal that wasn't made"""
+        if self.daily_amount is None:
+            return
+        with self._lock:
+            window = self._windows.get(key)
+            if window is not None:
+                window.remove(min(dollar, window.total))
+
+    def withdrawn(self, key) -> int:
+        """The withdrawal of the account in the window"""
+        bucket = int(self._clock() // self._bucket_seconds)
+        with self._lock:
+            window = self._windows.get(key)
+            if window is None:
+                return 0
+            window.advance(bucket)
+            return window.total
@@ -0,0 +1,51 @@
+import threading
+from contextlib import contextmanager, ExitStack
+from .exceptions import AtmControllerInputException
+
+
+class LockStripes:
+    """
+    A fixed number of locks shared by all accounts.
+    The same key is always mapped to the same lock,
+    so the operations of one account are serialized
+    while the operations of different accounts can proceed in parallel.
+    """
+
+    def __init__(self, size=64):
+        if not isinstance(size, int) or size < 1:
+            raise AtmControllerInputException("size", "positive int")
+        self._size = size
+        self._locks = tuple(threading.Lock() for _ in range(size))
+
+    def __len__(self):
+        return self._size
+
+    def __iter__(self):
+        """Iterate every lock in the fixed order of ordered()"""
+        return iter(self._locks)
+
+    def __repr__(self):
+        return f"LockStripes(size={self._size})"
+
+    def index(self, key):
+        """Return the index of the lock assigned to the key"""
+        return hash(key) % self._size
+
+    def lock(self, key):
+        """Return the lock assigned to the key"""
+        return self._locks[hash(key) % self._size]
+
+    def ordered(self, keys):
+        """
+        Return the locks assigned to the keys without duplicates, in a fixed order.
+        Acquiring several locks in this order can't deadlock.
+        """
+        return [self._locks[index] for index in sorted({self.index(key) for key in keys})]
+
+    @contextmanager
+    def holding(self, keys=None):
+        """Hold the locks of the keys in the order of ordered(), or every lock if keys is None"""
+        with ExitStack() as stack:
+            for lock in self._locks if keys is None else self.ordered(keys):
+                stack.enter_context(lock)
+            yield
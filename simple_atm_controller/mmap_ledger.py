@@ -0,0 +1,284 @@
+import mmap, struct
+from zlib import crc32
+from .exceptions import (
+    AtmControllerException, AtmControllerInputException, InvalidLedgerFile, InvalidPin, InvalidAccount
+)
+
+MAGIC = b"ATMLEDG2"
+# magic, capacity, table size, count, pin width, account width
+HEADER = struct.Struct('<8sQQQHH')
+HEADER_SIZE = 64
+COUNT_OFFSET = 24
+SLOT = struct.Struct('<Q')
+# first and last record of a pin
+PIN_SLOT = struct.Struct('<QQ')
+# length of a key, before its null-padded bytes
+KEY_LENGTH = struct.Struct('<H')
+VALANCE = struct.Struct('<q')
+EMPTY, USED = 0, 1
+# Seed of the pin index hash, so it doesn't probe like the record table
+PIN_SEED = 0x9E3779B9
+
+
+def record_struct(pin_width, account_width):
+    return struct.Struct(
+        f'<B{KEY_LENGTH.size + pin_width}s{KEY_LENGTH.size + account_width}sqQ'
+    )
+
+
+def encode_key(value, width):
+    """The (length, null-padded bytes) of the id, or None if it isn't a str of at most 'width' bytes"""
+    key = value.encode() if isinstance(value, str) else None
+    if key is None or len(key) > width:
+        return None
+    return KEY_LENGTH.pack(len(key)) + key.ljust(width, b"\0")
+
+
+def decode_key(key):
+    length, = KEY_LENGTH.unpack_from(key)
+    return key[KEY_LENGTH.size:KEY_LENGTH.size + length].decode()
+
+
+class MmapLedger:
+    """
+    Data model stored in a memory-mapped file of fixed-width records,
+    with the same query methods as the Ledger (use it with LedgerAtmController).
+
+    File layout
+        - Header
+        - Pin index: open addressing hash table of
+          { pin_number: (first record, last record) of the pin }
+        - Records: open addressing hash table of
+          (state, pin_number, account_id, valance, next record of the same pin)
+          The pin_number and the account_id are stored as (length, null-padded bytes).
+
+    Reads and balance updates work on the mapped pages in place,
+    so opening a file is instant and the pages are shared by the processes mapping the file.
+    Create the file once with MmapLedger.create(), and open it with MmapLedger(path).
+    Accounts can't be removed, and at most 'capacity' accounts can be stored.
+    A balance update isn't atomic across processes; let one process write an account.
+    """
+
+    def __init__(self, path, writable=True):
+        self.path = path
+        self._writable = writable
+        self._file = open(path, "r+b" if writable else "rb")
+        try:
+            self._map = mmap.mmap(
+                self._file.fileno(), 0,
+                access=mmap.ACCESS_WRITE if writable else mmap.ACCESS_READ
+            )
+        except ValueError:
+            self._file.close()
+            raise InvalidLedgerFile(path)
+        try:
+            magic, self._capacity, self._table_size, self._count, \
+                self._pin_width, self._account_width = HEADER.unpack_from(self._map, 0)
+        except struct.error:
+            magic = None
+        if magic != MAGIC:
+            self.close()
+            raise InvalidLedgerFile(path)
+
+        self._record = record_struct(self._pin_width, self._account_width)
+        self._pin_index_offset = HEADER_SIZE
+        self._records_offset = HEADER_SIZE + self._table_size * PIN_SLOT.size
+        self._account_offset = 1 + KEY_LENGTH.size + self._pin_width
+        self._valance_offset = self._account_offset + KEY_LENGTH.size + self._account_width
+        if len(self._map) != self._records_offset + self._table_size * self._record.size:
+            self.close()
+            raise InvalidLedgerFile(path)
+
+    @classmethod
+    def create(cls, path, capacity, pin_width=16, account_width=32):
+        """Create an empty ledger file that can store 'capacity' accounts"""
+        for param, value in [
+            ("capacity", capacity), ("pin_width", pin_width), ("account_width", account_width)
+        ]:
+            if not isinstance(value, int) or value < 1:
+                raise AtmControllerInputException(param, "positive int")
+        # Keep the load factor of the hash tables under 2/3
+        table_size = 1
+        while table_size * 2 < capacity * 3:
+            table_size *= 2
+        record_size = record_struct(pin_width, account_width).size
+        with open(path, "wb") as file:
+            file.write(HEADER.pack(MAGIC, capacity, table_size, 0, pin_width, account_width))
+            file.truncate(HEADER_SIZE + table_size * (PIN_SLOT.size + record_size))
+        return cls(path)
+
+    def __len__(self):
+        return self._count
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def flush(self):
+        self._map.flush()
+
+    def close(self):
+        if not self._map.closed:
+            if self._writable:
+                self._map.flush()
+            self._map.close()
+        self._file.close()
+
+    def _pin_key(self, pin_number):
+        return encode_key(pin_number, self._pin_width)
+
+    def _account_key(self, account_id):
+        return encode_key(account_id, self._account_width)
+
+    def _record_offset(self, index):
+        return self._records_offset + index * self._record.size
+
+    def _find_record(self, pin_key, account_key):
+        """Return (record index, found). If not found, the index is the empty slot to use"""
+        data = self._map
+        mask = self._table_size - 1
+        account_start, account_end = self._account_offset, self._valance_offset
+        index = crc32(account_key, crc32(pin_key)) & mask
+        while True:
+            offset = self._records_offset + index * self._record.size
+            if data[offset] == EMPTY:
+                return index, False
+            if data[offset + account_start:offset + account_end] == account_key \
+                    and data[offset + 1:offset + account_start] == pin_key:
+                return index, True
+            index = (index + 1) & mask
+
+    def _find_pin(self, pin_key):
+        """Return (pin index slot, first record index + 1 or 0 if not found)"""
+        data = self._map
+        mask = self._table_size - 1
+        pin_end = self._account_offset
+        index = crc32(pin_key, PIN_SEED) & mask
+        while True:
+            head, = SLOT.unpack_from(data, self._pin_index_offset + index * PIN_SLOT.size)
+            if head == 0:
+                return index, 0
+            offset = self._record_offset(head - 1)
+            if data[offset + 1:offset + pin_end] == pin_key:
+                return index, head
+            index = (index + 1) & mask
+
+    def _valance_position(self, pin_number, account_id):
+        pin_key = self._pin_key(pin_number)
+        account_key = self._account_key(account_id)
+        if pin_key is None or account_key is None:
+            return None
+        index, found = self._find_record(pin_key, account_key)
+        return self._record_offset(index) + self._valance_offset if found else None
+
+    def bulk_load(self, records):
+        """
+        Load an iterable of (pin_number, account_id, valance) records.
+        An existing account is overwritten by the loaded valance.
+        """
+        try:
+            for pin_number, account_id, valance in records:
+                self._insert(pin_number, account_id, valance)
+        finally:
+            struct.pack_into('<Q', self._map, COUNT_OFFSET, self._count)
+
+    def _insert(self, pin_number, account_id, valance):
+        pin_key = self._pin_key(pin_number)
+        if pin_key is None:
+            raise InvalidPin(pin_number)
+        account_key = self._account_key(account_id)
+        if account_key is None:
+            raise InvalidAccount(account_id)
+        index, found = self._find_record(pin_key, account_key)
+        offset = self._record_offset(index)
+        if found:
+            VALANCE.pack_into(self._map, offset + self._valance_offset, valance)
+            return
+        if self._count >= self._capacity:
+            raise AtmControllerException(f"The ledger is full (capacity={self._capacity})")
+        self._record.pack_into(self._map, offset, USED, pin_key, account_key, valance, 0)
+        self._count += 1
+
+        # Link the record after the last record of the pin, to keep the insertion order
+        slot, head = self._find_pin(pin_key)
+        slot_offset = self._pin_index_offset + slot * PIN_SLOT.size
+        if head == 0:
+            PIN_SLOT.pack_into(self._map, slot_offset, index + 1, index + 1)
+            return
+        _, tail = PIN_SLOT.unpack_from(self._map, slot_offset)
+        SLOT.pack_into(self._map, self._record_offset(tail - 1) + self._valance_offset + VALANCE.size, index + 1)
+        PIN_SLOT.pack_into(self._map, slot_offset, head, index + 1)
+
+    def iter_records(self):
+        """Yield every (pin_number, account_id, valance) record"""
+        unpack_from = self._record.unpack_from
+        for index in range(self._table_size):
+            offset = self._record_offset(index)
+            if self._map[offset] == USED:
+                _, pin_key, account_key, valance, _ = unpack_from(self._map, offset)
+                yield decode_key(pin_key), decode_key(account_key), valance
+
+    def find_accounts(self, pin_number):
+        """Returns the list of account IDs with the received Pin Number"""
+        pin_key = self._pin_key(pin_number)
+        if pin_key is None:
+            return []
+        _, head = self._find_pin(pin_key)
+        accounts = []
+        unpack_from = self._record.unpack_from
+        while head:
+            _, _, account_key, _, head = unpack_from(self._map, self._record_offset(head - 1))
+            accounts.append(decode_key(account_key))
+        return accounts
+
+    def get_valance(self, pin_number, account_id):
+        """Return the balance of the account"""
+        position = self._valance_position(pin_number, account_id)
+        return None if position is None else VALANCE.unpack_from(self._map, position)[0]
+
+    def find_accounts_many(self, pin_numbers):
+        """Returns the list of account IDs of each pin number"""
+        return [self.find_accounts(pin_number) for pin_number in pin_numbers]
+
+    def get_valance_many(self, keys):
+        """Return the balance of each (pin_number, account_id)"""
+        return [self.get_valance(pin_number, account_id) for pin_number, account_id in keys]
+
+    def update_valance(self, pin_number, account_id, dollar):
+        """Modify the balance of the account"""
+        position = self._valance_position(pin_number, account_id)
+        if position is not None:
+            valance, = VALANCE.unpack_from(self._map, position)
+            VALANCE.pack_into(self._map, position, valance + dollar)
+
+    def bulk_update_valance(self, changes):
+        """Modify the balances of several accounts from (pin_number, account_id, dollar)"""
+        for pin_number, account_id, dollar in changes:
+            self.update_valance(pin_number, account_id, dollar)
+
+    def conditional_update_valance(self, pin_number, account_id, dollar):
+        """Decrease the balance of the account only if the balance is enough"""
+        position = self._valance_position(pin_number, account_id)
+        if position is None:
+            return False
+        valance, = VALANCE.unpack_from(self._map, position)
+        if valance < dollar:
+            return False
+        VALANCE.pack_into(self._map, position, valance - dollar)
+        return True
+
+    def transfer_valance(self, src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar):
+        """Move the dollars between the accounts only if the balance of the src account is enough"""
+        src_position = self._valance_position(src_pin_number, src_account_id)
+        dst_position = self._valance_position(dst_pin_number, dst_account_id)
+        if src_position is None or dst_position is None:
+            return False
+        valance, = VALANCE.unpack_from(self._map, src_position)
+        if valance < dollar:
+            return False
+        VALANCE.pack_into(self._map, src_position, valance - dollar)
+        valance, = VALANCE.unpack_from(self._map, dst_position)
+        VALANCE.pack_into(self._map, dst_position, valance + dollar)
+        return True
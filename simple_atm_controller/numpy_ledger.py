@@ -0,0 +1,233 @@
+from time import time
+from .exceptions import AtmControllerInputException
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+INITIAL_CAPACITY = 1024
+
+
+class NumpyLedger:
+    """
+    Columnar data model backed by NumPy arrays, with the same query methods as the Ledger
+    (use it with LedgerAtmController). Requires numpy.
+
+    Each account is a row: the balances, the pin codes and the last activity times
+    are arrays indexed by the row, and the (pin_number, account_id) / pin_number
+    lookup indexes map the ids to the rows.
+    The per-account queries are dictionary lookups, and the analytics
+    (total, pin_totals, interest_deltas, fee_deltas, negative_accounts, dormant_accounts)
+    run over every row at once. interest_deltas and fee_deltas only compute the changes,
+    as arrays of rows and dollars: they are applied through the controller (apply_deltas),
+    so they are journaled, recorded in the history and cleared from the balance cache.
+    """
+
+    def __init__(self, records=None, clock=time):
+        if numpy is None:
+            raise ImportError("NumpyLedger requires numpy (pip install numpy)")
+        if not callable(clock):
+            raise AtmControllerInputException("clock", "callable")
+        self._clock = clock
+        self._size = 0
+        self._valances = numpy.zeros(INITIAL_CAPACITY, dtype=numpy.int64)
+        self._pin_codes = numpy.zeros(INITIAL_CAPACITY, dtype=numpy.int32)
+        self._active = numpy.zeros(INITIAL_CAPACITY, dtype=numpy.float64)
+        self._account_ids = numpy.zeros(INITIAL_CAPACITY, dtype=object)
+        self._rows = {}
+        self._pin_rows = {}
+        self._pin_index = {}
+        self._pin_numbers = []
+        self._keys = []
+        if records is not None:
+            self.bulk_load(records)
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, size):
+        capacity = len(self._valances)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for name in ("_valances", "_pin_codes", "_active", "_account_ids"):
+            column = getattr(self, name)
+            grown = numpy.zeros(capacity, dtype=column.dtype)
+            grown[:self._size] = column[:self._size]
+            setattr(self, name, grown)
+
+    def bulk_load(self, records):
+        """
+        Load an iterable of (pin_number, account_id, valance) records.
+        An existing account is overwritten by the loaded valance.
+        """
+        rows_list, valances = [], []
+        rows = self._rows
+        for pin_number, account_id, valance in records:
+            key = (pin_number, account_id)
+            row = rows.get(key)
+            if row is None:
+                row = rows[key] = len(self._keys)
+                self._keys.append(key)
+                pin_rows = self._pin_rows.get(pin_number)
+                if pin_rows is None:
+                    pin_rows = self._pin_rows[pin_number] = []
+                    self._pin_index[pin_number] = len(self._pin_numbers)
+                    self._pin_numbers.append(pin_number)
+                pin_rows.append(row)
+            rows_list.append(row)
+            valances.append(valance)
+
+        size = len(self._keys)
+        self._reserve(size)
+        self._pin_codes[self._size:size] = [
+            self._pin_index[pin_number] for pin_number, _ in self._keys[self._size:size]
+        ]
+        self._account_ids[self._size:size] = [account_id for _, account_id in self._keys[self._size:size]]
+        self._size = size
+        if rows_list:
+            rows_array = numpy.array(rows_list, dtype=numpy.int64)
+            # The last record of an account wins, like the Ledger
+            self._valances[rows_array] = numpy.array(valances, dtype=numpy.int64)
+            self._active[rows_array] = self._clock()
+
+    def iter_records(self):
+        """Yield every (pin_number, account_id, valance) record"""
+        valances = self._valances[:self._size].tolist()
+        for (pin_number, account_id), valance in zip(self._keys, valances):
+            yield pin_number, account_id, valance
+
+    def find_accounts(self, pin_number):
+        """Returns the list of account IDs with the received Pin Number"""
+        pin_rows = self._pin_rows.get(pin_number)
+        if pin_rows is None:
+            return []
+        keys = self._keys
+        return [keys[row][1] for row in pin_rows]
+
+    def find_accounts_many(self, pin_numbers):
+        """Returns the list of account IDs of each pin number"""
+        return [self.find_accounts(pin_number) for pin_number in pin_numbers]
+
+    def get_valance(self, pin_number, account_id):
+        """Return the balance of the account"""
+        row = self._rows.get((pin_number, account_id))
+        return None if row is None else int(self._valances[row])
+
+    def get_valance_many(self, keys):
+        """Return the balance of each (pin_number, account_id)"""
+        get = self._rows.get
+        rows = [get(tuple(key)) for key in keys]
+        found = [row for row in rows if row is not None]
+        valances = iter(self._valances[found].tolist())
+        return [None if row is None else next(valances) for row in rows]
+
+    def update_valance(self, pin_number, account_id, dollar):
+        """Modify the balance of the account"""
+        row = self._rows.get((pin_number, account_id))
+        if row is not None:
+            self._valances[row] += dollar
+            self._active[row] = self._clock()
+
+    def bulk_update_valance(self, changes):
+        """Modify the balances of several accounts from (pin_number, account_id, dollar)"""
+        get = self._rows.get
+        rows, dollars = [], []
+        for pin_number, account_id, dollar in changes:
+            row = get((pin_number, account_id))
+            if row is not None:
+                rows.append(row)
+                dollars.append(dollar)
+        if rows:
+            rows = numpy.array(rows, dtype=numpy.int64)
+            # add.at sums the changes of the same account
+            numpy.add.at(self._valances, rows, numpy.array(dollars, dtype=numpy.int64))
+            self._active[rows] = self._clock()
+
+    def conditional_update_valance(self, pin_number, account_id, dollar):
+        """Decrease the balance of the account only if the balance is enough"""
+        row = self._rows.get((pin_number, account_id))
+        if row is None or self._valances[row] < dollar:
+            return False
+        self._valances[row] -= dollar
+        self._active[row] = self._clock()
+        return True
+
+    def transfer_valance(self, src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar):
+        """Move the dollars between the accounts only if the balance of the src account is enough"""
+        src_row = self._rows.get((src_pin_number, src_account_id))
+        dst_row = self._rows.get((dst_pin_number, dst_account_id))
+        if src_row is None or dst_row is None or self._valances[src_row] < dollar:
+            return False
+        self._valances[src_row] -= dollar
+        self._valances[dst_row] += dollar
+        self._active[[src_row, dst_row]] = self._clock()
+        return True
+
+    def total(self) -> int:
+        """The sum of every balance"""
+        return int(self._valances[:self._size].sum())
+
+    def pin_totals(self) -> dict:
+        """The sum of the balances of each pin number"""
+        totals = numpy.zeros(len(self._pin_numbers), dtype=numpy.int64)
+        numpy.add.at(totals, self._pin_codes[:self._size], self._valances[:self._size])
+        return dict(zip(self._pin_numbers, totals.tolist()))
+
+    def apply_deltas(self, rows, dollars):
+        """Add the dollars to the balances of the rows (NumPy arrays, as returned by *_deltas)"""
+        # add.at sums the changes of the same row
+        numpy.add.at(self._valances, rows, dollars)
+        self._active[rows] = self._clock()
+
+    def row_keys(self, rows):
+        """The (pin_numbers, account_ids) lists of the rows"""
+        pin_numbers = numpy.array(self._pin_numbers, dtype=object)[self._pin_codes[rows]]
+        return pin_numbers.tolist(), self._account_ids[rows].tolist()
+
+    @staticmethod
+    def _nonzero(deltas):
+        rows = numpy.flatnonzero(deltas)
+        return rows, deltas[rows]
+
+    def interest_deltas(self, rate) -> tuple:
+        """
+        The (rows, dollars) arrays adding rate * balance (rounded down) to every positive balance.
+        Apply them with apply_deltas of the controller.
+        """
+        if not isinstance(rate, (int, float)):
+            raise AtmControllerInputException("rate", "number")
+        valances = self._valances[:self._size]
+        return self._nonzero(numpy.floor(numpy.maximum(valances, 0) * rate).astype(numpy.int64))
+
+    def fee_deltas(self, dollar, below=None) -> tuple:
+        """
+        The (rows, dollars) arrays charging the fee to every account,
+        or to the accounts whose balance is under 'below'. Balances may become negative.
+        Apply them with apply_deltas of the controller.
+        """
+        if not isinstance(dollar, int) or dollar < 0:
+            raise AtmControllerInputException("dollar", "non-negative int")
+        if not (below is None or isinstance(below, int)):
+            raise AtmControllerInputException("below", "int")
+        valances = self._valances[:self._size]
+        deltas = numpy.full(self._size, -dollar, dtype=numpy.int64)
+        if below is not None:
+            deltas[valances >= below] = 0
+        return self._nonzero(deltas)
+
+    def _accounts_where(self, mask):
+        keys = self._keys
+        return [keys[row] for row in numpy.flatnonzero(mask).tolist()]
+
+    def negative_accounts(self) -> list:
+        """The (pin_number, account_id) of the accounts with a negative balance"""
+        return self._accounts_where(self._valances[:self._size] < 0)
+
+    def dormant_accounts(self, since) -> list:
+        """The (pin_number, account_id) of the accounts whose balance hasn't changed since the time"""
+        if not isinstance(since, (int, float)):
+            raise AtmControllerInputException("since", "timestamp")
+        return self._accounts_where(self._active[:self._size] < since)
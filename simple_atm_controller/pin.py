@@ -5,29 +5,49 @@ from .exceptions import InvalidPin, InvalidValidationRule
 class Pin:
     """
     It is an object that receives Pin Number, verifies and manages it.
+    Pin is read-only and hashable, so it can be used as a key of dict/set.
     """
+    __slots__ = ('_pin_number',)
+
     def __init__(self, pin_number, rule=None):
-        self._pin_number = self._validate(
-            pin_number,
-            rule if rule is not None else PinDefaultRule()
-        )
+        if not self._check(pin_number, rule if rule is not None else DEFAULT_PIN_RULE):
+            raise InvalidPin(pin_number)
+        self._pin_number = pin_number
+
+    @classmethod
+    def parse(cls, pin_number, rule=None):
+        """
+        Return the Pin, or None if the pin_number is invalid, without raising InvalidPin.
+        An invalid rule is a programming error, so it still raises InvalidValidationRule.
+        """
+        if not cls._check(pin_number, rule if rule is not None else DEFAULT_PIN_RULE):
+            return None
+        pin = cls.__new__(cls)
+        pin._pin_number = pin_number
+        return pin
 
-    def _validate(self, pin_number, rule):
-        if rule.__class__.__bases__[0] is not PinValidationRule:
+    @staticmethod
+    def _check(pin_number, rule):
+        if not is_pin_rule(rule):
             raise InvalidValidationRule('PinValidationRule')
 
         validation_result = rule.validate(pin_number)
         if  not isinstance(validation_result, bool):
             raise InvalidValidationRule('PinValidationRule')
 
-        if validation_result is True:
-            return pin_number
-
-        raise InvalidPin(pin_number)
+        return validation_result
 
     def __repr__(self):
         return f"Pin({self._pin_number})"
 
+    def __eq__(self, other):
+        if not isinstance(other, Pin):
+            return NotImplemented
+        return self._pin_number == other._pin_number
+
+    def __hash__(self):
+        return hash(self._pin_number)
+
     @property
     def pin_number(self):
         return self._pin_number
@@ -46,5 +66,36 @@ class PinValidationRule(metaclass=ABCMeta):
 
 class PinDefaultRule(PinValidationRule):
 
-    def validate(self, pin_number ,a=1) -> bool:
+    def validate(self, pin_number) -> bool:
         return isinstance(pin_number, str)
+
+
+class PinRegexRule(PinValidationRule):
+    """
+    Rule to validate pin_number with a regular expression.
+    The pattern is compiled once when the rule is created.
+    If fullmatch is True, the whole pin_number must match the pattern.
+    """
+
+    def __init__(self, pattern, flags=0, fullmatch=False):
+        import re
+        compiled = re.compile(pattern, flags)
+        self._match = compiled.fullmatch if fullmatch else compiled.search
+
+    def validate(self, pin_number) -> bool:
+        return isinstance(pin_number, str) and self._match(pin_number) is not None
+
+
+DEFAULT_PIN_RULE = PinDefaultRule()
+_PIN_RULE_CLASSES = {PinDefaultRule, PinRegexRule}
+
+
+def is_pin_rule(rule) -> bool:
+    """Check the rule is a PinValidationRule. The checked rule classes are cached."""
+    rule_class = type(rule)
+    if rule_class in _PIN_RULE_CLASSES:
+        return True
+    if issubclass(rule_class, PinValidationRule):
+        _PIN_RULE_CLASSES.add(rule_class)
+        return True
+    return False
@@ -0,0 +1,57 @@
+class ResultCode(str):
+    """
+    Machine-readable code of a result or an error of the controller.
+    A code is the str of the message used before, with a 'name',
+    so (True, ResultCode.SUCCESS) == (True, "success").
+    The codes are created once, at import, and compared by identity.
+    It works like a str Enum without importing enum, to keep the startup fast.
+    """
+
+    def __new__(cls, name, value):
+        code = super().__new__(cls, value)
+        code.name = name
+        return code
+
+    def __repr__(self):
+        return f"ResultCode.{self.name}"
+
+    def __reduce__(self):
+        return getattr, (ResultCode, self.name)
+
+    @classmethod
+    def members(cls) -> dict:
+        """Every code by its name"""
+        return {name: code for name, code in vars(cls).items() if isinstance(code, cls)}
+
+
+for _name, _value in [
+    # Results of deposit/withdraw/transfer/authenticate
+    ("SUCCESS", "success"),
+    ("INSUFFICIENT_BALANCE", "insufficient balance"),
+    ("INSUFFICIENT_CASH", "insufficient cash"),
+    ("DAILY_LIMIT_EXCEEDED", "daily limit exceeded"),
+    ("TOO_MANY_REQUESTS", "too many requests"),
+    ("UNKNOWN_DESTINATION", "unknown destination"),
+    ("LIMITS_FULL", "limits full"),
+    ("INVALID_PIN", "invalid pin"),
+    ("INVALID_ACCOUNT", "invalid account"),
+    # Errors, as the 'code' of the exceptions
+    ("INVALID_RULE", "invalid rule"),
+    ("INVALID_INPUT", "invalid input"),
+    ("INVALID_QUERY", "invalid query"),
+    ("INVALID_JOURNAL", "invalid journal"),
+    ("INVALID_LEDGER_FILE", "invalid ledger file"),
+    ("CONTROLLER_ERROR", "controller error"),
+]:
+    setattr(ResultCode, _name, ResultCode(_name, _value))
+del _name, _value
+
+
+# The results are shared tuples, so returning them allocates nothing
+SUCCESS = (True, ResultCode.SUCCESS)
+INSUFFICIENT_BALANCE = (False, ResultCode.INSUFFICIENT_BALANCE)
+INSUFFICIENT_CASH = (False, ResultCode.INSUFFICIENT_CASH)
+DAILY_LIMIT_EXCEEDED = (False, ResultCode.DAILY_LIMIT_EXCEEDED)
+TOO_MANY_REQUESTS = (False, ResultCode.TOO_MANY_REQUESTS)
+UNKNOWN_DESTINATION = (False, ResultCode.UNKNOWN_DESTINATION)
+LIMITS_FULL = (False, ResultCode.LIMITS_FULL)
@@ -0,0 +1,79 @@
+from .pin import Pin
+from .account import Account
+from .atm_controller import AtmController
+from .exceptions import AtmControllerException, AtmControllerInputException
+
+# The balance of an account that the session hasn't read yet
+UNREAD = object()
+
+
+class AtmSession:
+    """
+    A card session on the controller: the pin is resolved once into its accounts,
+    and the following operations work on those accounts.
+        - The accounts are checked by a dict lookup instead of being validated again.
+        - The balances are read once per session, all at once if the controller
+          overrides get_valance_query_many, and kept up to date by the session.
+          They only answer get_valance: a withdrawal is always decided by the data model,
+          under the account lock, so sessions on the same card can't overdraw it.
+        - The deposits/withdrawals go through deposit/withdraw of the controller,
+          with every option of it (locks, journal, limits, instrumentation, ...).
+    Use a session from one thread, and for a short time:
+    a balance changed by another session isn't seen by get_valance of this one.
+    """
+
+    def __init__(self, controller: AtmController, pin: Pin, prefetch=True):
+        if not isinstance(controller, AtmController):
+            raise AtmControllerInputException("controller", "AtmController")
+        self.controller = controller
+        self.pin = pin
+        self.accounts = controller.find_accounts(pin)
+        self._valances = dict.fromkeys(self.accounts, UNREAD)
+        if prefetch and self.accounts:
+            results = controller.prefetch_valances(self.accounts)
+            if results is not None:
+                self._valances.update(zip(self.accounts, results))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return f"AtmSession(pin_number={self.pin.pin_number}, accounts={len(self.accounts)})"
+
+    def close(self):
+        """Forget the accounts and the balances of the session"""
+        self.accounts = []
+        self._valances = {}
+
+    def _valance(self, account):
+        if not isinstance(account, Account):
+            raise AtmControllerInputException("account", "Account")
+        try:
+            return self._valances[account]
+        except KeyError:
+            raise AtmControllerException("The account isn't an account of the session")
+
+    def get_valance(self, account: Account) -> int:
+        valance = self._valance(account)
+        if valance is UNREAD:
+            valance = self._valances[account] = self.controller.get_valance(account)
+        return valance
+
+    def deposit(self, account: Account, dollar: int):
+        valance = self._valance(account)
+        self.controller.deposit(account, dollar)
+        if valance is not UNREAD and valance is not None:
+            self._valances[account] = valance + dollar
+
+    def withdraw(self, account: Account, dollar: int):
+        valance = self._valance(account)
+        result = self.controller.withdraw(account, dollar)
+        if result[0] and valance is not UNREAD and valance is not None:
+            self._valances[account] = valance - dollar
+        else:
+            # The data model decided on its own balance, which may differ from the session's
+            self._valances[account] = UNREAD
+        return result
@@ -0,0 +1,313 @@
+import os, threading
+import multiprocessing
+from .ledger import Ledger
+from .exceptions import AtmControllerException, AtmControllerInputException
+
+BULK_CHUNK = 50_000
+# A message of several queries, answered by the list of their responses
+BATCH = "__batch__"
+
+
+def _execute(ledger, method_name, args):
+    try:
+        result = getattr(ledger, method_name)(*args)
+        if method_name == "iter_records":
+            result = list(result)
+        return True, result
+    except Exception as error:
+        return False, error
+
+
+def _serve(connection):
+    """Worker process: owns one partition of the ledger and answers the queries to it"""
+    ledger = Ledger()
+    while True:
+        request = connection.recv()
+        if request is None:
+            connection.close()
+            return
+        method_name, args = request
+        if method_name == BATCH:
+            connection.send([_execute(ledger, *query) for query in args])
+        else:
+            connection.send(_execute(ledger, method_name, args))
+
+
+class _Request:
+    __slots__ = ('method_name', 'args', 'response')
+
+    def __init__(self, method_name, args):
+        self.method_name = method_name
+        self.args = args
+        self.response = None
+
+    def result(self):
+        ok, result = self.response
+        if not ok:
+            raise result
+        return result
+
+
+class _Shard:
+
+    def __init__(self, context):
+        self.connection, worker_connection = context.Pipe()
+        self.process = context.Process(target=_serve, args=(worker_connection,), daemon=True)
+        self.process.start()
+        worker_connection.close()
+        # Held by the thread talking to the worker
+        self.lock = threading.Lock()
+        self._pending = []
+        self._pending_lock = threading.Lock()
+        # Set when a send/recv fails: a response may be left in the pipe, so it's never used again
+        self.dead = False
+
+    def send(self, message):
+        if self.dead:
+            raise AtmControllerException("The worker of the shard is unavailable")
+        try:
+            self.connection.send(message)
+        except BaseException:
+            self.dead = True
+            raise
+
+    def recv(self):
+        try:
+            return self.connection.recv()
+        except BaseException:
+            self.dead = True
+            raise
+
+    def call(self, method_name, *args):
+        """
+        Queries of several threads are combined: the thread that takes the lock
+        sends every pending query in one message, and the others find their response ready.
+        So the concurrent queries share a round trip instead of waiting for one each.
+        """
+        request = _Request(method_name, args)
+        with self._pending_lock:
+            self._pending.append(request)
+        with self.lock:
+            if request.response is None:
+                with self._pending_lock:
+                    batch, self._pending = self._pending, []
+                self._round_trip(batch)
+        return request.result()
+
+    def _round_trip(self, batch):
+        try:
+            if len(batch) == 1:
+                self.send((batch[0].method_name, batch[0].args))
+                responses = [self.recv()]
+            else:
+                self.send((BATCH, [(request.method_name, request.args) for request in batch]))
+                responses = self.recv()
+        except Exception as error:
+            responses = [(False, error)] * len(batch)
+        except BaseException:
+            # e.g. KeyboardInterrupt: the other threads of the batch must not wait for a response
+            error = AtmControllerException("The worker of the shard is unavailable")
+            for request in batch:
+                request.response = (False, error)
+            raise
+        for request, response in zip(batch, responses):
+            request.response = response
+
+
+def _unpack_responses(responses):
+    for ok, result in responses:
+        if not ok:
+            raise result
+    return [result for _, result in responses]
+
+
+class ShardedLedger:
+    """
+    Data model that partitions the accounts across worker processes,
+    with the same query methods as the Ledger (use it with LedgerAtmController).
+    Each worker process owns a Ledger of the accounts whose pin_number hashes to it.
+    All accounts of a pin are in the same worker, so find_accounts asks only one worker.
+    It's a partitioning layer, not a throughput one: every query is pickled and sent
+    through a pipe by the controller's process, which stays the bottleneck,
+    so it's slower than a Ledger whatever the number of cores.
+    The concurrent queries of a worker share one message, and the *_many/bulk queries
+    (apply_batch of the controller) send one message per worker for a whole batch.
+    """
+
+    def __init__(self, shards=None, records=None, context=None):
+        shards = shards if shards is not None else os.cpu_count() or 1
+        if not isinstance(shards, int) or shards < 1:
+            raise AtmControllerInputException("shards", "positive int")
+        context = context if context is not None else multiprocessing.get_context()
+        self._shards = [_Shard(context) for _ in range(shards)]
+        # (pin_number, account_id, dollar) owed back to the src of the failed transfers
+        self.unsettled = []
+        self._unsettled_lock = threading.Lock()
+        if records is not None:
+            self.bulk_load(records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        return sum(self._broadcast("__len__"))
+
+    def close(self):
+        for shard in self._shards:
+            with shard.lock:
+                if shard.process.is_alive():
+                    if shard.dead:
+                        shard.process.terminate()
+                    else:
+                        shard.connection.send(None)
+                shard.process.join()
+                shard.connection.close()
+
+    def _shard(self, pin_number):
+        return self._shards[hash(pin_number) % len(self._shards)]
+
+    def _broadcast(self, method_name, args_list=None):
+        """Send the request to every shard first, then wait for them together"""
+        if args_list is None:
+            args_list = [()] * len(self._shards)
+        responses = [None] * len(self._shards)
+        for shard in self._shards:
+            shard.lock.acquire()
+        try:
+            for index, (shard, args) in enumerate(zip(self._shards, args_list)):
+                try:
+                    shard.send((method_name, args))
+                except BaseException as error:
+                    responses[index] = (False, error)
+            # Read the response of every shard sent to, even after a failure,
+            # so no response is left in a pipe (a failed shard is marked dead)
+            for index, shard in enumerate(self._shards):
+                if responses[index] is None:
+                    try:
+                        responses[index] = shard.recv()
+                    except BaseException as error:
+                        responses[index] = (False, error)
+        finally:
+            for shard in self._shards:
+                shard.lock.release()
+        for ok, result in responses:
+            if not ok and not isinstance(result, Exception):
+                raise result
+        return _unpack_responses(responses)
+
+    def _partition(self, method_name, items):
+        """Split the (pin_number, ...) items by shard, and send them in chunks"""
+        chunks = [[] for _ in self._shards]
+        count = 0
+        results = []
+        for item in items:
+            chunks[hash(item[0]) % len(self._shards)].append(item)
+            count += 1
+            if count >= BULK_CHUNK:
+                results.extend(self._broadcast(method_name, [(chunk,) for chunk in chunks]))
+                chunks = [[] for _ in self._shards]
+                count = 0
+        if count:
+            results.extend(self._broadcast(method_name, [(chunk,) for chunk in chunks]))
+        return results
+
+    def bulk_load(self, records):
+        """
+        Load an iterable of (pin_number, account_id, valance) records.
+        An existing account is overwritten by the loaded valance.
+        """
+        self._partition("bulk_load", records)
+
+    def iter_records(self):
+        """Yield every (pin_number, account_id, valance) record"""
+        for records in self._broadcast("iter_records"):
+            yield from records
+
+    def find_accounts(self, pin_number):
+        """Returns the list of account IDs with the received Pin Number"""
+        return self._shard(pin_number).call("find_accounts", pin_number)
+
+    def get_valance(self, pin_number, account_id):
+        """Return the balance of the account"""
+        return self._shard(pin_number).call("get_valance", pin_number, account_id)
+
+    def _gather(self, method_name, items, pin_number_of):
+        """Ask each shard for its items in one round trip, and return the results in order"""
+        chunks = [[] for _ in self._shards]
+        positions = [[] for _ in self._shards]
+        for position, item in enumerate(items):
+            index = hash(pin_number_of(item)) % len(self._shards)
+            chunks[index].append(item)
+            positions[index].append(position)
+        results = [None] * len(items)
+        for shard_positions, shard_results in zip(
+            positions, self._broadcast(method_name, [(chunk,) for chunk in chunks])
+        ):
+            for position, result in zip(shard_positions, shard_results):
+                results[position] = result
+        return results
+
+    def find_accounts_many(self, pin_numbers):
+        """Returns the list of account IDs of each pin number"""
+        return self._gather("find_accounts_many", pin_numbers, lambda pin_number: pin_number)
+
+    def get_valance_many(self, keys):
+        """Return the balance of each (pin_number, account_id)"""
+        return self._gather("get_valance_many", keys, lambda key: key[0])
+
+    def update_valance(self, pin_number, account_id, dollar):
+        """Modify the balance of the account"""
+        self._shard(pin_number).call("update_valance", pin_number, account_id, dollar)
+
+    def bulk_update_valance(self, changes):
+        """Modify the balances of several accounts from (pin_number, account_id, dollar)"""
+        self._partition("bulk_update_valance", changes)
+
+    def conditional_update_valance(self, pin_number, account_id, dollar):
+        """Decrease the balance of the account only if the balance is enough"""
+        return self._shard(pin_number).call(
+            "conditional_update_valance", pin_number, account_id, dollar
+        )
+
+    def transfer_valance(self, src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar):
+        """
+        Move the dollars between the accounts only if the balance of the src account is enough
+        and the dst account exists.
+        Between the pins of different workers, it's a withdrawal and then a deposit:
+        if the deposit fails (e.g. the dst worker died), the dollars are credited back to src,
+        and a credit that fails too is kept in 'unsettled' for settle().
+        """
+        src_shard = self._shard(src_pin_number)
+        dst_shard = self._shard(dst_pin_number)
+        if src_shard is dst_shard:
+            return src_shard.call(
+                "transfer_valance", src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar
+            )
+        if dst_shard.call("get_valance", dst_pin_number, dst_account_id) is None:
+            return False
+        if not src_shard.call("conditional_update_valance", src_pin_number, src_account_id, dollar):
+            return False
+        try:
+            dst_shard.call("update_valance", dst_pin_number, dst_account_id, dollar)
+        except BaseException:
+            self._credit_back(src_pin_number, src_account_id, dollar)
+            raise
+        return True
+
+    def _credit_back(self, pin_number, account_id, dollar):
+        try:
+            self._shard(pin_number).call("update_valance", pin_number, account_id, dollar)
+        except Exception:
+            with self._unsettled_lock:
+                self.unsettled.append((pin_number, account_id, dollar))
+
+    def settle(self) -> int:
+        """Retry the credits of the failed transfers in 'unsettled'. Returns the number left"""
+        with self._unsettled_lock:
+            credits, self.unsettled = self.unsettled, []
+        for credit in credits:
+            self._credit_back(*credit)
+        return len(self.unsettled)
@@ -0,0 +1,185 @@
+import sqlite3
+from contextlib import contextmanager
+from queue import Queue
+from .exceptions import AtmControllerInputException
+
+SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS accounts ("
+    "pin_number TEXT NOT NULL, account_id TEXT NOT NULL, valance INTEGER NOT NULL)",
+    # Serves the lookups by pin_number too, as the leftmost column of the index
+    "CREATE UNIQUE INDEX IF NOT EXISTS accounts_pin_account "
+    "ON accounts (pin_number, account_id)",
+)
+# The statements are constant, so each connection prepares them once and reuses them
+COUNT = "SELECT COUNT(*) FROM accounts"
+UPSERT = (
+    "INSERT INTO accounts (pin_number, account_id, valance) VALUES (?, ?, ?) "
+    "ON CONFLICT (pin_number, account_id) DO UPDATE SET valance = excluded.valance"
+)
+SELECT_CHUNK = (
+    "SELECT rowid, pin_number, account_id, valance FROM accounts "
+    "WHERE rowid > ? ORDER BY rowid LIMIT ?"
+)
+SELECT_ACCOUNTS = "SELECT account_id FROM accounts WHERE pin_number = ? ORDER BY rowid"
+SELECT_VALANCE = "SELECT valance FROM accounts WHERE pin_number = ? AND account_id = ?"
+UPDATE_VALANCE = (
+    "UPDATE accounts SET valance = valance + ? WHERE pin_number = ? AND account_id = ?"
+)
+CONDITIONAL_UPDATE_VALANCE = (
+    "UPDATE accounts SET valance = valance - ? "
+    "WHERE pin_number = ? AND account_id = ? AND valance >= ?"
+)
+FETCH_SIZE = 10_000
+
+
+class SqliteLedger:
+    """
+    Data model stored in a SQLite database, with the same query methods as the Ledger
+    (use it with LedgerAtmController).
+        - The accounts table is indexed on (pin_number, account_id).
+        - The database runs in WAL mode, so readers don't wait for the writer.
+        - A pool of 'pool_size' connections is shared by the threads.
+        - A withdrawal is a single conditional UPDATE statement.
+        - A transfer is a conditional UPDATE and an UPDATE in one transaction.
+    """
+
+    def __init__(self, path, pool_size=4, timeout=5.0, uri=False):
+        if not isinstance(pool_size, int) or pool_size < 1:
+            raise AtmControllerInputException("pool_size", "positive int")
+        self.path = path
+        self._pool = Queue()
+        self._connections = []
+        for _ in range(pool_size):
+            connection = sqlite3.connect(
+                path, timeout=timeout, uri=uri,
+                isolation_level=None, check_same_thread=False
+            )
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._connections.append(connection)
+            self._pool.put(connection)
+        with self._connection() as connection:
+            for statement in SCHEMA:
+                connection.execute(statement)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __len__(self):
+        with self._connection() as connection:
+            return connection.execute(COUNT).fetchone()[0]
+
+    def close(self):
+        for connection in self._connections:
+            connection.close()
+
+    @contextmanager
+    def _connection(self):
+        connection = self._pool.get()
+        try:
+            yield connection
+        finally:
+            self._pool.put(connection)
+
+    @contextmanager
+    def _transaction(self):
+        with self._connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield connection
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT")
+
+    def bulk_load(self, records):
+        """
+        Load an iterable of (pin_number, account_id, valance) records in one transaction.
+        An existing account is overwritten by the loaded valance.
+        """
+        with self._transaction() as connection:
+            connection.executemany(UPSERT, records)
+
+    def iter_records(self):
+        """
+        Yield every (pin_number, account_id, valance) record.
+        The records are read in chunks of FETCH_SIZE rows, and the connection goes back
+        to the pool before a chunk is yielded: queries made while iterating don't wait for it,
+        and an abandoned iterator holds no connection.
+        """
+        last_rowid = 0
+        while True:
+            with self._connection() as connection:
+                rows = connection.execute(SELECT_CHUNK, (last_rowid, FETCH_SIZE)).fetchall()
+            if not rows:
+                return
+            last_rowid = rows[-1][0]
+            for _, pin_number, account_id, valance in rows:
+                yield pin_number, account_id, valance
+
+    def find_accounts(self, pin_number):
+        """Returns the list of account IDs with the received Pin Number"""
+        with self._connection() as connection:
+            return [row[0] for row in connection.execute(SELECT_ACCOUNTS, (pin_number,))]
+
+    def get_valance(self, pin_number, account_id):
+        """Return the balance of the account"""
+        with self._connection() as connection:
+            row = connection.execute(SELECT_VALANCE, (pin_number, account_id)).fetchone()
+        return row[0] if row else None
+
+    def find_accounts_many(self, pin_numbers):
+        """Returns the list of account IDs of each pin number, with one connection"""
+        with self._connection() as connection:
+            return [
+                [row[0] for row in connection.execute(SELECT_ACCOUNTS, (pin_number,))]
+                for pin_number in pin_numbers
+            ]
+
+    def get_valance_many(self, keys):
+        """Return the balance of each (pin_number, account_id), with one connection"""
+        results = []
+        with self._connection() as connection:
+            for key in keys:
+                row = connection.execute(SELECT_VALANCE, key).fetchone()
+                results.append(row[0] if row else None)
+        return results
+
+    def update_valance(self, pin_number, account_id, dollar):
+        """Modify the balance of the account"""
+        with self._connection() as connection:
+            connection.execute(UPDATE_VALANCE, (dollar, pin_number, account_id))
+
+    def bulk_update_valance(self, changes):
+        """Modify the balances of several accounts from (pin_number, account_id, dollar) in one transaction"""
+        with self._transaction() as connection:
+            connection.executemany(UPDATE_VALANCE, (
+                (dollar, pin_number, account_id) for pin_number, account_id, dollar in changes
+            ))
+
+    def conditional_update_valance(self, pin_number, account_id, dollar):
+        """Decrease the balance of the account only if the balance is enough"""
+        with self._connection() as connection:
+            cursor = connection.execute(
+                CONDITIONAL_UPDATE_VALANCE, (dollar, pin_number, account_id, dollar)
+            )
+            return cursor.rowcount == 1
+
+    def transfer_valance(self, src_pin_number, src_account_id, dst_pin_number, dst_account_id, dollar):
+        """Move the dollars between the accounts only if the balance of the src account is enough"""
+        with self._connection() as connection:
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                moved = connection.execute(
+                    CONDITIONAL_UPDATE_VALANCE, (dollar, src_pin_number, src_account_id, dollar)
+                ).rowcount == 1 and connection.execute(
+                    UPDATE_VALANCE, (dollar, dst_pin_number, dst_account_id)
+                ).rowcount == 1
+            except BaseException:
+                connection.execute("ROLLBACK")
+                raise
+            connection.execute("COMMIT" if moved else "ROLLBACK")
+            return moved
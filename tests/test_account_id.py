@@ -1,7 +1,7 @@
 import unittest, re
 from string import ascii_letters
-from simple_atm_controller.exceptions import InvalidAccount, InvalidValidationRule
-from simple_atm_controller.account import Account, AccountValidationRule
+from simple_atm_controller.exceptions import InvalidAccount, InvalidValidationRule, InvalidPin
+from simple_atm_controller.account import Account, AccountValidationRule, AccountRegexRule
 from simple_atm_controller.pin import Pin
 
 
@@ -16,6 +16,22 @@ class AccountIdTestCase(unittest.TestCase):
         self.assertEqual(account_id.account_id, "IML")
         self.assertEqual(account_id.items, ("0000-0001", "IML"))
 
+    def test_value_object(self):
+        account_id = Account(self.pin_number, "IML")
+        self.assertEqual(account_id, Account(Pin("0000-0001"), "IML"))
+        self.assertNotEqual(account_id, Account(self.pin_number, "IML2"))
+        self.assertNotEqual(account_id, ("0000-0001", "IML"))
+        self.assertEqual(account_id, Account._trusted("0000-0001", "IML"))
+        self.assertEqual({account_id: 1}[Account._trusted("0000-0001", "IML")], 1)
+        self.assertFalse(hasattr(account_id, "__dict__"))
+        for name in ["account_id", "items", "other"]:
+            try:
+                setattr(account_id, name, "IML2")
+                self.assertTrue(False)
+            except AttributeError:
+                pass
+        self.assertEqual(account_id.items, ("0000-0001", "IML"))
+
     def test_default_exception(self):
         invalid_account_ids = [
             1, .1, ["0000"], ("0000",),
@@ -51,6 +67,23 @@ class AccountIdTestCase(unittest.TestCase):
             except InvalidAccount:
                 pass
 
+    def test_regex_validation_rule(self):
+        rule = AccountRegexRule(r"[a-z]+\d+")
+        full_rule = AccountRegexRule(r"[a-z]+\d+", fullmatch=True)
+        testcase = [
+            ("shino1025", True, True),
+            ("shino1025!", True, False),
+            ("1025", False, False),
+            (1025, False, False),
+        ]
+        for account_id, expect, full_expect in testcase:
+            for rule_i, expect_i in [(rule, expect), (full_rule, full_expect)]:
+                try:
+                    Account(self.pin_number, account_id, rule_i)
+                    self.assertTrue(expect_i)
+                except InvalidAccount:
+                    self.assertFalse(expect_i)
+
     def test_invalid_validation_rule_exception(self):
 
         class GoodRule(AccountValidationRule):
@@ -61,11 +94,16 @@ class AccountIdTestCase(unittest.TestCase):
             def validate(self, account_id) -> bool:
                 return "True"
 
+        class DeepRule(GoodRule):
+            pass
+
         class NotRule:
             pass
 
         testcase = [
             (GoodRule(), True),
+            (DeepRule(), True),
+            (AccountRegexRule(r"\w"), True),
             (InvalidReturnRule(), False),
             (NotRule(), False),
         ]
@@ -77,6 +115,24 @@ class AccountIdTestCase(unittest.TestCase):
             except InvalidValidationRule:
                 self.assertFalse(expect)
 
+    def test_parse(self):
+        account = Account.parse(self.pin_number, "shino1025")
+        self.assertEqual(account, Account(self.pin_number, "shino1025"))
+        self.assertIsNone(Account.parse(self.pin_number, 1025))
+        self.assertIsNone(Account.parse(self.pin_number, "shino1025", AccountRegexRule(r"^\d+$")))
+
+        class NotRule:
+            pass
+
+        for pin, rule, exception in [
+            ("00-01", None, InvalidPin), (self.pin_number, NotRule(), InvalidValidationRule)
+        ]:
+            try:
+                Account.parse(pin, "shino1025", rule)
+                self.assertTrue(False)
+            except exception:
+                pass
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,150 @@
+import unittest, asyncio
+from collections.abc import Iterable
+from simple_atm_controller.async_atm_controller import AsyncAtmController
+from simple_atm_controller.ledger import Ledger
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.account import Account
+from simple_atm_controller.exceptions import (
+    AtmControllerInputException,
+    AtmControllerQueryException,
+    AtmControllerException
+)
+from tests.data_model import DataBase
+
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+
+class AsyncAtmControllerTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        class TestAtmController(AsyncAtmController):
+            async def find_accounts_query(self, pin_number) -> Iterable:
+                await asyncio.sleep(0.01)
+                return self.model.find_accounts(pin_number)
+            async def get_valance_query(self, pin_number, account_id) -> int:
+                await asyncio.sleep(0.01)
+                return self.model.get_valance(pin_number, account_id)
+            async def update_valance_query(self, pin_number, account_id, dollar):
+                await asyncio.sleep(0.01)
+                self.model.update_valance(pin_number, account_id, dollar)
+
+        self.controller = TestAtmController
+        self.model = Ledger(DataBase().records)
+        self.pin_number = Pin("00-01")
+        self.account_id = Account(self.pin_number, "shino1025")
+
+    def test_invalid_atm_controller(self):
+        class InvalidAtmController(AsyncAtmController):
+            pass
+        try:
+            InvalidAtmController()
+            self.assertTrue(False)
+        except TypeError:
+            pass
+
+    def test_find_account(self):
+        module = self.controller(self.model)
+        accounts = run(module.find_accounts(self.pin_number))
+        self.assertEqual([account.items for account in accounts], [
+            ("00-01", "shino1025"), ("00-01", "shino102566")
+        ])
+        for pin_i in ["00-01", 11111]:
+            try:
+                run(module.find_accounts(pin_i))
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+
+    def test_invalid_query(self):
+
+        class InvalidController(self.controller):
+            async def find_accounts_query(self, pin_number):
+                return True
+            async def get_valance_query(self, pin_number, account_id) -> int:
+                return "True"
+
+        module = InvalidController(self.model)
+        for coroutine in [
+            module.find_accounts(self.pin_number),
+            module.get_valance(self.account_id),
+        ]:
+            try:
+                run(coroutine)
+                self.assertTrue(False)
+            except AtmControllerQueryException:
+                pass
+
+    def test_deposit_and_withdraw(self):
+        module = self.controller(self.model)
+        run(module.deposit(self.account_id, 27))
+        self.assertEqual(run(module.get_valance(self.account_id)), 100)
+        self.assertEqual(run(module.withdraw(self.account_id, 101)), (False, "insufficient balance"))
+        self.assertEqual(run(module.withdraw(self.account_id, 100)), (True, "success"))
+        self.assertEqual(run(module.get_valance(self.account_id)), 0)
+
+        testcase = [
+            (self.pin_number, 10, AtmControllerInputException),
+            ("P0001", 10, AtmControllerInputException),
+            (self.account_id, "100", AtmControllerInputException),
+            (self.account_id, -10, AtmControllerException),
+        ]
+        for account_i, dollar, exception in testcase:
+            for method in [module.deposit, module.withdraw]:
+                try:
+                    run(method(account_i, dollar))
+                    self.assertTrue(False)
+                except exception:
+                    pass
+
+    def test_conditional_update_withdraw(self):
+
+        class ConditionalController(self.controller):
+            async def get_valance_query(self, pin_number, account_id) -> int:
+                raise AssertionError
+            async def conditional_update_query(self, pin_number, account_id, dollar) -> bool:
+                return self.model.conditional_update_valance(pin_number, account_id, dollar)
+
+        module = ConditionalController(self.model)
+        self.assertEqual(run(module.withdraw(self.account_id, 74)), (False, "insufficient balance"))
+        self.assertEqual(run(module.withdraw(self.account_id, 73)), (True, "success"))
+
+    def test_concurrent_sessions(self):
+        count = 200
+
+        class BarrierController(self.controller):
+            # get_valance_query returns only once every session is waiting in it
+            in_flight = 0
+            peak = 0
+            everyone = None
+
+            async def get_valance_query(self, pin_number, account_id) -> int:
+                self.in_flight += 1
+                self.peak = max(self.peak, self.in_flight)
+                if self.in_flight == count:
+                    self.everyone.set()
+                await asyncio.wait_for(self.everyone.wait(), 5)
+                self.in_flight -= 1
+                return self.model.get_valance(pin_number, account_id)
+
+        module = BarrierController(Ledger(
+            ["P%04d" % i, "A%04d" % i, 100] for i in range(count)
+        ))
+
+        async def session(i):
+            account = (await module.find_accounts(Pin("P%04d" % i)))[0]
+            await module.get_valance(account)
+            return await module.withdraw(account, 30)
+
+        async def sessions():
+            module.everyone = asyncio.Event()
+            return await asyncio.gather(*[session(i) for i in range(count)])
+
+        results = run(sessions())
+        self.assertEqual(results, [(True, "success")] * count)
+        # the sessions waited for their queries at the same time
+        self.assertEqual(module.peak, count)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,8 +1,9 @@
 import unittest
 from collections.abc import Iterable
 from simple_atm_controller.atm_controller import AtmController
-from simple_atm_controller.pin import Pin
+from simple_atm_controller.pin import Pin, PinRegexRule
 from simple_atm_controller.account import Account
+from simple_atm_controller.results import ResultCode
 from simple_atm_controller.exceptions import (
     AtmControllerInputException,
     AtmControllerQueryException,
@@ -67,6 +68,19 @@ class AtmControllerTestCase(unittest.TestCase):
         except AtmControllerQueryException:
             pass
 
+    def test_authenticate(self):
+        module = self.controller()
+        code, accounts = module.authenticate("P0001")
+        self.assertIs(code, ResultCode.SUCCESS)
+        self.assertEqual(accounts, module.find_accounts(self.pin_number))
+        self.assertEqual(module.authenticate(11111), (ResultCode.INVALID_PIN, None))
+        self.assertEqual(module.authenticate("P0001", PinRegexRule(r"^\d+$")), (ResultCode.INVALID_PIN, None))
+
+    def test_result_codes(self):
+        module = self.controller()
+        self.assertIs(module.withdraw(self.account_id, 1)[1], ResultCode.SUCCESS)
+        self.assertIs(module.withdraw(self.account_id, 100)[1], ResultCode.INSUFFICIENT_BALANCE)
+
     def test_get_valance(self):
         module = self.controller()
         testcase = [
@@ -140,3 +154,271 @@ class AtmControllerTestCase(unittest.TestCase):
             except AtmControllerException:
                 self.assertEqual(expect, "exception")
 
+    def test_transfer(self):
+        calls = []
+
+        class TransferController(self.controller):
+            def update_valance_query(self, pin_number, account_id, dollar):
+                calls.append(('update_valance_query', account_id, dollar))
+
+        module = TransferController()
+        dst = Account(self.pin_number, "A0002")
+        testcase = [
+            (self.account_id, dst, 10, "success", True),
+            (self.account_id, dst, 11, "success", False),
+            (self.account_id, "A0002", 10, "input_exception", False),
+            (self.pin_number, dst, 10, "input_exception", False),
+            (self.account_id, dst, "10", "input_exception", False),
+            (self.account_id, dst, -10, "exception", False),
+            (self.account_id, self.account_id, 10, "exception", False),
+        ]
+        for src, dst_i, dollar, expect, expect_status in testcase:
+            try:
+                result_status, _ = module.transfer(src, dst_i, dollar)
+                self.assertEqual(expect, "success")
+                self.assertEqual(expect_status, result_status)
+            except AtmControllerInputException:
+                self.assertEqual(expect, "input_exception")
+            except AtmControllerException:
+                self.assertEqual(expect, "exception")
+        self.assertEqual(calls, [
+            ('update_valance_query', "A0001", -10), ('update_valance_query', "A0002", 10)
+        ])
+
+    def test_transfer_query(self):
+        calls = []
+
+        class TransferController(self.controller):
+            def transfer_query(self, src_pin_number, src_account_id,
+                               dst_pin_number, dst_account_id, dollar) -> bool:
+                calls.append((src_account_id, dst_account_id, dollar))
+                return dollar <= 10
+
+        module = TransferController()
+        dst = Account(self.pin_number, "A0002")
+        self.assertEqual(module.transfer(self.account_id, dst, 10), (True, "success"))
+        self.assertEqual(module.transfer(self.account_id, dst, 11), (False, "insufficient balance"))
+        self.assertEqual(calls, [("A0001", "A0002", 10), ("A0001", "A0002", 11)])
+
+        class InvalidController(self.controller):
+            def transfer_query(self, *args) -> bool:
+                return "success"
+        try:
+            InvalidController().transfer(self.account_id, dst, 10)
+            self.assertTrue(False)
+        except AtmControllerQueryException:
+            pass
+
+    def test_transfer_unknown_destination(self):
+        valances = {"A0001": 10, "A0002": 0}
+
+        class TwoStepController(self.controller):
+            def get_valance_query(self, pin_number, account_id) -> int:
+                return valances.get(account_id)
+            def update_valance_query(self, pin_number, account_id, dollar):
+                if account_id in valances:
+                    valances[account_id] += dollar
+
+        class TransferController(TwoStepController):
+            def transfer_query(self, src_pin_number, src_account_id,
+                               dst_pin_number, dst_account_id, dollar) -> bool:
+                if dst_account_id not in valances or valances[src_account_id] < dollar:
+                    return False
+                valances[src_account_id] -= dollar
+                valances[dst_account_id] += dollar
+                return True
+
+        unknown = Account(self.pin_number, "A0099")
+        dst = Account(self.pin_number, "A0002")
+        for module in [TwoStepController(), TransferController()]:
+            self.assertEqual(module.transfer(self.account_id, unknown, 1), (False, "unknown destination"))
+            self.assertIs(module.transfer(self.account_id, unknown, 1)[1], ResultCode.UNKNOWN_DESTINATION)
+            self.assertEqual(module.transfer(self.account_id, dst, 11), (False, "insufficient balance"))
+            self.assertEqual(valances, {"A0001": 10, "A0002": 0})
+        self.assertEqual(module.transfer(self.account_id, dst, 10), (True, "success"))
+        self.assertEqual(valances, {"A0001": 0, "A0002": 10})
+
+    def test_transfer_rollback(self):
+        valances = {"A0001": 10, "A0002": 0}
+
+        class FailingController(self.controller):
+            def get_valance_query(self, pin_number, account_id) -> int:
+                return valances.get(account_id)
+            def update_valance_query(self, pin_number, account_id, dollar):
+                if account_id == "A0002":
+                    raise ConnectionError("The data model is unavailable")
+                valances[account_id] += dollar
+
+        try:
+            FailingController().transfer(self.account_id, Account(self.pin_number, "A0002"), 10)
+            self.assertTrue(False)
+        except ConnectionError:
+            pass
+        self.assertEqual(valances, {"A0001": 10, "A0002": 0})
+
+    def test_transfer_unsettled(self):
+        valances = {"A0001": 10, "A0002": 0}
+        available = {"A0001": True, "A0002": False}
+
+        class FailingController(self.controller):
+            def get_valance_query(self, pin_number, account_id) -> int:
+                return valances.get(account_id)
+            def update_valance_query(self, pin_number, account_id, dollar):
+                if dollar > 0 and not available[account_id]:
+                    raise ConnectionError("The data model is unavailable")
+                valances[account_id] += dollar
+                # The data model goes down after the withdrawal from src
+                available["A0001"] = False
+
+        module = FailingController()
+        try:
+            module.transfer(self.account_id, Account(self.pin_number, "A0002"), 10)
+            self.assertTrue(False)
+        except ConnectionError:
+            pass
+        # The credit back failed too: it's kept, not lost
+        self.assertEqual(valances, {"A0001": 0, "A0002": 0})
+        self.assertEqual(module.unsettled, [("P0001", "A0001", 10)])
+        self.assertEqual(module.settle(), 1)
+        self.assertEqual(module.unsettled, [("P0001", "A0001", 10)])
+        available["A0001"] = True
+        self.assertEqual(module.settle(), 0)
+        self.assertEqual(module.unsettled, [])
+        self.assertEqual(valances, {"A0001": 10, "A0002": 0})
+
+    def test_conditional_update_withdraw(self):
+        calls = []
+
+        class ConditionalController(self.controller):
+            def get_valance_query(self, pin_number, account_id) -> int:
+                calls.append('get_valance_query')
+                return 10
+            def update_valance_query(self, pin_number, account_id, dollar):
+                calls.append('update_valance_query')
+            def conditional_update_query(self, pin_number, account_id, dollar) -> bool:
+                calls.append('conditional_update_query')
+                return dollar <= 10
+
+        module = ConditionalController()
+        self.assertEqual(module.withdraw(self.account_id, 10), (True, "success"))
+        self.assertEqual(module.withdraw(self.account_id, 11), (False, "insufficient balance"))
+        self.assertEqual(calls, ['conditional_update_query'] * 2)
+
+    def test_invalid_conditional_update_query(self):
+
+        class InvalidController(self.controller):
+            def conditional_update_query(self, pin_number, account_id, dollar) -> bool:
+                return "True"
+
+        module = InvalidController()
+        try:
+            module.withdraw(self.account_id, 10)
+            self.assertTrue(False)
+        except AtmControllerQueryException:
+            pass
+
+    def test_apply_batch(self):
+        calls = []
+
+        class BatchController(self.controller):
+            def get_valance_query(self, pin_number, account_id) -> int:
+                calls.append(('get_valance_query', account_id))
+                return 10
+            def update_valance_query(self, pin_number, account_id, dollar):
+                calls.append(('update_valance_query', account_id, dollar))
+
+        module = BatchController()
+        other_account = Account(self.pin_number, "A0002")
+        results = module.apply_batch([
+            (self.account_id, 5, "deposit"),
+            (self.account_id, 15, "withdraw"),
+            (self.account_id, 1, "withdraw"),
+            (other_account, 11, "withdraw"),
+            (other_account, 10, "withdraw"),
+        ])
+        self.assertEqual(results, [
+            (True, "success"),
+            (True, "success"),
+            (False, "insufficient balance"),
+            (False, "insufficient balance"),
+            (True, "success"),
+        ])
+        self.assertEqual(calls, [
+            ('get_valance_query', "A0001"),
+            ('get_valance_query', "A0002"),
+            ('update_valance_query', "A0001", -10),
+            ('update_valance_query', "A0002", -10),
+        ])
+
+        class BulkController(BatchController):
+            def bulk_update_valance_query(self, changes):
+                calls.append(('bulk_update_valance_query', changes))
+
+        calls.clear()
+        BulkController().apply_batch([
+            (self.account_id, 5, "deposit"),
+            (other_account, 5, "deposit"),
+            (other_account, 5, "withdraw"),
+        ])
+        self.assertEqual(calls, [
+            ('get_valance_query', "A0002"),
+            ('bulk_update_valance_query', [("P0001", "A0001", 5)]),
+        ])
+
+    def test_invalid_apply_batch(self):
+        calls = []
+
+        class BatchController(self.controller):
+            def update_valance_query(self, pin_number, account_id, dollar):
+                calls.append(account_id)
+
+        module = BatchController()
+        testcase = [
+            ((self.account_id, 10, "transfer"), "input_exception"),
+            ((self.pin_number, 10, "deposit"), "input_exception"),
+            ((self.account_id, "10", "deposit"), "input_exception"),
+            ((self.account_id, 10), "input_exception"),
+            ("deposit", "input_exception"),
+            ((self.account_id, -10, "withdraw"), "exception"),
+        ]
+        for operation, expect in testcase:
+            try:
+                module.apply_batch([(self.account_id, 10, "deposit"), operation])
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                self.assertEqual(expect, "input_exception")
+            except AtmControllerException:
+                self.assertEqual(expect, "exception")
+        self.assertEqual(calls, [])
+
+    def test_apply_changes(self):
+        calls = []
+
+        class ChangeController(self.controller):
+            def update_valance_query(self, pin_number, account_id, dollar):
+                calls.append(('update_valance_query', account_id, dollar))
+
+        module = ChangeController()
+        count = module.apply_changes([("P0001", "A0001", 5), ("P0001", "A0002", 0), ("P0001", "A0003", -7)])
+        self.assertEqual(count, 2)
+        self.assertEqual(calls, [
+            ('update_valance_query', "A0001", 5),
+            ('update_valance_query', "A0003", -7),
+        ])
+
+        class BulkController(ChangeController):
+            def bulk_update_valance_query(self, changes):
+                calls.append(('bulk_update_valance_query', changes))
+
+        calls.clear()
+        BulkController().apply_changes(iter([("P0001", "A0001", -5)]))
+        self.assertEqual(calls, [('bulk_update_valance_query', [("P0001", "A0001", -5)])])
+
+        calls.clear()
+        for change in [("P0001", "A0001", "5"), ("P0001", 5), "change"]:
+            try:
+                module.apply_changes([("P0001", "A0001", 5), change])
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+        self.assertEqual(calls, [])
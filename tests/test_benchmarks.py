@@ -0,0 +1,48 @@
+import unittest
+from benchmarks import bench_controller, bench_startup, bench_rejections, bench_sharding, bench_locks
+
+
+class BenchmarkTestCase(unittest.TestCase):
+
+    def test_bench_controller(self):
+        results = bench_controller.run(sizes=[10], threads=[1, 2], count=50)
+        self.assertEqual(len(results), 2 * len(bench_controller.OPERATIONS))
+        for result in results:
+            self.assertEqual(set(result), {
+                "operation", "size", "threads", "ops_per_sec", "p50_us", "p99_us"
+            })
+            self.assertGreater(result["ops_per_sec"], 0)
+            self.assertLessEqual(result["p50_us"], result["p99_us"])
+
+    def test_bench_startup(self):
+        results = bench_startup.run(repeat=1)
+        self.assertEqual([result["name"] for result in results], list(bench_startup.SCRIPTS))
+        for result in results:
+            self.assertGreater(result["min_ms"], 0)
+            self.assertLessEqual(result["min_ms"], result["median_ms"])
+
+    def test_bench_sharding(self):
+        results = bench_sharding.run(shards=[2], size=100, count=40, clients=2, batch=10)
+        self.assertEqual([(result["mode"], result["shards"]) for result in results], [
+            ("withdraw", 0), ("withdraw", 2), ("apply_batch", 0), ("apply_batch", 2)
+        ])
+        for result in results:
+            self.assertGreater(result["ops_per_sec"], 0)
+
+    def test_bench_rejections(self):
+        results = bench_rejections.run(number=10, repeat=1)
+        self.assertEqual([result["name"] for result in results], [
+            "invalid_pin", "login_invalid_pin", "login_throttled", "withdraw_insufficient"
+        ])
+        for result in results:
+            self.assertGreater(result["result_ns"], 0)
+
+    def test_bench_locks(self):
+        results = bench_locks.run(stripes=[1, 64], threads=2, count=2, latency=0)
+        self.assertEqual([result["stripes"] for result in results], [1, 64])
+        for result in results:
+            self.assertGreater(result["ops_per_sec"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,212 @@
+import unittest, time, threading
+from collections.abc import Iterable
+from simple_atm_controller.atm_controller import AtmController
+from simple_atm_controller.cache import LRUCache, MISSING
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.account import Account
+from simple_atm_controller.exceptions import AtmControllerInputException
+from tests.data_model import DataBase
+
+
+class LRUCacheTestCase(unittest.TestCase):
+
+    def test_allocate_cache(self):
+        testcase = [
+            ({}, True),
+            ({"maxsize": 1, "ttl": 0.5}, True),
+            ({"maxsize": 0}, False),
+            ({"maxsize": "10"}, False),
+            ({"ttl": 0}, False),
+            ({"ttl": "10"}, False),
+        ]
+        for kwargs, expect in testcase:
+            try:
+                LRUCache(**kwargs)
+                self.assertTrue(expect)
+            except AtmControllerInputException:
+                self.assertFalse(expect)
+
+    def test_lru_eviction(self):
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", None)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertEqual(len(cache), 2)
+        self.assertIs(cache.get("b"), MISSING)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertEqual(cache.get("c"), 3)
+        self.assertEqual(cache.stats(), {"size": 2, "maxsize": 2, "hits": 3, "misses": 1})
+
+    def test_ttl(self):
+        cache = LRUCache(ttl=0.01)
+        cache.set("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        time.sleep(0.02)
+        self.assertEqual(cache.get("a", None), None)
+        self.assertEqual(len(cache), 0)
+
+    def test_invalidate(self):
+        cache = LRUCache()
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.invalidate("a")
+        cache.invalidate("Invalid")
+        self.assertIs(cache.get("a"), MISSING)
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+
+class ValanceCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.calls = calls = []
+
+        class TestAtmController(AtmController):
+            def find_accounts_query(self, pin_number) -> Iterable:
+                return self.model.find_accounts(pin_number)
+            def get_valance_query(self, pin_number, account_id) -> int:
+                calls.append(account_id)
+                return self.model.get_valance(pin_number, account_id)
+            def update_valance_query(self, pin_number, account_id, dollar):
+                self.model.update_valance(pin_number, account_id, dollar)
+
+        self.cache = LRUCache()
+        self.controller = TestAtmController(DataBase(), valance_cache=self.cache)
+        self.account1, self.account2 = self.controller.find_accounts(Pin("00-01"))
+
+    def test_invalid_valance_cache(self):
+        try:
+            self.controller.__class__(DataBase(), valance_cache={})
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_read_through(self):
+        for _ in range(3):
+            self.assertEqual(self.controller.get_valance(self.account1), 73)
+        # A withdrawal is decided by the data model, never by the cache
+        self.assertEqual(self.controller.withdraw(self.account1, 70), (True, "success"))
+        self.assertEqual(self.calls, ["shino1025"] * 2)
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
+
+    def test_invalidation(self):
+        self.controller.get_valance(self.account1)
+        self.controller.deposit(self.account1, 7)
+        self.assertEqual(self.controller.get_valance(self.account1), 80)
+        self.controller.withdraw(self.account1, 30)
+        self.assertEqual(self.controller.get_valance(self.account1), 50)
+        self.controller.withdraw(self.account1, 100)
+        self.assertEqual(self.controller.get_valance(self.account1), 50)
+        self.controller.apply_batch([
+            (self.account1, 10, "withdraw"),
+            (self.account2, 10, "deposit"),
+        ])
+        self.assertEqual(self.controller.get_valance(self.account1), 40)
+        self.assertEqual(self.controller.get_valance(self.account2), 33)
+        self.assertEqual(self.calls, ["shino1025"] * 7 + ["shino102566"])
+
+    def test_stale_fill(self):
+        cache = LRUCache()
+        generation = cache.generation("a")
+        cache.invalidate("a")
+        self.assertFalse(cache.set("a", 1, generation))
+        self.assertIs(cache.get("a"), MISSING)
+        self.assertTrue(cache.set("a", 2, cache.generation("a")))
+        self.assertEqual(cache.get("a"), 2)
+
+    def test_racing_read_isnt_cached(self):
+        read = threading.Event()
+        resume = threading.Event()
+        reader = []
+
+        class RacingAtmController(self.controller.__class__):
+            def get_valance_query(self, pin_number, account_id) -> int:
+                valance = super().get_valance_query(pin_number, account_id)
+                if threading.current_thread() in reader:
+                    # The read has the balance before the withdrawal below
+                    read.set()
+                    resume.wait(5)
+                return valance
+
+        model = DataBase()
+        controller = RacingAtmController(model, locks=LockStripes(), valance_cache=LRUCache())
+        account = controller.find_accounts(Pin("00-01"))[0]
+        thread = threading.Thread(target=controller.get_valance, args=(account,))
+        reader.append(thread)
+        thread.start()
+        read.wait(5)
+        self.assertEqual(controller.withdraw(account, 73), (True, "success"))
+        resume.set()
+        thread.join()
+        self.assertEqual(controller.withdraw(account, 73), (False, "insufficient balance"))
+        self.assertEqual(model.get_valance(*account.items), 0)
+        self.assertEqual(controller.get_valance(account), 0)
+
+    def test_withdraw_ignores_cached_valance(self):
+        # Another process changes the data model while the balance is cached
+        self.assertEqual(self.controller.get_valance(self.account1), 73)
+        self.controller.model.update_valance(*self.account1.items, -73)
+        self.assertEqual(self.controller.get_valance(self.account1), 73)
+        self.assertEqual(self.controller.withdraw(self.account1, 73), (False, "insufficient balance"))
+        self.assertEqual(self.controller.model.get_valance(*self.account1.items), 0)
+
+
+class AccountsCacheTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.calls = calls = []
+
+        class TestAtmController(AtmController):
+            def find_accounts_query(self, pin_number) -> Iterable:
+                calls.append(pin_number)
+                return self.model.find_accounts(pin_number)
+            def get_valance_query(self, pin_number, account_id) -> int:
+                return self.model.get_valance(pin_number, account_id)
+            def update_valance_query(self, pin_number, account_id, dollar):
+                self.model.update_valance(pin_number, account_id, dollar)
+
+        self.model = DataBase()
+        self.cache = LRUCache()
+        self.controller = TestAtmController(self.model, accounts_cache=self.cache)
+
+    def test_invalid_accounts_cache(self):
+        try:
+            self.controller.__class__(self.model, accounts_cache={})
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_memoized_find_accounts(self):
+        accounts = self.controller.find_accounts(Pin("00-01"))
+        accounts.pop()
+        for _ in range(3):
+            accounts = self.controller.find_accounts(Pin("00-01"))
+            self.assertEqual([account.items for account in accounts], [
+                ("00-01", "shino1025"), ("00-01", "shino102566")
+            ])
+        self.assertEqual(self.controller.find_accounts(Pin("00-99")), [])
+        self.assertEqual(self.controller.find_accounts(Pin("00-99")), [])
+        self.assertEqual(self.calls, ["00-01", "00-99"])
+
+    def test_invalidate_accounts(self):
+        pin = Pin("00-01")
+        self.controller.find_accounts(pin)
+        self.model.records.append(["00-01", "opened", 0])
+        self.assertEqual(len(self.controller.find_accounts(pin)), 2)
+        self.controller.invalidate_accounts(pin)
+        self.assertEqual(
+            self.controller.find_accounts(pin)[-1].items,
+            Account(pin, "opened").items
+        )
+        self.assertEqual(self.calls, ["00-01", "00-01"])
+        try:
+            self.controller.invalidate_accounts("00-01")
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
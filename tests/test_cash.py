@@ -0,0 +1,164 @@
+import unittest, random
+from itertools import product
+from threading import Thread
+from simple_atm_controller.cash import CashInventory
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import AtmControllerInputException
+from tests.data_model import DataBase
+from tests.test_locks import TwoStepAtmController
+
+
+def fewest_notes(cassettes, amount):
+    """Brute force of the fewest notes of the amount"""
+    denominations = list(cassettes)
+    best = None
+    for counts in product(*[range(cassettes[denomination] + 1) for denomination in denominations]):
+        if sum(map(int.__mul__, denominations, counts)) == amount:
+            if best is None or sum(counts) < best:
+                best = sum(counts)
+    return best
+
+
+class CashInventoryTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.dispensed = []
+        self.cash = CashInventory(
+            {100: 10, 50: 2, 20: 5, 10: 0}, on_dispense=self.dispensed.append
+        )
+        self.model = Ledger(DataBase().records)
+        self.controller = LedgerAtmController(self.model, cash_inventory=self.cash)
+        self.account = self.controller.find_accounts(Pin("00-02"))[0]
+
+    def test_invalid_options(self):
+        for args, kwargs in [
+            ([{}], {}), ([[100]], {}), ([{0: 1}], {}), ([{"100": 1}], {}), ([{100: -1}], {}),
+            ([{100: 1}], {"max_amount": 0}), ([{100: 1}], {"max_solve_amount": 0}), ([{100: 1}], {"on_dispense": 1}),
+        ]:
+            try:
+                CashInventory(*args, **kwargs)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+        for denomination, count in [(5, 1), (100, -1)]:
+            try:
+                self.cash.load(denomination, count)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+        try:
+            LedgerAtmController(self.model, cash_inventory={100: 1})
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_reserve(self):
+        self.assertEqual(self.cash.reserve(270), {100: 2, 50: 1, 20: 1})
+        self.assertEqual(self.cash.cassettes, {100: 8, 50: 1, 20: 4, 10: 0})
+        self.assertEqual(self.cash.reserve(0), {})
+        self.assertIsNone(self.cash.reserve(15))
+        self.assertIsNone(self.cash.reserve(10))
+        self.assertIsNone(self.cash.reserve(10_000))
+        self.cash.release({100: 2, 50: 1, 20: 1})
+        self.assertEqual(self.cash.cassettes, {100: 10, 50: 2, 20: 5, 10: 0})
+        self.assertEqual(self.cash.total, 1200)
+
+    def test_remaining_notes(self):
+        # The fewest notes of 100 is a 100 note, but the 100 and 50 cassettes are empty
+        cash = CashInventory({100: 0, 50: 0, 20: 5})
+        self.assertEqual(cash.reserve(100), {20: 5})
+        cash = CashInventory({100: 1, 50: 3, 20: 3})
+        self.assertEqual(cash.reserve(160), {100: 1, 20: 3})
+        self.assertIsNone(cash.reserve(110))
+        self.assertEqual(cash.reserve(150), {50: 3})
+        self.assertIsNone(cash.reserve(10))
+
+    def test_impossible_amounts(self):
+        # Refused before solving, so a huge amount allocates nothing
+        cash = CashInventory({100: 10, 50: 2, 20: 5}, max_amount=100)
+        for amount in [10**9, 10**18, 1_201, 1_210]:
+            self.assertIsNone(cash.reserve(amount))
+        self.assertEqual(cash.reserve(1_200), {100: 10, 50: 2, 20: 5})
+
+    def test_max_solve_amount(self):
+        # Above max_solve_amount, the notes are taken largest first, and the rest is solved
+        cash = CashInventory({50: 3, 20: 5}, max_amount=10, max_solve_amount=10)
+        self.assertIsNone(cash.reserve(60))
+        self.assertEqual(cash.reserve(90), {50: 1, 20: 2})
+        cash = CashInventory({100: 10**6, 50: 3, 20: 10**6})
+        self.assertEqual(cash.reserve(10**7 + 30), {100: 99_999, 50: 1, 20: 4})
+        notes = cash.reserve(10**7 + 40)
+        self.assertEqual(sum(denomination * count for denomination, count in notes.items()), 10**7 + 40)
+        self.assertEqual(cash.total, 10**8 + 150 + 2 * 10**7 - (10**7 + 30) - (10**7 + 40))
+
+    def test_fewest_notes(self):
+        generator = random.Random(7)
+        for _ in range(30):
+            cassettes = {
+                denomination: generator.randint(0, 4)
+                for denomination in generator.sample([1, 2, 5, 10, 20, 50, 100], 3)
+            }
+            for amount in range(0, 200, 7):
+                cash = CashInventory(cassettes, max_amount=100)
+                notes = cash.reserve(amount)
+                expected = fewest_notes(cassettes, amount)
+                if expected is None:
+                    self.assertIsNone(notes)
+                else:
+                    self.assertEqual(sum(denomination * count for denomination, count in notes.items()), amount)
+                    self.assertEqual(sum(notes.values()), expected)
+
+    def test_withdraw(self):
+        self.assertEqual(self.controller.withdraw(self.account, 270), (True, "success"))
+        self.assertEqual(self.dispensed, [{100: 2, 50: 1, 20: 1}])
+        self.assertEqual(self.controller.get_valance(self.account), 100_000 - 270)
+
+        self.assertEqual(self.controller.withdraw(self.account, 2000), (False, "insufficient cash"))
+        self.assertEqual(self.controller.get_valance(self.account), 100_000 - 270)
+        self.assertEqual(len(self.dispensed), 1)
+
+    def test_insufficient_balance(self):
+        for controller_class in [LedgerAtmController, TwoStepAtmController]:
+            controller = controller_class(self.model, cash_inventory=self.cash)
+            account = controller.find_accounts(Pin("00-01"))[0]
+            self.assertEqual(controller.withdraw(account, 100), (False, "insufficient balance"))
+            self.assertEqual(self.cash.total, 1200)
+        self.assertEqual(self.dispensed, [])
+
+    def test_failed_query(self):
+        class BrokenController(LedgerAtmController):
+            def conditional_update_query(self, pin_number, account_id, dollar) -> bool:
+                raise ConnectionError
+
+        controller = BrokenController(self.model, cash_inventory=self.cash)
+        try:
+            controller.withdraw(self.account, 100)
+            self.assertTrue(False)
+        except ConnectionError:
+            pass
+        self.assertEqual(self.cash.total, 1200)
+
+    def test_concurrent_withdraw(self):
+        cash = CashInventory({20: 100})
+        controller = LedgerAtmController(self.model, locks=LockStripes(), cash_inventory=cash)
+        results = []
+
+        def withdraw():
+            for _ in range(20):
+                results.append(controller.withdraw(self.account, 40))
+
+        threads = [Thread(target=withdraw) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count((True, "success")), 50)
+        self.assertEqual(results.count((False, "insufficient cash")), 30)
+        self.assertEqual(cash.total, 0)
+        self.assertEqual(controller.get_valance(self.account), 100_000 - 2000)
+
+
+if __name__ == '__main__':
+    unittest.main()
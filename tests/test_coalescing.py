@@ -0,0 +1,153 @@
+import unittest, threading, time
+from simple_atm_controller.coalescing import QueryCoalescer
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.cache import LRUCache
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import (
+    AtmControllerInputException, AtmControllerQueryException
+)
+from tests.data_model import DataBase
+from tests.test_locks import TwoStepAtmController
+
+
+class CountingLedger(Ledger):
+    """Ledger that counts the backend calls"""
+
+    def __init__(self, records=None):
+        super().__init__(records)
+        self.calls = []
+
+    def get_valance(self, pin_number, account_id):
+        self.calls.append("get_valance")
+        return super().get_valance(pin_number, account_id)
+
+    def get_valance_many(self, keys):
+        self.calls.append(("get_valance_many", tuple(keys)))
+        time.sleep(0.001)
+        return super().get_valance_many(keys)
+
+    def find_accounts_many(self, pin_numbers):
+        self.calls.append(("find_accounts_many", tuple(pin_numbers)))
+        return super().find_accounts_many(pin_numbers)
+
+
+class TwoStepManyAtmController(TwoStepAtmController):
+    """Controller that withdraws through get_valance_query, coalesced into get_valance_query_many"""
+
+    def get_valance_query_many(self, keys) -> list:
+        return self.model.get_valance_many(keys)
+
+
+def run_together(functions):
+    barrier = threading.Barrier(len(functions))
+    results = [None] * len(functions)
+
+    def run(index, function):
+        barrier.wait()
+        try:
+            results[index] = function()
+        except Exception as error:
+            results[index] = error
+
+    threads = [
+        threading.Thread(target=run, args=(index, function))
+        for index, function in enumerate(functions)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+class CoalescingTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.records = DataBase().records
+        self.model = CountingLedger(self.records)
+        self.coalescer = QueryCoalescer(window=0.05)
+        self.controller = LedgerAtmController(self.model, coalescer=self.coalescer)
+        self.accounts = [
+            account
+            for pin_number in ["00-00", "00-01", "00-02", "00-03"]
+            for account in self.controller.find_accounts(Pin(pin_number))
+        ]
+        self.model.calls.clear()
+
+    def test_invalid_options(self):
+        for kwargs in [{"window": 0}, {"window": "1"}, {"max_batch": 0}, {"max_batch": 1.5}]:
+            try:
+                QueryCoalescer(**kwargs)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+        try:
+            LedgerAtmController(self.model, coalescer="coalescer")
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_coalesce_get_valance(self):
+        accounts = self.accounts * 4
+        calls = self.coalescer.stats()["calls"]
+        results = run_together([
+            lambda account=account: self.controller.get_valance(account) for account in accounts
+        ])
+        expected = {(pin_number, account_id): valance for pin_number, account_id, valance in self.records}
+        self.assertEqual(results, [expected[account.items] for account in accounts])
+        self.assertNotIn("get_valance", self.model.calls)
+        self.assertLess(len(self.model.calls), len(accounts))
+        # The same account is queried once in a batch
+        for _, keys in self.model.calls:
+            self.assertEqual(len(keys), len(set(keys)))
+        self.assertEqual(self.coalescer.stats()["calls"] - calls, len(accounts))
+
+    def test_coalesce_find_accounts(self):
+        pins = [Pin("00-01"), Pin("00-02"), Pin("00-99")] * 3
+        results = run_together([lambda pin=pin: self.controller.find_accounts(pin) for pin in pins])
+        for pin, accounts in zip(pins, results):
+            self.assertEqual(
+                [account.account_id for account in accounts],
+                self.model.find_accounts(pin.pin_number)
+            )
+        self.assertLess(len(self.model.calls), len(pins))
+
+    def test_max_batch(self):
+        controller = LedgerAtmController(self.model, coalescer=QueryCoalescer(window=10, max_batch=1))
+        started = time.perf_counter()
+        self.assertEqual(controller.get_valance(self.accounts[3]), 100_000)
+        self.assertLess(time.perf_counter() - started, 1)
+
+    def test_withdraw(self):
+        account = self.accounts[1]
+        controller = TwoStepManyAtmController(self.model, coalescer=self.coalescer)
+        self.assertEqual(controller.withdraw(account, 70), (True, "success"))
+        self.assertEqual(controller.get_valance(account), 3)
+        self.assertEqual(controller.withdraw(account, 70), (False, "insufficient balance"))
+
+    def test_with_cache(self):
+        controller = LedgerAtmController(
+            self.model, coalescer=self.coalescer, valance_cache=LRUCache()
+        )
+        for _ in range(3):
+            self.assertEqual(controller.get_valance(self.accounts[0]), 0)
+        self.assertEqual(len(self.model.calls), 1)
+
+    def test_error(self):
+        class BrokenLedger(CountingLedger):
+            def get_valance_many(self, keys):
+                return ["broken"] * len(keys)
+
+        controller = LedgerAtmController(BrokenLedger(self.records), coalescer=self.coalescer)
+        results = run_together([lambda: controller.get_valance(self.accounts[0])] * 3)
+        for result in results:
+            self.assertIsInstance(result, AtmControllerQueryException)
+
+    def test_without_many_hooks(self):
+        controller = TwoStepAtmController(self.model, coalescer=self.coalescer)
+        self.assertEqual(controller.get_valance(self.accounts[0]), 0)
+        self.assertEqual(self.model.calls, ["get_valance"])
+
+
+if __name__ == '__main__':
+    unittest.main()
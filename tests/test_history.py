@@ -0,0 +1,100 @@
+import unittest, sys
+from simple_atm_controller.history import TransactionHistory, Transaction
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.atm_controller import DEPOSIT, WITHDRAW
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import AtmControllerException, AtmControllerInputException
+from tests.data_model import DataBase
+from tests.test_limits import Clock
+
+
+class TransactionHistoryTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = Clock()
+        self.history = TransactionHistory(clock=self.clock)
+        self.controller = LedgerAtmController(Ledger(DataBase().records), history=self.history)
+        self.account, self.other = self.controller.find_accounts(Pin("00-01"))
+
+    def test_invalid_options(self):
+        try:
+            TransactionHistory(clock=1)
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+        for args in [("account",), (self.account, -1), (self.account, "10")]:
+            try:
+                self.controller.mini_statement(*args)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+        try:
+            self.controller.transactions(self.account, start="yesterday")
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+        try:
+            LedgerAtmController(Ledger()).mini_statement(self.account)
+            self.assertTrue(False)
+        except AtmControllerException:
+            pass
+
+    def test_mini_statement(self):
+        for second in range(5):
+            self.clock.now = second
+            self.controller.deposit(self.account, second)
+        self.clock.now = 10
+        self.assertEqual(self.controller.withdraw(self.account, 1000), (False, "insufficient balance"))
+        self.assertEqual(self.controller.withdraw(self.account, 50), (True, "success"))
+
+        self.assertEqual(self.controller.mini_statement(self.account, 3), [
+            Transaction(3, DEPOSIT, 3), Transaction(4, DEPOSIT, 4), Transaction(10, WITHDRAW, 50),
+        ])
+        self.assertEqual(len(self.controller.mini_statement(self.account)), 6)
+        self.assertEqual(self.controller.mini_statement(self.account, 0), [])
+        self.assertEqual(self.controller.mini_statement(self.other), [])
+
+    def test_transactions(self):
+        for second in range(100):
+            self.clock.now = second
+            self.controller.deposit(self.account, 1)
+        self.assertEqual(
+            [transaction.timestamp for transaction in self.controller.transactions(self.account, 10, 12)],
+            [10, 11, 12]
+        )
+        self.assertEqual(len(self.controller.transactions(self.account, start=95)), 5)
+        self.assertEqual(len(self.controller.transactions(self.account, end=4.5)), 5)
+        self.assertEqual(len(self.controller.transactions(self.account)), 100)
+        self.assertEqual(self.controller.transactions(self.account, 200, 300), [])
+
+    def test_clock_goes_back(self):
+        self.clock.now = 10
+        self.controller.deposit(self.account, 1)
+        self.clock.now = 5
+        self.controller.deposit(self.account, 2)
+        self.assertEqual(
+            [transaction.timestamp for transaction in self.controller.mini_statement(self.account)],
+            [10, 10]
+        )
+
+    def test_apply_batch(self):
+        self.controller.apply_batch([
+            (self.account, 10, DEPOSIT),
+            (self.account, 1000, WITHDRAW),
+            (self.other, 5, WITHDRAW),
+        ])
+        self.assertEqual(self.controller.mini_statement(self.account), [Transaction(0, DEPOSIT, 10)])
+        self.assertEqual(self.controller.mini_statement(self.other), [Transaction(0, WITHDRAW, 5)])
+        self.assertEqual(len(self.history), 2)
+
+    def test_compact(self):
+        history = TransactionHistory()
+        for index in range(10_000):
+            history.append(("00-01", "shino1025"), DEPOSIT, index)
+        columns = history._accounts[("00-01", "shino1025")]
+        size = sum(map(sys.getsizeof, [columns.timestamps, columns.kinds, columns.dollars]))
+        self.assertLess(size, 10_000 * 24)
+
+
+if __name__ == '__main__':
+    unittest.main()
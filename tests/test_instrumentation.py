@@ -0,0 +1,87 @@
+import unittest, json
+from collections.abc import Iterable
+from simple_atm_controller.atm_controller import AtmController
+from simple_atm_controller.instrumentation import Instrumentation
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import (
+    AtmControllerInputException, AtmControllerException
+)
+from tests.data_model import DataBase
+
+
+class InstrumentationTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        class TestAtmController(AtmController):
+            def find_accounts_query(self, pin_number) -> Iterable:
+                return self.model.find_accounts(pin_number)
+            def get_valance_query(self, pin_number, account_id) -> int:
+                return self.model.get_valance(pin_number, account_id)
+            def update_valance_query(self, pin_number, account_id, dollar):
+                self.model.update_valance(pin_number, account_id, dollar)
+
+        self.instrumentation = Instrumentation()
+        self.controller = TestAtmController(DataBase(), instrumentation=self.instrumentation)
+
+    def test_invalid_instrumentation(self):
+        try:
+            self.controller.__class__(DataBase(), instrumentation="instrumentation")
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_record(self):
+        instrumentation = Instrumentation()
+        for elapsed_ns in [100, 1_000, 1_000, 10_000]:
+            instrumentation.record("operation", elapsed_ns)
+        instrumentation.record("operation", 500, ValueError())
+        snapshot = instrumentation.snapshot()["operation"]
+        self.assertEqual(snapshot["count"], 5)
+        self.assertEqual(snapshot["errors"], {"ValueError": 1})
+        self.assertEqual(snapshot["mean_us"], 2.52)
+        self.assertEqual(snapshot["max_us"], 10.0)
+        self.assertEqual(snapshot["p50_us"], 1.024)
+        self.assertEqual(snapshot["p99_us"], 10.0)
+        self.assertEqual(sum(snapshot["histogram_us"].values()), 5)
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot(), {})
+
+    def test_controller_metrics(self):
+        account = self.controller.find_accounts(Pin("00-01"))[0]
+        self.controller.get_valance(account)
+        self.controller.withdraw(account, 10)
+        self.controller.deposit(account, 10)
+        for account_i, dollar in [("00-01", 10), (account, -10)]:
+            try:
+                self.controller.deposit(account_i, dollar)
+                self.assertTrue(False)
+            except AtmControllerException:
+                pass
+            except AtmControllerInputException:
+                pass
+
+        snapshot = self.instrumentation.snapshot()
+        counts = {name: metric["count"] for name, metric in snapshot.items()}
+        self.assertEqual(counts, {
+            "find_accounts": 1,
+            "find_accounts_query": 1,
+            "get_valance": 1,
+            "get_valance_query": 2,
+            "withdraw": 1,
+            "update_valance_query": 2,
+            "deposit": 3,
+        })
+        self.assertEqual(snapshot["deposit"]["errors"], {
+            "AtmControllerInputException": 1,
+            "AtmControllerException": 1,
+        })
+        json.dumps(snapshot)
+
+    def test_disabled(self):
+        controller = self.controller.__class__(DataBase())
+        for name in AtmController.OPERATIONS + AtmController.QUERIES:
+            self.assertNotIn(name, vars(controller))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,255 @@
+import unittest, os, shutil, tempfile, time
+from threading import Thread
+from simple_atm_controller.journal import Journal, DEPOSIT, WITHDRAW, iter_frames
+from simple_atm_controller.atm_controller import AtmController
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import (
+    AtmControllerInputException, AtmControllerException, InvalidJournal
+)
+from tests.data_model import DataBase
+
+
+class JournalTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "atm.journal")
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def seeded_journal(self, **kwargs):
+        journal = Journal(self.path, **kwargs)
+        journal.snapshot(Ledger(DataBase().records))
+        return journal
+
+    def test_invalid_journal(self):
+        testcase = [
+            {"group_size": 0},
+            {"group_size": "1"},
+            {"group_interval": 0},
+            {"snapshot_every": 0},
+        ]
+        for kwargs in testcase:
+            try:
+                Journal(self.path, **kwargs)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+
+        with open(self.path + ".snapshot", "wb") as file:
+            file.write(b"garbage")
+        try:
+            Journal(self.path)
+            self.assertTrue(False)
+        except InvalidJournal:
+            pass
+
+    def test_recover(self):
+        with self.seeded_journal() as journal:
+            journal.append(WITHDRAW, "00-01", "shino1025", 70)
+            journal.append(DEPOSIT, "00-00", "shin10256", 70)
+
+        ledger = Ledger()
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.recover(ledger), 2)
+        self.assertEqual(ledger.get_valance("00-01", "shino1025"), 3)
+        self.assertEqual(ledger.get_valance("00-00", "shin10256"), 70)
+        self.assertEqual(len(ledger), len(DataBase().records))
+
+    def test_recover_without_snapshot(self):
+        with Journal(self.path) as journal:
+            journal.append(DEPOSIT, "00-00", "shin10256", 70)
+        model = DataBase()
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.recover(model), 1)
+        self.assertEqual(model.get_valance("00-00", "shin10256"), 70)
+
+    def test_group_commit(self):
+        with self.seeded_journal(group_size=3, group_interval=60, durable=False) as journal:
+            journal.append(DEPOSIT, "00-00", "shin10256", 1)
+            journal.append(DEPOSIT, "00-00", "shin10256", 1)
+            self.assertEqual(os.path.getsize(self.path), 0)
+            journal.append(DEPOSIT, "00-00", "shin10256", 1)
+            size = os.path.getsize(self.path)
+            self.assertGreater(size, 0)
+            journal.append(DEPOSIT, "00-00", "shin10256", 1)
+            self.assertEqual(os.path.getsize(self.path), size)
+            journal.sync()
+            self.assertGreater(os.path.getsize(self.path), size)
+
+        with self.seeded_journal(group_size=1000, group_interval=0.01, durable=False) as journal:
+            journal.append(DEPOSIT, "00-00", "shin10256", 1)
+            time.sleep(0.1)
+            self.assertGreater(os.path.getsize(self.path), 0)
+
+    def test_durable_append(self):
+        with self.seeded_journal() as journal:
+            # The record is on the disk when append returns
+            journal.append(DEPOSIT, "00-00", "shin10256", 1)
+            size = os.path.getsize(self.path)
+            self.assertGreater(size, 0)
+            journal.append_many([(WITHDRAW, "00-00", "shin10256", 1), (DEPOSIT, "00-01", "shino1025", 1)])
+            self.assertGreater(os.path.getsize(self.path), size)
+            syncs = journal.syncs
+
+            # The threads appending during an fsync share the next one
+            threads = [
+                Thread(target=lambda: [journal.append(DEPOSIT, "00-00", "shin10256", 1) for _ in range(20)])
+                for _ in range(8)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertLessEqual(journal.syncs - syncs, 8 * 20)
+
+        ledger = Ledger()
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.recover(ledger), 3 + 8 * 20)
+        self.assertEqual(ledger.get_valance("00-00", "shin10256"), 8 * 20)
+
+    def test_torn_write(self):
+        with self.seeded_journal() as journal:
+            journal.append(DEPOSIT, "00-00", "shin10256", 10)
+            journal.append(DEPOSIT, "00-00", "shin10256", 20)
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 3)
+
+        with Journal(self.path) as journal:
+            journal.append(DEPOSIT, "00-00", "shin10256", 30)
+        ledger = Ledger()
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.recover(ledger), 2)
+        self.assertEqual(ledger.get_valance("00-00", "shin10256"), 40)
+
+    def test_append_changes(self):
+        with self.seeded_journal() as journal:
+            journal.append_changes(["00-00", "00-01", "00-05"], ["shin10256", "shino1025", "é\0계좌"], [10, -3, 7])
+            journal.append_changes([], [], [])
+            journal.append(WITHDRAW, "00-00", "shin10256", 1)
+            journal.append_changes(["00-01"], ["shino102566"], [5])
+        with open(self.path, "rb") as file:
+            self.assertEqual([frame[1:] for frame in iter_frames(file)], [
+                (1, DEPOSIT, "00-00", "shin10256", 10), (1, WITHDRAW, "00-01", "shino1025", 3),
+                (1, DEPOSIT, "00-05", "é\0계좌", 7), (2, WITHDRAW, "00-00", "shin10256", 1),
+                (3, DEPOSIT, "00-01", "shino102566", 5),
+            ])
+        with open(self.path, "r+b") as file:
+            file.truncate(os.path.getsize(self.path) - 3)
+
+        ledger = Ledger()
+        with Journal(self.path) as journal:
+            # The torn record of many changes is dropped as a whole
+            self.assertEqual(journal.recover(ledger), 4)
+        self.assertEqual(ledger.get_valance("00-00", "shin10256"), 9)
+        self.assertEqual(ledger.get_valance("00-01", "shino1025"), 70)
+        self.assertEqual(ledger.get_valance("00-01", "shino102566"), 23)
+
+    def test_snapshot(self):
+        with self.seeded_journal() as journal:
+            journal.append(DEPOSIT, "00-00", "shin10256", 10)
+            journal.sync()
+            shutil.copy(self.path, self.path + ".old")
+            ledger = Ledger()
+            journal.recover(ledger)
+            journal.snapshot(ledger)
+            self.assertEqual(os.path.getsize(self.path), 0)
+            journal.append(DEPOSIT, "00-00", "shin10256", 20)
+
+        # Crash between writing the snapshot and emptying the journal
+        with open(self.path + ".old", "rb") as old, open(self.path, "rb") as new:
+            data = old.read() + new.read()
+        with open(self.path, "wb") as file:
+            file.write(data)
+
+        ledger = Ledger()
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.recover(ledger), 1)
+        self.assertEqual(ledger.get_valance("00-00", "shin10256"), 30)
+
+    def test_controller(self):
+        ledger = Ledger(DataBase().records)
+        with Journal(self.path, snapshot_every=3) as journal:
+            journal.snapshot(ledger)
+            controller = LedgerAtmController(ledger, locks=LockStripes(), journal=journal)
+            account1, account2 = controller.find_accounts(Pin("00-01"))
+            controller.withdraw(account1, 70)
+            controller.withdraw(account1, 70)
+            controller.deposit(account2, 7)
+            self.assertFalse(journal.snapshot_due)
+            controller.apply_batch([(account1, 3, "withdraw"), (account2, 3, "deposit")])
+            # The 4th record triggers the snapshot, which empties the journal
+            self.assertFalse(journal.snapshot_due)
+            self.assertEqual(os.path.getsize(self.path), 0)
+            controller.deposit(account2, 0)
+            controller.checkpoint()
+
+        recovered = Ledger()
+        with Journal(self.path) as journal:
+            journal.recover(recovered)
+        self.assertEqual(sorted(recovered.iter_records()), sorted(ledger.iter_records()))
+        self.assertEqual(recovered.get_valance("00-01", "shino1025"), 0)
+        self.assertEqual(recovered.get_valance("00-01", "shino102566"), 33)
+
+        try:
+            LedgerAtmController(ledger).checkpoint()
+            self.assertTrue(False)
+        except AtmControllerException:
+            pass
+
+    def test_transfer(self):
+        ledger = Ledger(DataBase().records)
+        with Journal(self.path) as journal:
+            journal.snapshot(ledger)
+            controller = LedgerAtmController(ledger, journal=journal)
+            account1, account2 = controller.find_accounts(Pin("00-01"))
+            controller.transfer(account1, account2, 70)
+            controller.transfer(account1, account2, 70)
+
+        recovered = Ledger()
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.recover(recovered), 2)
+        self.assertEqual(recovered.get_valance("00-01", "shino1025"), 3)
+        self.assertEqual(recovered.get_valance("00-01", "shino102566"), 93)
+
+    def test_unsettled_transfer(self):
+        ledger = Ledger(DataBase().records)
+
+        class FailingController(LedgerAtmController):
+            transfer_query = AtmController.transfer_query
+            failing = True
+
+            def update_valance_query(self, pin_number, account_id, dollar):
+                if self.failing:
+                    raise ConnectionError("The data model is unavailable")
+                super().update_valance_query(pin_number, account_id, dollar)
+
+        with Journal(self.path) as journal:
+            journal.snapshot(ledger)
+            controller = FailingController(ledger, journal=journal)
+            account1, account2 = controller.find_accounts(Pin("00-01"))
+            try:
+                controller.transfer(account1, account2, 70)
+                self.assertTrue(False)
+            except ConnectionError:
+                pass
+            self.assertEqual(controller.unsettled, [("00-01", "shino1025", 70)])
+            # The journal replays the debit that isn't credited back yet
+            recovered = Ledger()
+            self.assertEqual(journal.recover(recovered), 1)
+            self.assertEqual(recovered.get_valance("00-01", "shino1025"), 3)
+            controller.failing = False
+            self.assertEqual(controller.settle(), 0)
+
+        recovered = Ledger()
+        with Journal(self.path) as journal:
+            self.assertEqual(journal.recover(recovered), 2)
+        self.assertEqual(sorted(recovered.iter_records()), sorted(ledger.iter_records()))
+        self.assertEqual(recovered.get_valance("00-01", "shino1025"), 73)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,112 @@
+import unittest
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.pin import Pin
+from tests.data_model import DataBase
+
+
+class LedgerTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.records = DataBase().records
+        self.model = Ledger(self.records)
+
+    def test_bulk_load(self):
+        self.assertEqual(len(self.model), len(self.records))
+        self.model.bulk_load([["00-01", "shino1025", 10], ["00-09", "new", 5]])
+        self.assertEqual(len(self.model), len(self.records) + 1)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 10)
+
+    def test_iter_records(self):
+        self.assertEqual(
+            sorted(self.model.iter_records()),
+            sorted(tuple(record) for record in self.records)
+        )
+
+    def test_find_accounts(self):
+        self.assertEqual(
+            self.model.find_accounts("00-01"),
+            ["shino1025", "shino102566"]
+        )
+        self.assertEqual(self.model.find_accounts("00-99"), [])
+
+    def test_get_valance(self):
+        for pin_number, account_id, valance in self.records:
+            self.assertEqual(self.model.get_valance(pin_number, account_id), valance)
+        self.assertEqual(self.model.get_valance("00-01", "imiml"), None)
+        self.assertEqual(self.model.get_valance("00-99", "imiml"), None)
+
+    def test_many(self):
+        self.assertEqual(
+            self.model.find_accounts_many(["00-01", "00-99", "00-00"]),
+            [["shino1025", "shino102566"], [], ["shin10256"]]
+        )
+        self.assertEqual(
+            self.model.get_valance_many([("00-02", "iml1111"), ("00-99", "imiml"), ("00-01", "shino1025")]),
+            [100_000, None, 73]
+        )
+
+    def test_update_valance(self):
+        self.model.update_valance("00-01", "shino1025", -3)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 70)
+        self.model.update_valance("00-99", "Invalid", 10)
+        self.assertEqual(self.model.get_valance("00-99", "Invalid"), None)
+        self.assertEqual(len(self.model), len(self.records))
+
+    def test_bulk_update_valance(self):
+        self.model.bulk_update_valance([
+            ("00-01", "shino1025", -3),
+            ("00-02", "iml1111", 10),
+            ("00-99", "Invalid", 10),
+        ])
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 70)
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_010)
+        self.assertEqual(self.model.get_valance("00-99", "Invalid"), None)
+
+    def test_conditional_update_valance(self):
+        self.assertTrue(self.model.conditional_update_valance("00-01", "shino1025", 73))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 0)
+        self.assertFalse(self.model.conditional_update_valance("00-01", "shino1025", 1))
+        self.assertFalse(self.model.conditional_update_valance("00-01", "Invalid", 0))
+        self.assertFalse(self.model.conditional_update_valance("00-99", "Invalid", 0))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 0)
+
+    def test_controller(self):
+        controller = LedgerAtmController(self.model)
+        account1, account2 = controller.find_accounts(Pin("00-01"))
+        self.assertEqual(controller.get_valance(account1), 73)
+        self.assertEqual(controller.withdraw(account2, 30), (False, "insufficient balance"))
+        self.assertEqual(controller.withdraw(account1, 30), (True, "success"))
+        controller.deposit(account2, 30)
+        self.assertEqual(controller.get_valance(account1), 43)
+        self.assertEqual(controller.get_valance(account2), 53)
+
+        results = controller.apply_batch([
+            (account1, 50, "withdraw"),
+            (account2, 50, "withdraw"),
+            (account1, 7, "deposit"),
+        ])
+        self.assertEqual(results, [
+            (False, "insufficient balance"),
+            (True, "success"),
+            (True, "success"),
+        ])
+        self.assertEqual(controller.get_valance(account1), 50)
+        self.assertEqual(controller.get_valance(account2), 3)
+
+        self.assertEqual(controller.transfer(account1, account2, 51), (False, "insufficient balance"))
+        self.assertEqual(controller.transfer(account1, account2, 50), (True, "success"))
+        self.assertEqual(controller.get_valance(account1), 0)
+        self.assertEqual(controller.get_valance(account2), 53)
+
+    def test_transfer_valance(self):
+        self.assertTrue(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 73))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 0)
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_073)
+        self.assertFalse(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 1))
+        self.assertFalse(self.model.transfer_valance("00-02", "iml1111", "00-02", "Invalid", 1))
+        self.assertFalse(self.model.transfer_valance("00-99", "Invalid", "00-02", "iml1111", 0))
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_073)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest, os, shutil, tempfile
+from simple_atm_controller.ledger_io import (
+    read_records, write_records, export_ledger, import_ledger, read_csv, write_binary, CSV_HEADER
+)
+from simple_atm_controller.ledger import Ledger
+from simple_atm_controller.sqlite_ledger import SqliteLedger
+from simple_atm_controller.exceptions import AtmControllerInputException, InvalidLedgerFile
+from tests.data_model import DataBase
+
+
+class LedgerIoTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.records = [tuple(record) for record in DataBase().records]
+        self.model = Ledger(self.records)
+
+    def tearDown(self) -> None:
+        shutil.rmtree(self.directory)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def test_round_trip(self):
+        for name in ["accounts.csv", "accounts.bin"]:
+            self.assertEqual(export_ledger(self.model, self.path(name)), len(self.records))
+            self.assertEqual(list(read_records(self.path(name))), list(self.records))
+
+            model = Ledger()
+            self.assertEqual(import_ledger(model, self.path(name)), len(self.records))
+            self.assertEqual(list(model.iter_records()), list(self.records))
+
+    def test_explicit_format(self):
+        write_records(self.records, self.path("accounts.txt"), format="csv")
+        self.assertEqual(list(read_csv(self.path("accounts.txt"))), list(self.records))
+        try:
+            write_records(self.records, self.path("accounts.txt"), format="xml")
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_chunks(self):
+        records = [(f"{index // 3:04d}", f"account-{index}", index * 10) for index in range(1000)]
+        for name in ["big.csv", "big.bin"]:
+            self.assertEqual(write_records(iter(records), self.path(name), chunk_size=7), 1000)
+            self.assertEqual(list(read_records(self.path(name))), records)
+
+    def test_unicode_and_negative(self):
+        records = [("1234", "계좌-1", -5), ("", "", 0)]
+        write_binary(records, self.path("accounts.bin"))
+        self.assertEqual(list(read_records(self.path("accounts.bin"))), records)
+
+    def test_other_backend(self):
+        export_ledger(self.model, self.path("accounts.bin"))
+        with SqliteLedger(self.path("atm.sqlite3")) as model:
+            import_ledger(model, self.path("accounts.bin"))
+            self.assertEqual(sorted(model.iter_records()), sorted(self.records))
+
+    def test_invalid_file(self):
+        with open(self.path("bad.csv"), "w") as file:
+            file.write("something,else\n")
+        with open(self.path("bad.bin"), "wb") as file:
+            file.write(b"not a ledger")
+        with open(self.path("row.csv"), "w") as file:
+            file.write(",".join(CSV_HEADER) + "\n1234,account,ten\n")
+        export_ledger(self.model, self.path("torn.bin"))
+        with open(self.path("torn.bin"), "r+b") as file:
+            file.truncate(os.path.getsize(self.path("torn.bin")) - 3)
+
+        for name in ["bad.csv", "bad.bin", "row.csv", "torn.bin"]:
+            try:
+                list(read_records(self.path(name)))
+                self.assertTrue(False)
+            except InvalidLedgerFile:
+                pass
+
+
+if __name__ == '__main__':
+    unittest.main()
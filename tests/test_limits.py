@@ -0,0 +1,183 @@
+import unittest
+from simple_atm_controller.limits import Limits, SlidingWindow
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.cash import CashInventory
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.results import ResultCode, SUCCESS
+from simple_atm_controller.exceptions import AtmControllerException, AtmControllerInputException
+from tests.data_model import DataBase
+
+
+class Clock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class LimitsTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = Clock()
+        self.limits = Limits(daily_amount=1000, pin_rate=1, pin_burst=3, clock=self.clock)
+        self.model = Ledger(DataBase().records)
+        self.controller = LedgerAtmController(self.model, limits=self.limits)
+        self.account = LedgerAtmController(self.model).find_accounts(Pin("00-02"))[0]
+
+    def test_invalid_options(self):
+        for kwargs in [
+            {"daily_amount": -1}, {"daily_amount": 1.5}, {"pin_rate": 0}, {"pin_burst": 0},
+            {"window": 0}, {"buckets": 0}, {"maxsize": "10"},
+        ]:
+            try:
+                Limits(**kwargs)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+        try:
+            LedgerAtmController(self.model, limits={"daily_amount": 10})
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_daily_amount(self):
+        limits = Limits(daily_amount=1000, clock=self.clock)
+        controller = LedgerAtmController(self.model, limits=limits)
+        self.assertEqual(controller.withdraw(self.account, 600), (True, "success"))
+        self.clock.now = 12 * 3600
+        self.assertEqual(controller.withdraw(self.account, 400), (True, "success"))
+        self.assertEqual(controller.withdraw(self.account, 1), (False, "daily limit exceeded"))
+        self.assertEqual(limits.withdrawn(self.account.items), 1000)
+        self.assertEqual(controller.get_valance(self.account), 99_000)
+
+        # The first withdrawal leaves the window after a day
+        self.clock.now = 24 * 3600 + 1
+        self.assertEqual(limits.withdrawn(self.account.items), 400)
+        self.assertEqual(controller.withdraw(self.account, 600), (True, "success"))
+        self.assertEqual(controller.withdraw(self.account, 1), (False, "daily limit exceeded"))
+        self.clock.now = 10 * 24 * 3600
+        self.assertEqual(limits.withdrawn(self.account.items), 0)
+
+    def test_failed_withdraw_is_not_counted(self):
+        limits = Limits(daily_amount=1000, clock=self.clock)
+        controller = LedgerAtmController(self.model, limits=limits, cash_inventory=CashInventory({100: 3}))
+        account = controller.find_accounts(Pin("00-01"))[0]
+        self.assertEqual(controller.withdraw(account, 100), (False, "insufficient balance"))
+        self.assertEqual(controller.withdraw(self.account, 500), (False, "insufficient cash"))
+        self.assertEqual(limits.withdrawn(account.items), 0)
+        self.assertEqual(limits.withdrawn(self.account.items), 0)
+
+    def test_pin_rate(self):
+        pin = Pin("00-02")
+        for _ in range(3):
+            self.controller.find_accounts(pin)
+        try:
+            self.controller.find_accounts(pin)
+            self.assertTrue(False)
+        except AtmControllerException:
+            pass
+        self.assertEqual(self.controller.withdraw(self.account, 10), (False, "too many requests"))
+        # Other pins have their own bucket
+        self.controller.find_accounts(Pin("00-01"))
+        self.clock.now = 1.0
+        self.assertEqual(self.controller.withdraw(self.account, 10), (True, "success"))
+        self.assertEqual(self.controller.withdraw(self.account, 10), (False, "too many requests"))
+
+    def test_authenticate_throttled(self):
+        for _ in range(3):
+            self.assertEqual(self.controller.authenticate("00-02")[0], "success")
+        self.assertEqual(self.controller.authenticate("00-02"), (ResultCode.TOO_MANY_REQUESTS, None))
+        try:
+            self.controller.find_accounts(Pin("00-02"))
+            self.assertTrue(False)
+        except AtmControllerException as exception:
+            self.assertIs(exception.code, ResultCode.TOO_MANY_REQUESTS)
+
+    def test_eviction(self):
+        limits = Limits(daily_amount=100, pin_rate=1, window=100, buckets=10, clock=self.clock)
+        for key in range(1000):
+            self.assertEqual(limits.reserve(key, 1), SUCCESS)
+        # Without maxsize, every live counter is kept
+        self.assertEqual(len(limits._windows), 1000)
+        # Windows emptied by time are idle, and are evicted when counters are added
+        self.clock.now = 101.0
+        for key in range(1000, 1100):
+            limits.reserve(key, 1)
+        self.assertLess(len(limits._windows), 1000)
+        self.assertEqual(limits.withdrawn(999), 0)
+
+    def test_maxsize(self):
+        limits = Limits(daily_amount=100, pin_rate=1, window=100, buckets=10, maxsize=2, clock=self.clock)
+        self.assertEqual(limits.reserve("A", 100), SUCCESS)
+        self.assertEqual(limits.reserve("B", 50), SUCCESS)
+        # Churning other keys doesn't reset the limit of A, and isn't reported as a limit of theirs
+        for key in ["C", "D", "E"]:
+            self.assertEqual(limits.reserve(key, 1), (False, ResultCode.LIMITS_FULL))
+        self.assertEqual(limits.reserve("A", 1), (False, ResultCode.DAILY_LIMIT_EXCEEDED))
+        self.assertEqual(limits.withdrawn("A"), 100)
+        # A window emptied by time is idle, so it can be evicted
+        self.clock.now = 101.0
+        self.assertEqual(limits.reserve("C", 1), SUCCESS)
+        self.assertEqual(list(limits._windows), ["C"])
+
+        self.assertEqual(limits.allow_pin("00-01"), SUCCESS)
+        self.assertEqual(limits.allow_pin("00-02"), SUCCESS)
+        self.assertEqual(limits.allow_pin("00-03"), (False, ResultCode.LIMITS_FULL))
+        self.assertEqual(limits.allow_pin("00-01"), (False, ResultCode.TOO_MANY_REQUESTS))
+        # A refilled bucket is idle
+        self.clock.now = 102.0
+        self.assertEqual(limits.allow_pin("00-03"), SUCCESS)
+        self.assertEqual(list(limits._pins), ["00-03"])
+
+    def test_unknown_pin_spray(self):
+        limits = Limits(pin_rate=1 / 60, pin_burst=3, maxsize=1000, clock=self.clock)
+        controller = LedgerAtmController(self.model, limits=limits)
+        # 1000 distinct wrong pins create no counter, so they lock out no one
+        for index in range(1000):
+            self.assertEqual(controller.authenticate("%02d-%02d" % divmod(5000 + index, 100)), ("success", []))
+        self.assertEqual(len(limits._pins), 0)
+        self.assertEqual(controller.authenticate("00-01")[0], ResultCode.SUCCESS)
+
+        # From a terminal, the lookups of unknown pins are throttled for that terminal only
+        for index in range(3):
+            self.assertEqual(controller.authenticate("70-%02d" % index, terminal="T1"), ("success", []))
+        self.assertEqual(controller.authenticate("70-99", terminal="T1"), (ResultCode.TOO_MANY_REQUESTS, None))
+        self.assertEqual(controller.authenticate("00-02", terminal="T1"), (ResultCode.TOO_MANY_REQUESTS, None))
+        try:
+            controller.find_accounts(Pin("70-98"), terminal="T1")
+            self.assertTrue(False)
+        except AtmControllerException as exception:
+            self.assertIs(exception.code, ResultCode.TOO_MANY_REQUESTS)
+        self.assertEqual(controller.authenticate("00-02", terminal="T2")[0], ResultCode.SUCCESS)
+        # A pin known to have accounts keeps its own bucket at any terminal
+        self.assertEqual(controller.authenticate("00-01", terminal="T1")[0], ResultCode.SUCCESS)
+        self.clock.now = 60.0
+        self.assertEqual(controller.authenticate("70-99", terminal="T1"), ("success", []))
+
+    def test_daily_limits_full(self):
+        limits = Limits(daily_amount=1000, maxsize=1, clock=self.clock)
+        controller = LedgerAtmController(self.model, limits=limits)
+        other = controller.find_accounts(Pin("00-03"))[0]
+        self.assertEqual(controller.withdraw(self.account, 10), (True, "success"))
+        # An account that hasn't withdrawn isn't told its daily limit is exceeded
+        self.assertEqual(controller.withdraw(other, 10), (False, "limits full"))
+        self.assertEqual(controller.get_valance(other), 2312)
+
+    def test_sliding_window(self):
+        window = SlidingWindow(4, 0)
+        for bucket, amount in enumerate([1, 2, 3, 4]):
+            window.advance(bucket)
+            window.add(amount)
+        self.assertEqual(window.total, 10)
+        window.advance(5)
+        self.assertEqual(window.total, 7)
+        window.remove(5)
+        self.assertEqual((window.total, window.buckets), (2, [0, 0, 2, 0]))
+        window.advance(100)
+        self.assertEqual(window.total, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,182 @@
+import unittest, time
+from collections.abc import Iterable
+from threading import Thread, Barrier, Event
+from simple_atm_controller.atm_controller import AtmController
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import AtmControllerInputException
+
+
+class SlowLedger(Ledger):
+    """Ledger with the latency of a remote data model"""
+
+    def get_valance(self, pin_number, account_id):
+        valance = super().get_valance(pin_number, account_id)
+        time.sleep(0.001)
+        return valance
+
+    def update_valance(self, pin_number, account_id, dollar):
+        time.sleep(0.001)
+        super().update_valance(pin_number, account_id, dollar)
+
+
+class TwoStepAtmController(AtmController):
+    """Controller that withdraws through get_valance_query + update_valance_query"""
+
+    def find_accounts_query(self, pin_number) -> Iterable:
+        return self.model.find_accounts(pin_number)
+
+    def get_valance_query(self, pin_number, account_id) -> int:
+        return self.model.get_valance(pin_number, account_id)
+
+    def update_valance_query(self, pin_number, account_id, dollar):
+        self.model.update_valance(pin_number, account_id, dollar)
+
+
+def run_threads(targets):
+    threads = [Thread(target=target) for target in targets]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - started
+
+
+class LockStripesTestCase(unittest.TestCase):
+
+    def test_allocate_lock_stripes(self):
+        locks = LockStripes(8)
+        self.assertEqual(len(locks), 8)
+        key = ("00-01", "shino1025")
+        self.assertIs(locks.lock(key), locks.lock(key))
+        self.assertEqual(locks.index(key), locks.index(("00-01", "shino1025")))
+        keys = [("00-%02d" % i, "account") for i in range(32)]
+        ordered = locks.ordered(keys + keys)
+        self.assertEqual(len(ordered), len({locks.index(key) for key in keys}))
+        self.assertEqual(ordered, locks.ordered(reversed(keys)))
+        for size in [0, -1, "8", 1.5]:
+            try:
+                LockStripes(size)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+
+    def test_invalid_locks(self):
+        try:
+            LedgerAtmController(Ledger(), locks="locks")
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_no_lost_updates(self):
+        controller = TwoStepAtmController(
+            SlowLedger([["00-01", "shino1025", 0]]),
+            locks=LockStripes()
+        )
+        account = controller.find_accounts(Pin("00-01"))[0]
+
+        def deposit_and_withdraw():
+            for _ in range(20):
+                controller.deposit(account, 2)
+                controller.withdraw(account, 1)
+
+        run_threads([deposit_and_withdraw] * 8)
+        self.assertEqual(controller.get_valance(account), 8 * 20)
+
+    def test_no_overdraft(self):
+        controller = TwoStepAtmController(
+            SlowLedger([["00-01", "shino1025", 50]]),
+            locks=LockStripes()
+        )
+        account = controller.find_accounts(Pin("00-01"))[0]
+        results = []
+
+        def withdraw():
+            for _ in range(10):
+                results.append(controller.withdraw(account, 1)[0])
+
+        run_threads([withdraw] * 8)
+        self.assertEqual(results.count(True), 50)
+        self.assertEqual(controller.get_valance(account), 0)
+
+    def test_apply_batch(self):
+        records = [["00-%02d" % i, "account", 100] for i in range(8)]
+        controller = TwoStepAtmController(SlowLedger(records), locks=LockStripes(4))
+        accounts = [controller.find_accounts(Pin(pin))[0] for pin, _, _ in records]
+
+        def apply_batch(offset):
+            def target():
+                for _ in range(5):
+                    controller.apply_batch([
+                        (accounts[(offset + i) % 8], 1, "withdraw") for i in range(8)
+                    ] + [(accounts[offset], 1, "deposit")])
+            return target
+
+        run_threads([apply_batch(offset) for offset in range(8)])
+        for account in accounts:
+            self.assertEqual(controller.get_valance(account), 100 - 8 * 5 + 5)
+
+    def test_opposite_transfers(self):
+        records = [["00-01", "account", 1000], ["00-02", "account", 1000]]
+        controller = TwoStepAtmController(SlowLedger(records), locks=LockStripes())
+        src = controller.find_accounts(Pin("00-01"))[0]
+        dst = controller.find_accounts(Pin("00-02"))[0]
+
+        def transfer(src, dst):
+            return lambda: [controller.transfer(src, dst, 1) for _ in range(20)]
+
+        run_threads([transfer(src, dst), transfer(dst, src)] * 4)
+        self.assertEqual(controller.get_valance(src), 1000)
+        self.assertEqual(controller.get_valance(dst), 1000)
+
+    def test_stripes_held_concurrently(self):
+        records = [["00-%02d" % i, "account", 1000] for i in range(8)]
+        # Both withdrawals must be inside the data model at the same time to pass the barrier
+        barrier = Barrier(2, timeout=10)
+
+        class BarrierLedger(Ledger):
+            def get_valance(self, pin_number, account_id):
+                barrier.wait()
+                return super().get_valance(pin_number, account_id)
+
+        locks = LockStripes(1024)
+        controller = TwoStepAtmController(BarrierLedger(records), locks=locks)
+        accounts = [controller.find_accounts(Pin(pin))[0] for pin, _, _ in records]
+        first = accounts[0]
+        second = next(account for account in accounts if locks.index(account.items) != locks.index(first.items))
+        results = []
+        run_threads([lambda account=account: results.append(controller.withdraw(account, 1)[0])
+                     for account in (first, second)])
+        self.assertEqual(results, [True, True])
+        self.assertFalse(barrier.broken)
+
+    def test_same_stripe_serialized(self):
+        records = [["00-01", "account", 1000], ["00-02", "account", 1000]]
+        inside = Event()
+        release = Event()
+
+        class BlockingLedger(Ledger):
+            def get_valance(self, pin_number, account_id):
+                if pin_number == "00-01":
+                    inside.set()
+                    release.wait(10)
+                return super().get_valance(pin_number, account_id)
+
+        # One stripe: the lock of the second account is the lock held by the first withdrawal
+        locks = LockStripes(1)
+        controller = TwoStepAtmController(BlockingLedger(records), locks=locks)
+        first = controller.find_accounts(Pin("00-01"))[0]
+        second = controller.find_accounts(Pin("00-02"))[0]
+        thread = Thread(target=controller.withdraw, args=(first, 1))
+        thread.start()
+        self.assertTrue(inside.wait(10))
+        self.assertFalse(locks.lock(second.items).acquire(blocking=False))
+        release.set()
+        thread.join()
+        self.assertEqual(controller.withdraw(second, 1), (True, "success"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+import unittest, os, shutil, tempfile
+from simple_atm_controller.mmap_ledger import MmapLedger
+from simple_atm_controller.ledger import LedgerAtmController
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import (
+    AtmControllerException, AtmControllerInputException, InvalidLedgerFile, InvalidPin, InvalidAccount
+)
+from tests.data_model import DataBase
+
+
+class MmapLedgerTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "atm.ledger")
+        self.records = DataBase().records
+        self.model = MmapLedger.create(self.path, capacity=100)
+        self.model.bulk_load(self.records)
+
+    def tearDown(self) -> None:
+        self.model.close()
+        shutil.rmtree(self.directory)
+
+    def test_create(self):
+        for capacity in [0, "100"]:
+            try:
+                MmapLedger.create(self.path + "2", capacity)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+        # The files of the previous format, without the key lengths, aren't read
+        old_format = b"ATMLEDG1" + open(self.path, "rb").read()[8:]
+        for data in [b"", b"garbage" * 100, old_format]:
+            with open(self.path + "2", "wb") as file:
+                file.write(data)
+            try:
+                MmapLedger(self.path + "2")
+                self.assertTrue(False)
+            except InvalidLedgerFile:
+                pass
+
+    def test_bulk_load(self):
+        self.assertEqual(len(self.model), len(self.records))
+        self.model.bulk_load([["00-01", "shino1025", 10], ["00-01", "new", 5]])
+        self.assertEqual(len(self.model), len(self.records) + 1)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 10)
+        self.assertEqual(
+            sorted(self.model.iter_records()),
+            sorted([tuple(record) for record in self.records if record[1] != "shino1025"]
+                   + [("00-01", "shino1025", 10), ("00-01", "new", 5)])
+        )
+        testcase = [
+            (["0" * 17, "account", 0], InvalidPin),
+            ([1, "account", 0], InvalidPin),
+            (["00-01", "a" * 33, 0], InvalidAccount),
+        ]
+        for record, exception in testcase:
+            try:
+                self.model.bulk_load([record])
+                self.assertTrue(False)
+            except exception:
+                pass
+
+    def test_capacity(self):
+        with MmapLedger.create(self.path + "2", capacity=3) as model:
+            model.bulk_load([["00-01", "a%d" % i, i] for i in range(3)])
+            try:
+                model.bulk_load([["00-01", "a3", 0]])
+                self.assertTrue(False)
+            except AtmControllerException:
+                pass
+            self.assertEqual(len(model), 3)
+
+    def test_find_accounts(self):
+        self.assertEqual(self.model.find_accounts("00-01"), ["shino1025", "shino102566"])
+        self.assertEqual(self.model.find_accounts("00-99"), [])
+        self.assertEqual(self.model.find_accounts("0" * 100), [])
+
+    def test_many(self):
+        self.assertEqual(
+            self.model.find_accounts_many(["00-01", "00-99", "00-00"]),
+            [["shino1025", "shino102566"], [], ["shin10256"]]
+        )
+        self.assertEqual(
+            self.model.get_valance_many([("00-02", "iml1111"), ("00-99", "imiml"), ("00-01", "shino1025")]),
+            [100_000, None, 73]
+        )
+
+    def test_transfer_valance(self):
+        self.assertTrue(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 73))
+        self.assertTrue(self.model.transfer_valance("00-02", "iml1111", "00-00", "shin10256", 3))
+        self.assertFalse(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 1))
+        self.assertFalse(self.model.transfer_valance("00-02", "iml1111", "00-99", "Invalid", 1))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 0)
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_070)
+        self.assertEqual(self.model.get_valance("00-00", "shin10256"), 3)
+
+    def test_update_valance(self):
+        self.model.update_valance("00-01", "shino1025", -3)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 70)
+        self.model.update_valance("00-99", "Invalid", 10)
+        self.assertEqual(self.model.get_valance("00-99", "Invalid"), None)
+        self.model.bulk_update_valance([("00-02", "iml1111", 10), ("00-00", "shin10256", 1)])
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_010)
+        self.assertTrue(self.model.conditional_update_valance("00-00", "shin10256", 1))
+        self.assertFalse(self.model.conditional_update_valance("00-00", "shin10256", 1))
+        self.assertFalse(self.model.conditional_update_valance("00-99", "Invalid", 0))
+        self.assertEqual(self.model.get_valance("00-00", "shin10256"), 0)
+
+    def test_reopen(self):
+        self.model.update_valance("00-01", "shino1025", -3)
+        self.model.close()
+        with MmapLedger(self.path, writable=False) as model:
+            self.assertEqual(len(model), len(self.records))
+            self.assertEqual(model.find_accounts("00-01"), ["shino1025", "shino102566"])
+            self.assertEqual(model.get_valance("00-01", "shino1025"), 70)
+        self.model = MmapLedger(self.path)
+
+    def test_many_accounts(self):
+        with MmapLedger.create(self.path + "2", capacity=5000, pin_width=8, account_width=8) as model:
+            model.bulk_load(("P%04d" % (i % 1000), "A%04d" % i, i) for i in range(5000))
+            self.assertEqual(model.find_accounts("P0007"), ["A%04d" % i for i in range(7, 5000, 1000)])
+            for i in range(0, 5000, 7):
+                self.assertEqual(model.get_valance("P%04d" % (i % 1000), "A%04d" % i), i)
+
+    def test_null_bytes(self):
+        records = [("00-05", "account", 1), ("00-05", "account\0", 2), ("00-05\0", "account", 3), ("00-05", "", 4)]
+        self.model.bulk_load(records)
+        self.assertEqual(self.model.find_accounts("00-05"), ["account", "account\0", ""])
+        self.assertEqual(self.model.find_accounts("00-05\0"), ["account"])
+        self.assertEqual(self.model.get_valance("00-05", "account\0"), 2)
+        self.assertEqual(self.model.get_valance("00-05\0", "account"), 3)
+        self.assertEqual(self.model.get_valance("00-05", "account\0\0"), None)
+        self.assertEqual(sorted(record for record in self.model.iter_records() if record[0].startswith("00-05")),
+                         sorted(records))
+
+    def test_one_pin_many_accounts(self):
+        with MmapLedger.create(self.path + "2", capacity=20_000) as model:
+            model.bulk_load(("00-01", "A%05d" % i, i) for i in range(20_000))
+            self.assertEqual(model.find_accounts("00-01"), ["A%05d" % i for i in range(20_000)])
+
+    def test_controller(self):
+        controller = LedgerAtmController(self.model)
+        account1, account2 = controller.find_accounts(Pin("00-01"))
+        self.assertEqual(controller.withdraw(account2, 30), (False, "insufficient balance"))
+        self.assertEqual(controller.withdraw(account1, 30), (True, "success"))
+        controller.deposit(account2, 30)
+        self.assertEqual(controller.get_valance(account1), 43)
+        self.assertEqual(controller.get_valance(account2), 53)
+
+
+if __name__ == '__main__':
+    unittest.main()
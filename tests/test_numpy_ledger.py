@@ -0,0 +1,153 @@
+import unittest, os, shutil, tempfile
+from simple_atm_controller import numpy_ledger
+from simple_atm_controller.numpy_ledger import NumpyLedger
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.atm_controller import DEPOSIT
+from simple_atm_controller.cache import LRUCache
+from simple_atm_controller.history import TransactionHistory, Transaction
+from simple_atm_controller.journal import Journal
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import AtmControllerInputException
+from tests.data_model import DataBase
+from tests.test_limits import Clock
+
+
+@unittest.skipIf(numpy_ledger.numpy is None, "numpy is not installed")
+class NumpyLedgerTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.clock = Clock()
+        self.records = DataBase().records
+        self.model = NumpyLedger(self.records, clock=self.clock)
+
+    def test_bulk_load(self):
+        self.assertEqual(len(self.model), len(self.records))
+        self.assertEqual(list(self.model.iter_records()), [tuple(record) for record in self.records])
+        records = [("%06d" % (index // 2), "account-%d" % index, index) for index in range(5000)]
+        self.model.bulk_load(records + [("00-01", "shino1025", 1)])
+        self.assertEqual(len(self.model), len(self.records) + 5000)
+        self.assertEqual(self.model.get_valance("000123", "account-247"), 247)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 1)
+        self.assertEqual(self.model.find_accounts("002499"), ["account-4998", "account-4999"])
+
+    def test_queries(self):
+        self.assertEqual(self.model.find_accounts("00-01"), ["shino1025", "shino102566"])
+        self.assertEqual(self.model.find_accounts("00-99"), [])
+        self.assertEqual(self.model.find_accounts_many(["00-00", "00-99"]), [["shin10256"], []])
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_000)
+        self.assertEqual(self.model.get_valance("00-99", "Invalid"), None)
+        self.assertEqual(
+            self.model.get_valance_many([("00-99", "Invalid"), ("00-01", "shino102566")]),
+            [None, 23]
+        )
+        self.model.update_valance("00-01", "shino1025", -3)
+        self.model.update_valance("00-99", "Invalid", 3)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 70)
+        self.model.bulk_update_valance([
+            ("00-01", "shino1025", 3), ("00-01", "shino1025", 1), ("00-99", "Invalid", 1)
+        ])
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 74)
+        self.assertFalse(self.model.conditional_update_valance("00-01", "shino1025", 75))
+        self.assertTrue(self.model.conditional_update_valance("00-01", "shino1025", 74))
+        self.assertFalse(self.model.conditional_update_valance("00-99", "Invalid", 0))
+        self.assertTrue(self.model.transfer_valance("00-02", "iml1111", "00-01", "shino1025", 5))
+        self.assertFalse(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 6))
+        self.assertFalse(self.model.transfer_valance("00-01", "shino1025", "00-99", "Invalid", 1))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 5)
+        self.assertIsInstance(self.model.get_valance("00-01", "shino1025"), int)
+
+    def test_analytics(self):
+        self.assertEqual(self.model.total(), 0 + 73 + 23 + 100_000 + 2312)
+        self.assertEqual(self.model.pin_totals(), {
+            "00-00": 0, "00-01": 96, "00-02": 100_000, "00-03": 2312
+        })
+        rows, dollars = self.model.interest_deltas(0.01)
+        self.assertEqual((rows.tolist(), dollars.tolist()), ([3, 4], [1000, 23]))
+        self.assertEqual(self.model.row_keys(rows), (["00-02", "00-03"], ["iml1111", "imiml"]))
+        controller = LedgerAtmController(self.model)
+        self.assertEqual(controller.apply_deltas(*self.model.interest_deltas(0.01)), 2)
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 101_000)
+        rows, dollars = self.model.fee_deltas(50, below=100)
+        self.assertEqual(self.model.row_keys(rows), (["00-00", "00-01", "00-01"], ["shin10256", "shino1025", "shino102566"]))
+        self.assertEqual(dollars.tolist(), [-50] * 3)
+        controller.apply_deltas(rows, dollars)
+        self.assertEqual(self.model.negative_accounts(), [("00-00", "shin10256"), ("00-01", "shino102566")])
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 23)
+        self.assertEqual(controller.apply_deltas(*self.model.fee_deltas(1)), 5)
+        self.assertEqual(self.model.total(), -51 + 22 - 28 + 100_999 + 2334)
+        self.assertEqual(controller.apply_deltas(*self.model.fee_deltas(0)), 0)
+        try:
+            controller.apply_deltas(rows, dollars[:1])
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+        for method, args in [
+            (self.model.interest_deltas, ("1%",)), (self.model.fee_deltas, (-1,)),
+            (self.model.fee_deltas, (1, "100")), (self.model.dormant_accounts, (None,)),
+        ]:
+            try:
+                method(*args)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+
+    def test_changes_through_controller(self):
+        directory = tempfile.mkdtemp()
+        try:
+            journal = Journal(os.path.join(directory, "atm.journal"))
+            journal.snapshot(Ledger(self.records))
+            history = TransactionHistory(clock=self.clock)
+            controller = LedgerAtmController(
+                self.model, locks=LockStripes(), valance_cache=LRUCache(), journal=journal, history=history
+            )
+            account = controller.find_accounts(Pin("00-02"))[0]
+            self.assertEqual(controller.get_valance(account), 100_000)
+            controller.apply_deltas(*self.model.interest_deltas(0.01))
+            controller.apply_deltas(*self.model.fee_deltas(50, below=100))
+            # The cached balance was cleared, and the changes are in the history and the journal
+            self.assertEqual(controller.get_valance(account), 101_000)
+            self.assertEqual(controller.mini_statement(account), [Transaction(0, DEPOSIT, 1000)])
+            self.assertEqual(len(history), 2 + 3)
+            journal.close()
+            recovered = Ledger()
+            with Journal(os.path.join(directory, "atm.journal")) as journal:
+                journal.recover(recovered)
+            self.assertEqual(sorted(recovered.iter_records()), sorted(self.model.iter_records()))
+        finally:
+            shutil.rmtree(directory)
+
+    def test_dormant_accounts(self):
+        self.clock.now = 100
+        self.model.update_valance("00-01", "shino1025", 1)
+        self.model.bulk_update_valance([("00-02", "iml1111", 1)])
+        self.assertEqual(self.model.dormant_accounts(50), [
+            ("00-00", "shin10256"), ("00-01", "shino102566"), ("00-03", "imiml")
+        ])
+        self.assertEqual(self.model.dormant_accounts(0), [])
+
+    def test_controller(self):
+        controller = LedgerAtmController(self.model)
+        account1, account2 = controller.find_accounts(Pin("00-01"))
+        self.assertEqual(controller.withdraw(account1, 74), (False, "insufficient balance"))
+        self.assertEqual(controller.withdraw(account1, 73), (True, "success"))
+        controller.deposit(account2, 7)
+        self.assertEqual(controller.transfer(account2, account1, 30), (True, "success"))
+        self.assertEqual(controller.get_valance(account1), 30)
+        self.assertEqual(controller.apply_batch([(account1, 30, "withdraw")]), [(True, "success")])
+        self.assertEqual(controller.get_valance(account1), 0)
+
+
+@unittest.skipIf(numpy_ledger.numpy is not None, "numpy is installed")
+class WithoutNumpyTestCase(unittest.TestCase):
+
+    def test_import_error(self):
+        try:
+            NumpyLedger()
+            self.assertTrue(False)
+        except ImportError:
+            pass
+
+
+if __name__ == '__main__':
+    unittest.main()
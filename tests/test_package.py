@@ -0,0 +1,62 @@
+import unittest, ast, os, subprocess, sys, typing
+import simple_atm_controller
+from simple_atm_controller.atm_controller import AtmController
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.account import Account
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def loaded_modules(script):
+    """The simple_atm_controller modules loaded by the script in a new interpreter"""
+    output = subprocess.run(
+        [sys.executable, "-c", script + "\nimport sys\n"
+         "print(sorted(name for name in sys.modules if name.startswith('simple_atm_controller')))"],
+        env=dict(os.environ, PYTHONPATH=ROOT), capture_output=True, text=True, check=True
+    ).stdout
+    return ast.literal_eval(output)
+
+
+class PackageTestCase(unittest.TestCase):
+
+    def test_lazy_attributes(self):
+        self.assertIs(simple_atm_controller.AtmController, AtmController)
+        self.assertIs(simple_atm_controller.Pin, Pin)
+        self.assertIs(simple_atm_controller.Account, Account)
+        self.assertIn("Account", dir(simple_atm_controller))
+        try:
+            simple_atm_controller.Ledger
+            self.assertTrue(False)
+        except AttributeError:
+            pass
+
+    def test_type_hints(self):
+        # The optional components aren't annotated, so resolving the hints imports none of them
+        self.assertEqual(typing.get_type_hints(AtmController.__init__), {})
+
+    def test_bare_import(self):
+        self.assertEqual(loaded_modules("import simple_atm_controller"), ["simple_atm_controller"])
+        self.assertEqual(
+            loaded_modules("from simple_atm_controller import Pin"),
+            ["simple_atm_controller", "simple_atm_controller.exceptions", "simple_atm_controller.pin",
+             "simple_atm_controller.results"]
+        )
+
+    def test_optional_components(self):
+        # The controller imports an optional component only when it's used
+        modules = loaded_modules("from simple_atm_controller.ledger import LedgerAtmController")
+        for name in ["locks", "cache", "journal", "instrumentation", "limits", "history"]:
+            self.assertNotIn("simple_atm_controller." + name, modules)
+        modules = loaded_modules(
+            "from simple_atm_controller.ledger import Ledger, LedgerAtmController\n"
+            "from simple_atm_controller.locks import LockStripes\n"
+            "LedgerAtmController(Ledger(), locks=LockStripes())"
+        )
+        self.assertIn("simple_atm_controller.locks", modules)
+        self.assertNotIn("simple_atm_controller.journal", modules)
+        modules = loaded_modules("from simple_atm_controller.session import AtmSession")
+        self.assertNotIn("simple_atm_controller.cache", modules)
+
+
+if __name__ == '__main__':
+    unittest.main()
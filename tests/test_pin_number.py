@@ -1,7 +1,7 @@
 import unittest, re
 from string import ascii_letters
 from simple_atm_controller.exceptions import InvalidPin, InvalidValidationRule
-from simple_atm_controller.pin import Pin, PinValidationRule
+from simple_atm_controller.pin import Pin, PinValidationRule, PinRegexRule
 
 
 class PinNumberTestCase(unittest.TestCase):
@@ -10,6 +10,21 @@ class PinNumberTestCase(unittest.TestCase):
         pin_number = Pin("0000-0001")
         self.assertEqual(pin_number.pin_number, "0000-0001")
 
+    def test_value_object(self):
+        pin_number = Pin("0000-0001")
+        self.assertEqual(pin_number, Pin("0000-0001"))
+        self.assertNotEqual(pin_number, Pin("0000-0002"))
+        self.assertNotEqual(pin_number, "0000-0001")
+        self.assertEqual(len({pin_number, Pin("0000-0001")}), 1)
+        self.assertFalse(hasattr(pin_number, "__dict__"))
+        for name in ["pin_number", "other"]:
+            try:
+                setattr(pin_number, name, "0000-0002")
+                self.assertTrue(False)
+            except AttributeError:
+                pass
+        self.assertEqual(pin_number.pin_number, "0000-0001")
+
     def test_default_exception(self):
         invalid_pin_list = [
             1, .1, ["0000"], ("0000",),
@@ -41,6 +56,23 @@ class PinNumberTestCase(unittest.TestCase):
             except InvalidPin:
                 pass
 
+    def test_regex_validation_rule(self):
+        rule = PinRegexRule(r"\d{2}-\d{2}")
+        full_rule = PinRegexRule(r"\d{2}-\d{2}", fullmatch=True)
+        testcase = [
+            ("00-01", True, True),
+            ("A00-01B", True, False),
+            ("0001", False, False),
+            (1, False, False),
+        ]
+        for pin_number, expect, full_expect in testcase:
+            for rule_i, expect_i in [(rule, expect), (full_rule, full_expect)]:
+                try:
+                    Pin(pin_number, rule_i)
+                    self.assertTrue(expect_i)
+                except InvalidPin:
+                    self.assertFalse(expect_i)
+
     def test_invalid_validation_rule_exception(self):
 
         class GoodRule(PinValidationRule):
@@ -51,11 +83,16 @@ class PinNumberTestCase(unittest.TestCase):
             def validate(self, pin_number) -> bool:
                 return "True"
 
+        class DeepRule(GoodRule):
+            pass
+
         class NotRule:
             pass
 
         testcase = [
             (GoodRule(), True),
+            (DeepRule(), True),
+            (PinRegexRule(r"\w"), True),
             (InvalidReturnRule(), False),
             (NotRule(), False),
         ]
@@ -67,6 +104,21 @@ class PinNumberTestCase(unittest.TestCase):
             except InvalidValidationRule:
                 self.assertFalse(expect)
 
+    def test_parse(self):
+        pin = Pin.parse("00-01")
+        self.assertEqual(pin, Pin("00-01"))
+        self.assertIsNone(Pin.parse(1234))
+        self.assertIsNone(Pin.parse("00-01", PinRegexRule(r"\d{4}")))
+
+        class NotRule:
+            pass
+
+        try:
+            Pin.parse("00-01", NotRule())
+            self.assertTrue(False)
+        except InvalidValidationRule:
+            pass
+
 
 if __name__ == '__main__':
     unittest.main()
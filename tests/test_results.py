@@ -0,0 +1,44 @@
+import unittest, pickle
+from simple_atm_controller import ResultCode
+from simple_atm_controller.results import SUCCESS, INSUFFICIENT_BALANCE
+from simple_atm_controller.exceptions import (
+    InvalidPin, InvalidAccount, InvalidValidationRule, AtmControllerException,
+    AtmControllerInputException, AtmControllerQueryException
+)
+
+
+class ResultCodeTestCase(unittest.TestCase):
+
+    def test_code(self):
+        code = ResultCode.INSUFFICIENT_BALANCE
+        self.assertIsInstance(code, str)
+        self.assertEqual(code, "insufficient balance")
+        self.assertEqual(str(code), "insufficient balance")
+        self.assertEqual(f"{code}", "insufficient balance")
+        self.assertEqual(code.name, "INSUFFICIENT_BALANCE")
+        self.assertEqual(repr(code), "ResultCode.INSUFFICIENT_BALANCE")
+        self.assertIs(pickle.loads(pickle.dumps(code)), code)
+        self.assertIs(ResultCode.members()["SUCCESS"], ResultCode.SUCCESS)
+        self.assertEqual(len(set(ResultCode.members().values())), len(ResultCode.members()))
+
+    def test_results(self):
+        self.assertEqual(SUCCESS, (True, "success"))
+        self.assertEqual(INSUFFICIENT_BALANCE, (False, "insufficient balance"))
+        self.assertIs(SUCCESS[1], ResultCode.SUCCESS)
+
+    def test_exception_codes(self):
+        testcase = [
+            (InvalidPin(1), ResultCode.INVALID_PIN),
+            (InvalidAccount(1), ResultCode.INVALID_ACCOUNT),
+            (InvalidValidationRule('PinValidationRule'), ResultCode.INVALID_RULE),
+            (AtmControllerInputException("dollar", "int"), ResultCode.INVALID_INPUT),
+            (AtmControllerQueryException("get_valance_query", "int"), ResultCode.INVALID_QUERY),
+            (AtmControllerException("error"), ResultCode.CONTROLLER_ERROR),
+            (AtmControllerException("error", ResultCode.TOO_MANY_REQUESTS), ResultCode.TOO_MANY_REQUESTS),
+        ]
+        for exception, code in testcase:
+            self.assertIs(exception.code, code)
+
+
+if __name__ == '__main__':
+    unittest.main()
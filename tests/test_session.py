@@ -0,0 +1,145 @@
+import unittest
+from simple_atm_controller.session import AtmSession
+from simple_atm_controller.ledger import Ledger, LedgerAtmController
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.history import TransactionHistory
+from simple_atm_controller.instrumentation import Instrumentation
+from simple_atm_controller.atm_controller import WITHDRAW
+from simple_atm_controller.account import Account
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import AtmControllerException, AtmControllerInputException
+from tests.data_model import DataBase
+from tests.test_locks import TwoStepAtmController
+
+
+class CountingLedger(Ledger):
+    """Ledger that counts the queries to it"""
+
+    def __init__(self, records=None):
+        super().__init__(records)
+        self.calls = []
+
+    def __getattribute__(self, name):
+        attribute = super().__getattribute__(name)
+        if name in ("find_accounts", "get_valance", "get_valance_many", "update_valance",
+                    "conditional_update_valance"):
+            self.calls.append(name)
+        return attribute
+
+
+class TwoStepManyAtmController(TwoStepAtmController):
+
+    def get_valance_query_many(self, keys) -> list:
+        return self.model.get_valance_many(keys)
+
+
+class AtmSessionTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.model = CountingLedger(DataBase().records)
+        self.pin = Pin("00-01")
+
+    def test_invalid_input(self):
+        try:
+            AtmSession(self.model, self.pin)
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+        session = AtmSession(LedgerAtmController(self.model), self.pin)
+        try:
+            session.get_valance("shino1025")
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+        try:
+            session.withdraw(Account(Pin("00-02"), "iml1111"), 1)
+            self.assertTrue(False)
+        except AtmControllerException:
+            pass
+        try:
+            session.deposit(session.accounts[0], -1)
+            self.assertTrue(False)
+        except AtmControllerException:
+            pass
+
+    def test_check_balance_then_withdraw(self):
+        for controller_class in [LedgerAtmController, TwoStepAtmController, TwoStepManyAtmController]:
+            self.model = CountingLedger(DataBase().records)
+            session = AtmSession(controller_class(self.model), self.pin)
+            account = session.accounts[0]
+            self.model.calls.clear()
+
+            self.assertEqual(session.get_valance(account), 73)
+            self.assertEqual(session.withdraw(account, 70), (True, "success"))
+            self.assertEqual(session.get_valance(account), 3)
+            # The withdrawal reads the balance again unless the data model checks it
+            self.assertLessEqual(len(self.model.calls), 3, controller_class)
+            self.assertEqual(self.model.get_valance("00-01", "shino1025"), 3)
+
+    def test_prefetch(self):
+        session = AtmSession(TwoStepManyAtmController(self.model), self.pin)
+        self.assertEqual(self.model.calls, ["find_accounts", "get_valance_many"])
+        self.model.calls.clear()
+        self.assertEqual([session.get_valance(account) for account in session.accounts], [73, 23])
+        self.assertEqual(self.model.calls, [])
+
+        session.deposit(session.accounts[1], 10)
+        self.assertEqual(session.withdraw(session.accounts[1], 30), (True, "success"))
+        self.assertEqual(self.model.calls, ["update_valance", "get_valance", "update_valance"])
+        self.assertEqual(session.get_valance(session.accounts[1]), 3)
+
+    def test_prefetch_valances(self):
+        controller = TwoStepManyAtmController(self.model)
+        accounts = controller.find_accounts(self.pin)
+        self.assertEqual(controller.prefetch_valances(accounts), [73, 23])
+        self.assertEqual(controller.prefetch_valances([]), [])
+        # Without get_valance_query_many, the session reads each balance when it's asked
+        self.assertIsNone(TwoStepAtmController(self.model).prefetch_valances(accounts))
+        try:
+            controller.prefetch_valances([self.pin])
+            self.assertTrue(False)
+        except AtmControllerInputException:
+            pass
+
+    def test_conditional_update_failure(self):
+        controller = LedgerAtmController(self.model)
+        session = AtmSession(controller, self.pin)
+        account = session.accounts[0]
+        self.assertEqual(session.get_valance(account), 73)
+        # Changed by another session
+        controller.withdraw(account, 70)
+        self.assertEqual(session.withdraw(account, 10), (False, "insufficient balance"))
+        self.assertEqual(session.get_valance(account), 3)
+
+    def test_sessions_on_the_same_card(self):
+        controller = TwoStepManyAtmController(self.model, locks=LockStripes())
+        sessions = [AtmSession(controller, self.pin) for _ in range(2)]
+        account = sessions[0].accounts[0]
+        self.assertEqual([session.get_valance(account) for session in sessions], [73, 73])
+        self.assertEqual(sessions[0].withdraw(account, 73), (True, "success"))
+        self.assertEqual(sessions[1].withdraw(account, 73), (False, "insufficient balance"))
+        self.assertEqual(self.model.get_valance(*account.items), 0)
+        self.assertEqual(sessions[1].get_valance(account), 0)
+
+    def test_controller_options(self):
+        history = TransactionHistory()
+        instrumentation = Instrumentation()
+        controller = LedgerAtmController(
+            self.model, locks=LockStripes(), history=history, instrumentation=instrumentation
+        )
+        with AtmSession(controller, self.pin) as session:
+            account = session.accounts[0]
+            session.deposit(account, 3)
+            session.withdraw(account, 3)
+        self.assertEqual(controller.mini_statement(account)[-1].kind, WITHDRAW)
+        snapshot = instrumentation.snapshot()
+        self.assertEqual((snapshot["deposit"]["count"], snapshot["withdraw"]["count"]), (1, 1))
+        self.assertEqual(session.accounts, [])
+
+    def test_unknown_pin(self):
+        session = AtmSession(LedgerAtmController(self.model), Pin("00-99"))
+        self.assertEqual(session.accounts, [])
+
+
+if __name__ == '__main__':
+    unittest.main()
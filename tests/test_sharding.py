@@ -0,0 +1,198 @@
+import unittest
+from threading import Thread
+from simple_atm_controller.sharding import ShardedLedger
+from simple_atm_controller.ledger import LedgerAtmController
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import AtmControllerException, AtmControllerInputException
+from tests.data_model import DataBase
+
+
+class ShardedLedgerTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.records = DataBase().records
+        self.model = ShardedLedger(shards=2, records=self.records)
+
+    def tearDown(self) -> None:
+        self.model.close()
+
+    def test_invalid_shards(self):
+        for shards in [0, "2"]:
+            try:
+                ShardedLedger(shards)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+
+    def test_queries(self):
+        self.assertEqual(len(self.model), len(self.records))
+        self.assertEqual(
+            sorted(self.model.iter_records()),
+            sorted(tuple(record) for record in self.records)
+        )
+        self.assertEqual(self.model.find_accounts("00-01"), ["shino1025", "shino102566"])
+        self.assertEqual(self.model.find_accounts("00-99"), [])
+        self.model.update_valance("00-01", "shino1025", -3)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 70)
+        self.model.bulk_update_valance([("00-01", "shino1025", 3), ("00-02", "iml1111", 1)])
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_001)
+        self.assertFalse(self.model.conditional_update_valance("00-01", "shino1025", 74))
+        self.assertTrue(self.model.conditional_update_valance("00-01", "shino1025", 73))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 0)
+        self.assertEqual(self.model.get_valance("00-99", "Invalid"), None)
+
+    def test_many(self):
+        self.assertEqual(
+            self.model.find_accounts_many(["00-01", "00-99", "00-00"]),
+            [["shino1025", "shino102566"], [], ["shin10256"]]
+        )
+        self.assertEqual(
+            self.model.get_valance_many([("00-02", "iml1111"), ("00-99", "imiml"), ("00-01", "shino1025")]),
+            [100_000, None, 73]
+        )
+
+    def test_transfer_valance(self):
+        self.assertTrue(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 73))
+        self.assertTrue(self.model.transfer_valance("00-02", "iml1111", "00-00", "shin10256", 3))
+        self.assertFalse(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 1))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 0)
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_070)
+        self.assertEqual(self.model.get_valance("00-00", "shin10256"), 3)
+
+    def test_cross_shard_transfer(self):
+        pins = ["P%04d" % i for i in range(16)]
+        src_pin = pins[0]
+        dst_pin = next(pin for pin in pins if self.model._shard(pin) is not self.model._shard(src_pin))
+        self.model.bulk_load([(src_pin, "src", 100), (dst_pin, "dst", 0)])
+        self.assertFalse(self.model.transfer_valance(src_pin, "src", dst_pin, "unknown", 10))
+        self.assertEqual(self.model.get_valance(src_pin, "src"), 100)
+
+        # The deposit fails after the withdrawal: the dollars go back to src
+        dst_shard = self.model._shard(dst_pin)
+        call = dst_shard.call
+
+        def failing_call(method_name, *args):
+            if method_name == "update_valance":
+                raise EOFError
+            return call(method_name, *args)
+
+        dst_shard.call = failing_call
+        try:
+            self.model.transfer_valance(src_pin, "src", dst_pin, "dst", 10)
+            self.assertTrue(False)
+        except EOFError:
+            pass
+        self.assertEqual(self.model.get_valance(src_pin, "src"), 100)
+        self.assertEqual(self.model.unsettled, [])
+
+        # The credit back fails too: it's kept until settle()
+        src_shard = self.model._shard(src_pin)
+        src_call = src_shard.call
+        src_shard.call = lambda method_name, *args: (
+            failing_call(method_name, *args) if method_name == "update_valance" else src_call(method_name, *args)
+        )
+        try:
+            self.model.transfer_valance(src_pin, "src", dst_pin, "dst", 10)
+            self.assertTrue(False)
+        except EOFError:
+            pass
+        self.assertEqual(self.model.unsettled, [(src_pin, "src", 10)])
+        src_shard.call = src_call
+        self.assertEqual(self.model.settle(), 0)
+        self.assertEqual(self.model.get_valance(src_pin, "src"), 100)
+        dst_shard.call = call
+        self.assertTrue(self.model.transfer_valance(src_pin, "src", dst_pin, "dst", 10))
+        self.assertEqual(self.model.get_valance(dst_pin, "dst"), 10)
+
+    def test_combined_queries(self):
+        records = [["P%04d" % i, "A%04d" % i, 100] for i in range(50)]
+        self.model.bulk_load(records)
+
+        def withdraw():
+            for pin_number, account_id, _ in records:
+                self.model.conditional_update_valance(pin_number, account_id, 1)
+
+        threads = [Thread(target=withdraw) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.model.get_valance_many([record[:2] for record in records]), [92] * 50)
+
+    def test_worker_exception(self):
+        for pin_number in ["00-00", "00-01", "00-02", "00-03"]:
+            try:
+                self.model.bulk_load([(pin_number, "account", 0, "extra")])
+                self.assertTrue(False)
+            except ValueError:
+                pass
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_000)
+
+    def test_dead_worker(self):
+        with ShardedLedger(shards=3) as model:
+            pins = ["P%04d" % i for i in range(64)]
+            model.bulk_load([(pin, "account", i) for i, pin in enumerate(pins)])
+            dead = model._shards[1]
+            dead.process.kill()
+            dead.process.join()
+            for _ in range(2):
+                try:
+                    len(model)
+                    self.assertTrue(False)
+                except (OSError, EOFError, AtmControllerException):
+                    pass
+            self.assertTrue(dead.dead)
+            # The other shards answer their own queries, not a response left by the broadcast
+            for i, pin in enumerate(pins):
+                if model._shard(pin) is dead:
+                    try:
+                        model.get_valance(pin, "account")
+                        self.assertTrue(False)
+                    except AtmControllerException:
+                        pass
+                else:
+                    self.assertEqual(model.get_valance(pin, "account"), i)
+                    self.assertEqual(model.find_accounts(pin), ["account"])
+
+    def test_interrupted_round_trip(self):
+        shard = self.model._shard("00-02")
+
+        def interrupted_recv():
+            raise KeyboardInterrupt
+
+        shard.connection.recv = interrupted_recv
+        try:
+            self.model.get_valance("00-02", "iml1111")
+            self.assertTrue(False)
+        except KeyboardInterrupt:
+            pass
+        del shard.connection.recv
+        # The response of the interrupted query is still in the pipe, so the shard isn't used again
+        try:
+            self.model.get_valance("00-02", "iml1111")
+            self.assertTrue(False)
+        except AtmControllerException:
+            pass
+
+    def test_concurrent_controller(self):
+        records = [["P%04d" % i, "A%04d" % i, 100] for i in range(100)]
+        self.model.bulk_load(records)
+        controller = LedgerAtmController(self.model, locks=LockStripes())
+        accounts = [controller.find_accounts(Pin(pin))[0] for pin, _, _ in records]
+
+        def withdraw():
+            for account in accounts:
+                controller.withdraw(account, 1)
+
+        threads = [Thread(target=withdraw) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        for account in accounts:
+            self.assertEqual(controller.get_valance(account), 100 - 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,130 @@
+import unittest, os, shutil, sqlite3, tempfile
+from threading import Thread
+from simple_atm_controller import sqlite_ledger
+from simple_atm_controller.sqlite_ledger import SqliteLedger
+from simple_atm_controller.ledger import LedgerAtmController
+from simple_atm_controller.locks import LockStripes
+from simple_atm_controller.pin import Pin
+from simple_atm_controller.exceptions import AtmControllerInputException
+from tests.data_model import DataBase
+
+
+class SqliteLedgerTestCase(unittest.TestCase):
+
+    def setUp(self) -> None:
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, "atm.sqlite3")
+        self.records = DataBase().records
+        self.model = SqliteLedger(self.path)
+        self.model.bulk_load(self.records)
+
+    def tearDown(self) -> None:
+        self.model.close()
+        shutil.rmtree(self.directory)
+
+    def test_invalid_pool_size(self):
+        for pool_size in [0, "4"]:
+            try:
+                SqliteLedger(self.path, pool_size=pool_size)
+                self.assertTrue(False)
+            except AtmControllerInputException:
+                pass
+
+    def test_bulk_load(self):
+        self.assertEqual(len(self.model), len(self.records))
+        self.model.bulk_load([["00-01", "shino1025", 10], ["00-09", "new", 5]])
+        self.assertEqual(len(self.model), len(self.records) + 1)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 10)
+        try:
+            self.model.bulk_load([["00-09", "other", 5], ["00-09", "other", None]])
+            self.assertTrue(False)
+        except sqlite3.IntegrityError:
+            pass
+        self.assertEqual(self.model.find_accounts("00-09"), ["new"])
+
+    def test_iter_records_releases_connection(self):
+        model = SqliteLedger(self.path, pool_size=1)
+        fetch_size = sqlite_ledger.FETCH_SIZE
+        sqlite_ledger.FETCH_SIZE = 2
+        try:
+            records = []
+            # Queries while iterating don't wait for the only connection
+            for record in model.iter_records():
+                records.append(record)
+                self.assertEqual(model.get_valance(*record[:2]), record[2])
+            self.assertEqual(records, [tuple(record) for record in self.records])
+            abandoned = model.iter_records()
+            next(abandoned)
+            self.assertEqual(len(model), len(self.records))
+        finally:
+            sqlite_ledger.FETCH_SIZE = fetch_size
+            model.close()
+
+    def test_queries(self):
+        self.assertEqual(list(self.model.iter_records()), [tuple(record) for record in self.records])
+        self.assertEqual(self.model.find_accounts("00-01"), ["shino1025", "shino102566"])
+        self.assertEqual(self.model.find_accounts("00-99"), [])
+        self.model.update_valance("00-01", "shino1025", -3)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 70)
+        self.model.bulk_update_valance([("00-01", "shino1025", 3), ("00-02", "iml1111", 1)])
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_001)
+        self.assertFalse(self.model.conditional_update_valance("00-01", "shino1025", 74))
+        self.assertTrue(self.model.conditional_update_valance("00-01", "shino1025", 73))
+        self.assertFalse(self.model.conditional_update_valance("00-99", "Invalid", 0))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 0)
+        self.assertEqual(self.model.get_valance("00-99", "Invalid"), None)
+
+    def test_many(self):
+        self.assertEqual(
+            self.model.find_accounts_many(["00-01", "00-99", "00-00"]),
+            [["shino1025", "shino102566"], [], ["shin10256"]]
+        )
+        self.assertEqual(
+            self.model.get_valance_many([("00-02", "iml1111"), ("00-99", "imiml"), ("00-01", "shino1025")]),
+            [100_000, None, 73]
+        )
+
+    def test_transfer_valance(self):
+        self.assertTrue(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 73))
+        self.assertTrue(self.model.transfer_valance("00-02", "iml1111", "00-00", "shin10256", 3))
+        self.assertFalse(self.model.transfer_valance("00-01", "shino1025", "00-02", "iml1111", 1))
+        self.assertFalse(self.model.transfer_valance("00-02", "iml1111", "00-99", "Invalid", 1))
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 0)
+        self.assertEqual(self.model.get_valance("00-02", "iml1111"), 100_070)
+        self.assertEqual(self.model.get_valance("00-00", "shin10256"), 3)
+
+    def test_persistence(self):
+        self.model.update_valance("00-01", "shino1025", -3)
+        self.model.close()
+        self.model = SqliteLedger(self.path, pool_size=1)
+        self.assertEqual(self.model.get_valance("00-01", "shino1025"), 70)
+
+    def test_concurrent_withdraw(self):
+        controller = LedgerAtmController(self.model)
+        account = controller.find_accounts(Pin("00-01"))[0]
+        results = []
+
+        def withdraw():
+            for _ in range(20):
+                results.append(controller.withdraw(account, 1)[0])
+
+        threads = [Thread(target=withdraw) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results.count(True), 73)
+        self.assertEqual(controller.get_valance(account), 0)
+
+    def test_controller(self):
+        controller = LedgerAtmController(self.model, locks=LockStripes())
+        account1, account2 = controller.find_accounts(Pin("00-01"))
+        self.assertEqual(controller.withdraw(account2, 30), (False, "insufficient balance"))
+        self.assertEqual(controller.withdraw(account1, 30), (True, "success"))
+        controller.apply_batch([(account2, 30, "deposit"), (account1, 3, "withdraw")])
+        self.assertEqual(controller.get_valance(account1), 40)
+        self.assertEqual(controller.get_valance(account2), 53)
+
+
+if __name__ == '__main__':
+    unittest.main()